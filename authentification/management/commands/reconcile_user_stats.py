@@ -0,0 +1,12 @@
+# authentification/management/commands/reconcile_user_stats.py
+from django.core.management.base import BaseCommand
+
+from authentification.stats import recompute_user_stats
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs dénormalisés des utilisateurs (abonnés, publications, likes reçus)."
+
+    def handle(self, *args, **options):
+        updated = recompute_user_stats()
+        self.stdout.write(self.style.SUCCESS(f"{updated} utilisateur(s) recalculé(s)."))
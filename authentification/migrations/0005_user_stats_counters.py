@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def fill_user_stats(apps, schema_editor):
+    User = apps.get_model('authentification', 'User')
+    Photo = apps.get_model('blog', 'Photo')
+    Follow = User.follows.through
+
+    followers = Follow.objects.filter(to_user=OuterRef('pk')).order_by().values('to_user').annotate(c=Count('id')).values('c')
+    photos = Photo.objects.filter(uploader=OuterRef('pk')).order_by().values('uploader').annotate(c=Count('id')).values('c')
+    likes = Photo.objects.filter(uploader=OuterRef('pk')).order_by().values('uploader').annotate(c=Sum('likes_count')).values('c')
+    User.objects.update(
+        followers_count=Coalesce(Subquery(followers), 0),
+        photos_count=Coalesce(Subquery(photos), 0),
+        likes_received_count=Coalesce(Subquery(likes), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentification', '0004_alter_user_follows'),
+        ('blog', '0005_photo_likes_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Abonnés'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='likes_received_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Likes reçus'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='photos_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Publications'),
+        ),
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
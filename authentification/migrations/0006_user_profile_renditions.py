@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentification', '0005_user_stats_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='profile_renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
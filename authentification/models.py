@@ -1,6 +1,5 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from PIL import Image
 from blog.utils import user_directory_path  # <-- importer utils ici
 
 
@@ -13,7 +12,10 @@ class User(AbstractUser):
         (SUBSCRIBER, "Abonné"),
     )
 
-    IMAGE_MAX_SIZE = (400, 400)  # 👈 un peu plus petit que les photos normales
+    # champ image -> (champ JSON des renditions, {label: largeur max}) 👈 plus petit que les photos
+    RENDITIONS = {
+        'profile_photo': ('profile_renditions', {'thumb': 96, 'medium': 400}),
+    }
 
     profile_photo = models.ImageField(
         upload_to=user_directory_path,
@@ -21,6 +23,7 @@ class User(AbstractUser):
         blank=True,
         null=True
     )
+    profile_renditions = models.JSONField(default=dict, blank=True)
     role = models.CharField(
         max_length=30,
         choices=ROLE_CHOICES,
@@ -36,15 +39,31 @@ class User(AbstractUser):
         related_name="followers"  # ✅ permet d’accéder à creator.followers
     )
 
+    # --- Compteurs dénormalisés (lus par le context processor user_stats) ---
+    # Maintenus incrémentalement : likes (ToggleLikeView), upload/suppression
+    # de photo (blog.signals), follow/unfollow (authentification.signals).
+    followers_count = models.PositiveIntegerField(default=0, verbose_name="Abonnés")
+    photos_count = models.PositiveIntegerField(default=0, verbose_name="Publications")
+    likes_received_count = models.PositiveIntegerField(default=0, verbose_name="Likes reçus")
+    COUNTER_FIELDS = ('followers_count', 'photos_count', 'likes_received_count')
+
     def __str__(self):
         return f"{self.username} ({self.role})"
 
     def save(self, *args, **kwargs):
-        """Redimensionnement automatique de la photo de profil"""
+        """Sauvegarde l'original ; les renditions sont produites hors requête (ImageJob).
+
+        Une sauvegarde complète d'une ligne existante n'écrit pas les compteurs :
+        l'instance peut être périmée et écraserait les incréments F() concurrents.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [f.name for f in self._meta.concrete_fields
+                                       if not f.primary_key and f.name not in self.COUNTER_FIELDS]
+        new_photo = bool(self.profile_photo) and not self.profile_photo._committed
+        if new_photo:
+            self.profile_renditions = {}
         super().save(*args, **kwargs)  # d’abord sauvegarder l’original
 
-        if self.profile_photo:
-            image = Image.open(self.profile_photo.path)
-            if image.height > self.IMAGE_MAX_SIZE[1] or image.width > self.IMAGE_MAX_SIZE[0]:
-                image.thumbnail(self.IMAGE_MAX_SIZE)
-                image.save(self.profile_photo.path)
\ No newline at end of file
+        if new_photo:
+            from blog.models import ImageJob
+            ImageJob.enqueue(self, 'profile_photo')
\ No newline at end of file
@@ -1,12 +1,28 @@
 # authentification/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import Permission
 from .models import User
+from .stats import refresh_followers_count
 
 @receiver(post_save, sender=User)
 def give_permissions_to_creator(sender, instance, created, **kwargs):
     if created and getattr(instance, 'role', None) == 'Creator':
         add_blog = Permission.objects.get(codename='add_blog')
         delete_blog = Permission.objects.get(codename='delete_blog')
-        instance.user_permissions.add(add_blog, delete_blog)
\ No newline at end of file
+        instance.user_permissions.add(add_blog, delete_blog)
+
+@receiver(m2m_changed, sender=User.follows.through)
+def update_followers_count(sender, instance, action, reverse, pk_set, **kwargs):
+    """Follow/unfollow : recalcule followers_count des créateurs concernés."""
+    if reverse:
+        # creator.followers.add/remove/clear : instance = le créateur
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refresh_followers_count([instance.pk])
+        return
+    if action == 'pre_clear':
+        instance._follows_before_clear = list(instance.follows.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        refresh_followers_count(pk_set or [])
+    elif action == 'post_clear':
+        refresh_followers_count(getattr(instance, '_follows_before_clear', []))
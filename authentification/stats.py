@@ -0,0 +1,35 @@
+# authentification/stats.py
+"""
+Recalcul des compteurs dénormalisés de User (followers_count, photos_count,
+likes_received_count) depuis les tables sources.
+"""
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+from .models import User
+
+
+def _followers_subquery():
+    Follow = User.follows.through
+    counts = Follow.objects.filter(to_user=OuterRef('pk')).order_by().values('to_user').annotate(c=Count('id')).values('c')
+    return Coalesce(Subquery(counts), 0)
+
+
+def refresh_followers_count(user_ids):
+    """Recalcule followers_count des utilisateurs donnés (une requête UPDATE)."""
+    user_ids = [uid for uid in user_ids if uid is not None]
+    if user_ids:
+        User.objects.filter(pk__in=user_ids).update(followers_count=_followers_subquery())
+
+
+def recompute_user_stats(queryset=None):
+    """Recalcule tous les compteurs pour `queryset` (tous les utilisateurs par défaut)."""
+    from blog.models import Photo
+
+    photos = Photo.objects.filter(uploader=OuterRef('pk')).order_by().values('uploader')
+    queryset = User.objects.all() if queryset is None else queryset
+    return queryset.update(
+        followers_count=_followers_subquery(),
+        photos_count=Coalesce(Subquery(photos.annotate(c=Count('id')).values('c')), 0),
+        likes_received_count=Coalesce(Subquery(photos.annotate(c=Sum('likes_count')).values('c')), 0),
+    )
@@ -1,3 +1,82 @@
+from unittest import mock
+
+from django.db.models import F
 from django.test import TestCase
+from django.urls import reverse
+
+from blog.forms import FollowUsersForm
+
+from .models import User
+from .stats import recompute_user_stats
+
+
+class FollowersCountTests(TestCase):
+    """followers_count suit les follows, par les deux côtés de la relation, et reste égal au COUNT réel."""
+
+    def setUp(self):
+        self.creators = [User.objects.create_user(username=f'creator{i}', password='pwd', role='Creator')
+                         for i in range(2)]
+        self.fans = [User.objects.create_user(username=f'fan{i}', password='pwd') for i in range(3)]
+
+    def assertCounts(self, *expected):
+        stored = [User.objects.get(pk=c.pk).followers_count for c in self.creators]
+        real = [User.objects.filter(follows=c).count() for c in self.creators]
+        self.assertEqual(stored, list(expected))
+        self.assertEqual(stored, real)
+
+    def test_follow_and_unfollow(self):
+        self.fans[0].follows.add(*self.creators)
+        self.fans[1].follows.add(self.creators[0])
+        self.assertCounts(2, 1)
+        self.creators[1].followers.add(self.fans[1], self.fans[2])
+        self.assertCounts(2, 3)
+
+        self.fans[0].follows.remove(self.creators[0])
+        self.assertCounts(1, 3)
+        self.creators[1].followers.remove(self.fans[2])
+        self.assertCounts(1, 2)
+        self.fans[1].follows.clear()
+        self.assertCounts(0, 1)
+        self.creators[1].followers.clear()
+        self.assertCounts(0, 0)
+
+    def test_incremental_matches_recompute(self):
+        self.fans[0].follows.add(*self.creators)
+        self.creators[0].followers.add(self.fans[1])
+        self.fans[0].follows.remove(self.creators[1])
+        incremental = list(User.objects.order_by('pk').values_list('followers_count', flat=True))
+        recompute_user_stats()
+        self.assertEqual(list(User.objects.order_by('pk').values_list('followers_count', flat=True)), incremental)
+
+
+class StaleUserSaveTests(TestCase):
+    """Sauvegarder un User chargé avant un incrément concurrent ne ramène pas ses compteurs en arrière."""
+
+    def setUp(self):
+        self.creator = User.objects.create_user(username='creator', password='pwd', role='Creator')
+        self.other = User.objects.create_user(username='other', password='pwd', role='Creator')
+        self.fan = User.objects.create_user(username='fan', password='pwd')
+
+    def test_full_save_keeps_concurrent_increments(self):
+        user = User.objects.get(pk=self.creator.pk)
+        User.objects.filter(pk=user.pk).update(likes_received_count=F('likes_received_count') + 3)
+        self.fan.follows.add(self.creator)
+        user.first_name = 'Ada'
+        user.save()
+        fresh = User.objects.get(pk=user.pk)
+        self.assertEqual((fresh.first_name, fresh.followers_count, fresh.likes_received_count), ('Ada', 1, 3))
+
+    def test_follow_form_keeps_concurrent_follow(self):
+        self.client.force_login(self.creator)
+        clean = FollowUsersForm.clean
+
+        def clean_after_concurrent_follow(form):
+            # request.user est déjà chargé : un fan s'abonne entre-temps
+            self.fan.follows.add(self.creator)
+            return clean(form)
 
-# Create your tests here.
+        with mock.patch.object(FollowUsersForm, 'clean', clean_after_concurrent_follow):
+            response = self.client.post(reverse('follow_users'), {'follows': [self.other.pk]})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(self.creator.follows.all()), [self.other])
+        self.assertEqual(User.objects.get(pk=self.creator.pk).followers_count, 1)
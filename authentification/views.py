@@ -3,11 +3,12 @@ from django.contrib.auth import login, logout
 from django.views.generic import FormView, View
 from django.urls import reverse_lazy
 from django.contrib.auth.forms import AuthenticationForm
-from django.db import transaction, OperationalError
+from django.db import OperationalError
 from .forms import SignupForm
 from .validators import PASSWORD_CONDITIONS
 from .models import User
-import time
+from blog.metrics import SIGNUP_DB_RETRIES
+from blog.writes import atomic_with_retry
 
 
 class SignupPageView(FormView):
@@ -28,21 +29,20 @@ class SignupPageView(FormView):
     def form_valid(self, form):
         username = form.cleaned_data.get("username")
 
-        # Essayer jusqu'à 3 fois si la DB est lockée
-        for attempt in range(3):
-            try:
-                with transaction.atomic():
-                    if User.objects.filter(username=username).exists():
-                        form.add_error('username', 'Ce nom d’utilisateur existe déjà.')
-                        return self.form_invalid(form)
-                    user = form.save()
-                break
-            except OperationalError:
-                # petite pause avant de réessayer
-                time.sleep(0.1)
-        else:
+        def create():
+            if User.objects.filter(username=username).exists():
+                return None
+            return form.save()
+
+        # rejouée (backoff avec gigue) si la DB reste lockée au-delà du busy_timeout
+        try:
+            user = atomic_with_retry(create, on_retry=SIGNUP_DB_RETRIES.inc)
+        except OperationalError:
             form.add_error(None, "Impossible de créer le compte, réessayez plus tard.")
             return self.form_invalid(form)
+        if user is None:
+            form.add_error('username', 'Ce nom d’utilisateur existe déjà.')
+            return self.form_invalid(form)
 
         login(self.request, user)
         return super().form_valid(form)
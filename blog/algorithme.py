@@ -1,15 +1,22 @@
 # Ajoute/replace dans blog/algorithms.py
 from collections import Counter
-from random import sample, shuffle
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
+from operator import itemgetter
+import heapq
 import math
+import random
 
-from django.apps import apps
-from django.db.models import Count
-from django.utils import timezone
-from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Case, CharField, DateTimeField, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Least
 
 from . import models
+from .columns import np
+from .instrumentation import FeedTrace, emit
+from .pool import get_global_pool
+from .routers import read_from_replica
+from .stats import influence_for
+from .timelines import FANOUT_MAX_FOLLOWERS, followed_candidates
+from .view_events import load_viewed_filter, viewed_key
 
 # --- Hyperparamètres pour pourcentages (somme ≈ 100) ---
 # Ajuste ces valeurs pour changer la probabilité d'apparition de chaque type.
@@ -39,237 +46,244 @@ NEW_EXPOSURE_PERCENT = 15
 RECENT_LIKE_WINDOW_HOURS = 6
 DISCOVERY_RATIO = 0.20
 EXCLUDE_VIEWED_BY_DEFAULT = True
+# True : seules les photos déjà redimensionnées (processing_state='ready') entrent
+# dans le feed ; False : les originaux en attente sont servis, seuls les échecs sont exclus.
+REQUIRE_PROCESSED_IMAGES = False
 ALLOW_VIEWED_IF_INSUFFICIENT = True
 
+# --- Pondération utilisée par chaque bucket lors de l'échantillonnage ---
+# 'likes'     : proportionnel à 1 + likes du contenu
+# 'influence' : proportionnel à 1 + influence_score de l'uploader
+# None        : tirage uniforme
+BUCKET_WEIGHTING = {
+    'followed': 'influence',
+    'ultra_new': None,
+    'popular': 'likes',
+    'creator_discovery': 'influence',
+    'blogs': None,
+    'random': None,
+}
+# ordre de remplissage des buckets : les suivis d'abord, l'aléatoire en dernier
+BUCKET_PRIORITY = ['followed', 'ultra_new', 'popular', 'creator_discovery', 'blogs', 'random']
+
 # --- Fonction utilitaire: échantillonnage pondéré sans remise ---
-def weighted_sample_no_replace(items, weights, k):
+def weighted_sample_no_replace(items, weights, k, rng=None):
     """
     items: list
-    weights: list of same length (non-negative)
+    weights: list of same length (non-negative, None == 0)
     k: desired sample size
+    rng: instance random.Random optionnelle (tirages reproductibles), sinon module random
     Retourne up to k items sampled without replacement with probability proportionnelle aux weights.
-    Se dégrade en sample() si toutes les weights==0.
+
+    Algorithme d'Efraimidis–Spirakis : chaque item reçoit la clé u^(1/w)
+    (calculée en log : log(u)/w) et on garde les k plus grandes clés avec un
+    tas -> O(n log k). L'ordre retourné est celui d'un tirage séquentiel.
+    Les items de poids nul ne sont pris (uniformément) que pour compléter.
     """
     assert len(items) == len(weights)
     if k <= 0 or not items:
         return []
-    # si toutes les weights sont nulles, on fait un sample aléatoire simple
-    if all(w == 0 or w is None for w in weights):
-        try:
-            return sample(items, min(k, len(items)))
-        except ValueError:
-            return items[:min(k, len(items))]
-    pool = list(zip(items, weights))
-    chosen = []
-    # algorithme simple: itérer k fois, normaliser et choisir proportionnellement
-    for _ in range(min(k, len(pool))):
-        total = sum(w for (_, w) in pool if w > 0)
-        if total <= 0:
-            # finish with uniform sample
-            remaining = [it for it, _ in pool]
-            try:
-                s = sample(remaining, min(k - len(chosen), len(remaining)))
-            except ValueError:
-                s = remaining[:min(k - len(chosen), len(remaining))]
-            chosen.extend(s)
-            break
-        r = math.fsum([w for (_, w) in pool]) * 0.0  # avoid lint warning
-        # cumulate and pick
-        import random
-        pick = random.random() * total
-        acc = 0.0
-        for i, (it, w) in enumerate(pool):
-            if w <= 0:
-                continue
-            acc += w
-            if pick <= acc:
-                chosen.append(it)
-                pool.pop(i)
-                break
+    rng = rng or random
+    k = min(k, len(items))
+
+    keyed = []
+    zero = []
+    for it, w in zip(items, weights):
+        if w is not None and w > 0:
+            # 1.0 - random() est dans ]0, 1] : log() toujours défini
+            keyed.append((math.log(1.0 - rng.random()) / w, it))
+        else:
+            zero.append(it)
+
+    chosen = [it for _, it in heapq.nlargest(k, keyed, key=itemgetter(0))]
+    if len(chosen) < k and zero:
+        chosen.extend(rng.sample(zero, min(k - len(chosen), len(zero))))
     return chosen
 
+# --- Génération des candidats (SQL) ---
+def _top_liked_ids(photos):
+    """
+    Ids des CANDIDATE_TOP_LIKED photos les plus likées (au moins un like),
+    plus récentes d'abord à égalité : sous-requête LIMIT sur l'index de
+    Photo.likes_count, ensemble borné même avec des ex aequo.
+    """
+    return (photos.filter(likes_count__gt=0)
+            .order_by('-likes_count', '-date_created')
+            .values('id')[:CANDIDATE_TOP_LIKED])
+
+
+def _latest_blogs_cutoff(recent_cutoff):
+    """
+    Borne basse de date des billets candidats : la plus ancienne de
+    `recent_cutoff` et de la date du CANDIDATE_TOP_LIKED-ième billet le plus
+    récent (LIMIT 1 OFFSET n-1 sur l'index de date ; ex aequo compris).
+    Sans cette date (moins de CANDIDATE_TOP_LIKED billets), tous les billets.
+    """
+    nth = models.Blog.objects.order_by('-date_created').values('date_created')[CANDIDATE_TOP_LIKED - 1:CANDIDATE_TOP_LIKED]
+    oldest = Value(datetime.min.replace(tzinfo=dt_timezone.utc), output_field=DateTimeField())
+    return Least(Value(recent_cutoff, output_field=DateTimeField()), Coalesce(Subquery(nth), oldest))
+
+
+def _source_rank(now, top_ids):
+    """
+    0 = ultra_new, 1 = top par likes, 2 = récent : ordre de priorité du pool.
+    Le top (au plus CANDIDATE_TOP_LIKED) passe avant les récentes : les
+    photos anciennes très likées survivent à la coupe CANDIDATE_MAX.
+    """
+    return Case(
+        When(date_created__gte=now - timedelta(hours=NEW_UPLOAD_WINDOW_HOURS), then=Value(0)),
+        When(id__in=top_ids, then=Value(1)),
+        default=Value(2),
+    )
+
+
+def candidate_rows_for(now):
+    """
+    Retourne le pool de candidats sous forme de tuples
+    (kind, id, uploader_id, date_created, likes_count), au plus CANDIDATE_MAX.
+
+    Photos : ultra_new ∪ top CANDIDATE_TOP_LIKED par likes ∪ récentes, en UNE
+    requête (top en sous-requête sur l'index likes_count, trié par likes ;
+    filtre et ordre de priorité en SQL).
+    Blogs : récents ∪ CANDIDATE_TOP_LIKED derniers, pour compléter le pool
+    (une plage sur l'index de date, voir _latest_blogs_cutoff).
+    Chaque contenu n'apparaît qu'une fois (une ligne par objet).
+    """
+    recent_cutoff = now - timedelta(days=CANDIDATE_RECENT_DAYS)
+    if REQUIRE_PROCESSED_IMAGES:
+        photos = models.Photo.objects.filter(processing_state=models.Photo.PROCESSING_READY)
+    else:
+        photos = models.Photo.objects.exclude(processing_state=models.Photo.PROCESSING_FAILED)
+
+    top_ids = _top_liked_ids(photos)
+    photo_rows = list(
+        photos
+        .annotate(source=_source_rank(now, top_ids),
+                  top_likes=Case(When(source=1, then='likes_count'), default=Value(0)))
+        .filter(Q(date_created__gte=recent_cutoff) | Q(id__in=top_ids))
+        .order_by('source', '-top_likes', '-date_created')
+        .values_list(Value('photo', output_field=CharField()), 'id', 'uploader_id', 'date_created', 'likes_count')
+        [:CANDIDATE_MAX]
+    )
+
+    remaining = CANDIDATE_MAX - len(photo_rows)
+    blog_rows = []
+    if remaining > 0:
+        blog_rows = list(
+            models.Blog.objects
+            .filter(date_created__gte=_latest_blogs_cutoff(recent_cutoff))
+            .order_by('-date_created')
+            .values_list(Value('blog', output_field=CharField()), 'id', 'author_id', 'date_created', Value(0))
+            [:remaining]
+        )
+    return photo_rows + blog_rows
+
+
+def hydrate_candidates(candidates):
+    """Charge les instances Photo/Blog des candidats retenus (2 requêtes max), ordre préservé."""
+    photo_ids = [c['id'] for c in candidates if c['kind'] == 'photo']
+    blog_ids = [c['id'] for c in candidates if c['kind'] == 'blog']
+    instances = {}
+    if photo_ids:
+        qs = models.Photo.objects.filter(id__in=photo_ids).select_related('uploader')
+        instances.update({('photo', p.id): p for p in qs})
+    if blog_ids:
+        qs = models.Blog.objects.filter(id__in=blog_ids).select_related('author')
+        instances.update({('blog', b.id): b for b in qs})
+    return [instances[(c['kind'], c['id'])] for c in candidates if (c['kind'], c['id']) in instances]
+
 # --- Fonction principale (version probabiliste par buckets) ---
-def compute_feed_for_user(user, limit=20):
-    now = timezone.now()
-    pct = _normalize_percentages(BUCKET_PERCENTAGES)
+def compute_feed_for_user(user, limit=20, rng=None, trace=None):
+    """
+    rng: instance random.Random optionnelle pour rendre le feed reproductible
+    (tests, benchmarks) ; par défaut un générateur neuf par appel.
+    trace: FeedTrace optionnelle (blog/instrumentation.py) ; les étapes y sont
+    mesurées (durée, requêtes, compteurs) puis passées aux hooks.
 
-    # --- Construire pool photo comme précédemment (avec tags si présents) ---
-    base_photo_qs = models.Photo.objects.select_related('uploader').annotate(likes_count=Count('likes'))
-    try:
-        models.Photo._meta.get_field('tags')
-        recent_photo_qs = base_photo_qs.filter(date_created__gte=now - timedelta(days=CANDIDATE_RECENT_DAYS)).prefetch_related('tags')
-        top_liked_photo_qs = base_photo_qs.order_by('-likes_count')[:CANDIDATE_TOP_LIKED].prefetch_related('tags')
-    except FieldDoesNotExist:
-        recent_photo_qs = base_photo_qs.filter(date_created__gte=now - timedelta(days=CANDIDATE_RECENT_DAYS))
-        top_liked_photo_qs = base_photo_qs.order_by('-likes_count')[:CANDIDATE_TOP_LIKED]
-
-    ultra_new_cutoff = now - timedelta(hours=NEW_UPLOAD_WINDOW_HOURS)
-    try:
-        ultra_new_photo_qs = base_photo_qs.filter(date_created__gte=ultra_new_cutoff).order_by('-date_created')
-    except Exception:
-        ultra_new_photo_qs = base_photo_qs.filter(date_created__gte=ultra_new_cutoff)
-
-    # --- Blogs (si disponibles) ---
-    recent_blog_qs = []
-    top_blog_qs = []
-    ultra_new_blog_qs = []
+    Étapes : pool -> profile -> followed -> buckets -> hydrate. Lectures sur
+    la réplique, sauf écriture récente de `user` (blog/routers.py).
+    """
+    rng = rng or random.Random()
+    trace = trace or FeedTrace()
     try:
-        Blog = apps.get_model('blog', 'Blog')
-        try:
-            base_blog_qs = Blog.objects.select_related('author').annotate(likes_count=Count('likes'))
-        except Exception:
-            base_blog_qs = Blog.objects.select_related('author')
-        recent_blog_qs = base_blog_qs.filter(date_created__gte=now - timedelta(days=CANDIDATE_RECENT_DAYS))
-        top_blog_qs = base_blog_qs.order_by('-date_created')[:CANDIDATE_TOP_LIKED]
-        ultra_new_blog_qs = base_blog_qs.filter(date_created__gte=ultra_new_cutoff).order_by('-date_created')
-    except LookupError:
-        pass
-
-    # --- Construire un pool mixte limité ---
-    candidate_map = {}
-    def _add(kind, obj):
-        key = (kind, obj.id)
-        if key not in candidate_map and len(candidate_map) < CANDIDATE_MAX:
-            candidate_map[key] = {
-                'kind': kind,
-                'obj': obj,
-                'uploader_id': getattr(obj, 'uploader_id', getattr(obj, 'author_id', None)),
-                'date_created': getattr(obj, 'date_created', None),
-                'likes_count': getattr(obj, 'likes_count', 0),
-            }
-
-    for p in list(ultra_new_photo_qs) + list(recent_photo_qs) + list(top_liked_photo_qs):
-        _add('photo', p)
-    for b in list(ultra_new_blog_qs) + list(recent_blog_qs) + list(top_blog_qs):
-        _add('blog', b)
-
-    all_candidates = list(candidate_map.values())
-    if not all_candidates:
+        with read_from_replica(user):
+            return _compute_feed(user, limit, rng, trace)
+    finally:
+        emit(trace)
+
+
+def _compute_feed(user, limit, rng, trace):
+    # --- Partie commune à tous les lecteurs : pool global partagé (blog/pool.py) ---
+    with trace.stage('pool') as stage:
+        global_pool = get_global_pool()
+        stage['candidates'] = len(global_pool.candidates)
+        stage['age_s'] = round(global_pool.age(), 1)
+    if not global_pool.candidates:
         # fallback comme avant
-        return list(models.Photo.objects.annotate(likes_count=Count('likes')).order_by('-date_created')[:limit])
-
-    # --- Pré-calculs uploader/author pour filtrages et scores simples ---
-    uploader_ids = {c['uploader_id'] for c in all_candidates if c['uploader_id'] is not None}
-    likes_per_uploader = {}
-    photos_per_uploader = {}
-    blogs_per_uploader = {}
-    recent_posts = {}
-    if uploader_ids:
-        try:
-            likes_qs = models.Like.objects.filter(photo__uploader_id__in=uploader_ids).values('photo__uploader_id').annotate(total_likes=Count('id'))
-            likes_per_uploader = {it['photo__uploader_id']: it['total_likes'] for it in likes_qs}
-        except Exception:
-            likes_per_uploader = {}
-        try:
-            pp = models.Photo.objects.filter(uploader_id__in=uploader_ids).values('uploader_id').annotate(photo_count=Count('id'))
-            photos_per_uploader = {it['uploader_id']: it['photo_count'] for it in pp}
-        except Exception:
-            photos_per_uploader = {}
-        try:
-            bb = models.Blog.objects.filter(author_id__in=uploader_ids).values('author_id').annotate(blog_count=Count('id'))
-            blogs_per_uploader = {it['author_id']: it['blog_count'] for it in bb}
-        except Exception:
-            blogs_per_uploader = {}
-        recent_cutoff_global = now - timedelta(days=30)
-        try:
-            rp = models.Photo.objects.filter(uploader_id__in=uploader_ids, date_created__gte=recent_cutoff_global).values('uploader_id').annotate(count=Count('id'))
-            for it in rp:
-                recent_posts[it['uploader_id']] = it['count']
-            rb = models.Blog.objects.filter(author_id__in=uploader_ids, date_created__gte=recent_cutoff_global).values('author_id').annotate(count=Count('id'))
-            for it in rb:
-                recent_posts[it['author_id']] = recent_posts.get(it['author_id'], 0) + it['count']
-        except Exception:
-            pass
-
-    uploader_stats = {}
-    for uid in uploader_ids:
-        total_likes = likes_per_uploader.get(uid, 0)
-        total_photos = photos_per_uploader.get(uid, 0)
-        total_blogs = blogs_per_uploader.get(uid, 0)
-        recent_count = recent_posts.get(uid, 0)
-        is_creator = total_blogs > 0
-        like_score = total_likes / (total_photos + 1)
-        activity_score = min(recent_count / 10.0, 1.0)
-        influence_score = like_score * 10.0 + activity_score * 20.0
-        uploader_stats[uid] = {
-            'is_creator': is_creator,
-            'influence_score': influence_score
-        }
-
-    # --- Profil utilisateur: follows, likes, vues ---
-    followed_user_ids = set()
-    user_liked_photo_ids = set()
-    user_liked_blog_ids = set()
-    viewed_items = set()
-    if user and user.is_authenticated:
-        try:
-            followed_user_ids = set(user.follows.values_list('id', flat=True))
-        except Exception:
-            followed_user_ids = set()
-        try:
-            user_liked_photo_ids = set(models.Like.objects.filter(user=user).values_list('photo_id', flat=True))
-        except Exception:
-            user_liked_photo_ids = set()
-        try:
-            BlogLike = apps.get_model('blog', 'BlogLike')
-            user_liked_blog_ids = set(BlogLike.objects.filter(user=user).values_list('blog_id', flat=True))
-        except Exception:
-            user_liked_blog_ids = set()
-        try:
-            PhotoView = apps.get_model('blog', 'PhotoView')
-            for pid in PhotoView.objects.filter(user=user).values_list('photo_id', flat=True):
-                viewed_items.add(('photo', pid))
-        except Exception:
-            pass
-        try:
-            BlogView = apps.get_model('blog', 'BlogView')
-            for bid in BlogView.objects.filter(user=user).values_list('blog_id', flat=True):
-                viewed_items.add(('blog', bid))
-        except Exception:
-            pass
+        with trace.stage('fallback'):
+            return list(models.Photo.objects.order_by('-date_created')[:limit])
 
-    # --- Construire pools selon buckets ---
-    pools = {
-        'followed': [],
-        'ultra_new': [],
-        'popular': [],
-        'creator_discovery': [],
-        'blogs': [],
-        'random': []
-    }
+    # --- Profil utilisateur : follows (et taille d'audience), filtre de vues ---
+    with trace.stage('profile') as stage:
+        followed_user_ids, pull_creator_ids, viewed_filter = load_profile(user)
+        stage['follows'] = len(followed_user_ids)
+
+    def is_viewed(c):
+        """O(1) par candidat ; faux positifs possibles (VIEWED_FILTER_ERROR_RATE)."""
+        return viewed_filter is not None and viewed_key(c['kind'], c['id']) in viewed_filter
+
+    desired_counts = bucket_counts(limit)
 
-    # helper pour déterminer ultra_new / popular etc.
-    for c in all_candidates:
-        kind = c['kind']
-        obj = c['obj']
-        uid = c['uploader_id']
-        # is followed?
-        if uid in followed_user_ids:
-            pools['followed'].append(c)
-        # ultra new (recent)
-        try:
-            if c['date_created'] and (now - c['date_created']).total_seconds() <= NEW_UPLOAD_WINDOW_HOURS * 3600:
-                pools['ultra_new'].append(c)
-        except Exception:
-            pass
-        # popular (by likes_count)
-        try:
-            if (c.get('likes_count') or 0) >= 10:  # seuil simple, ajuste-le
-                pools['popular'].append(c)
-        except Exception:
-            pass
-        # creator non followed
-        if uid not in followed_user_ids and uploader_stats.get(uid, {}).get('is_creator', False):
-            pools['creator_discovery'].append(c)
-        # blogs
-        if kind == 'blog':
-            pools['blogs'].append(c)
-        # random pool will include everything; we'll filter later
-        pools['random'].append(c)
-
-    # --- Calculer le nombre d'items à prendre par bucket (arrondi) ---
+    # --- Bucket 'followed' : timeline de l'utilisateur (blog/timelines.py), lecture bornée ---
+    with trace.stage('followed') as stage:
+        followed = []
+        if followed_user_ids:
+            timeline = followed_candidates(user.id, pull_creator_ids, require_processed=REQUIRE_PROCESSED_IMAGES)
+            uploader_stats = influence_for({c['uploader_id'] for c in timeline})
+            followed = take_candidates(timeline, desired_counts['followed'], BUCKET_WEIGHTING['followed'],
+                                       uploader_stats, is_viewed, set(), rng)
+            stage['candidates'] = len(timeline)
+        stage['selected'] = len(followed)
+
+    # --- Autres buckets : vectorisés si le pool a ses colonnes (NumPy), sinon en Python ---
+    with trace.stage('buckets') as stage:
+        if global_pool.columns is not None:
+            selected = select_from_columns(global_pool, followed_user_ids, viewed_filter, desired_counts, limit, rng,
+                                           preselected=followed)
+        else:
+            selected = select_from_candidates(global_pool, followed_user_ids, is_viewed, desired_counts, limit, rng,
+                                              preselected=followed)
+        stage['vectorized'] = int(global_pool.columns is not None)
+        stage['selected'] = len(selected)
+
+    # --- Retourner les instances (Photo/Blog) : hydratation des seuls items retenus ---
+    with trace.stage('hydrate') as stage:
+        items = hydrate_candidates(selected[:limit])
+        stage['items'] = len(items)
+    return items
+
+
+def load_profile(user):
+    """
+    Données personnelles du lecteur : (ids suivis, ids suivis lus à la demande,
+    filtre de vues ou None). Anonyme : rien à charger.
+    """
+    if not (user and user.is_authenticated):
+        return set(), set(), None
+    follows = list(user.follows.values_list('id', 'followers_count'))
+    followed_user_ids = {uid for uid, _ in follows}
+    # créateurs hors fan-out (trop d'abonnés) : lus à la demande
+    pull_creator_ids = {uid for uid, n in follows if n > FANOUT_MAX_FOLLOWERS}
+    # filtre de Bloom tenu à jour par blog/view_events.py : une requête,
+    # taille bornée quel que soit l'historique de vues
+    viewed_filter = load_viewed_filter(user.id) if EXCLUDE_VIEWED_BY_DEFAULT else None
+    return followed_user_ids, pull_creator_ids, viewed_filter
+
+
+def bucket_counts(limit):
+    """Nombre d'items à prendre par bucket (arrondi), de somme exactement `limit`."""
+    pct = _normalize_percentages(BUCKET_PERCENTAGES)
     desired_counts = {}
-    remaining_slots = limit
     # compute raw counts
     for k, p in pct.items():
         desired_counts[k] = int(round(limit * (p / 100.0)))
@@ -290,79 +304,148 @@ def compute_feed_for_user(user, limit=20):
                     desired_counts[key] -= 1
                     diff += 1
             i += 1
+    return desired_counts
+
+
+# --- Sélection en Python pur (candidats sous forme de dicts) ---
+def candidate_weights(candidates, weighting, uploader_stats):
+    """Poids d'échantillonnage des candidats selon BUCKET_WEIGHTING."""
+    if weighting == 'likes':
+        return [1.0 + (c.get('likes_count') or 0) for c in candidates]
+    if weighting == 'influence':
+        return [1.0 + uploader_stats.get(c['uploader_id'], {}).get('influence_score', 0.0) for c in candidates]
+    return [1.0] * len(candidates)
+
+
+def take_candidates(candidates, need, weighting, uploader_stats, is_viewed, selected_keys, rng):
+    """
+    Tire jusqu'à `need` candidats absents de `selected_keys` (mis à jour),
+    en priorisant les non-vus, puis les vus si ALLOW_VIEWED_IF_INSUFFICIENT.
+    """
+    if not candidates or need <= 0:
+        return []
+    non_viewed, viewed = [], []
+    for c in candidates:
+        if (c['kind'], c['id']) not in selected_keys:
+            (viewed if is_viewed(c) else non_viewed).append(c)
+    picked = weighted_sample_no_replace(non_viewed, candidate_weights(non_viewed, weighting, uploader_stats), need, rng=rng)
+    if len(picked) < need and ALLOW_VIEWED_IF_INSUFFICIENT:
+        picked.extend(weighted_sample_no_replace(viewed, candidate_weights(viewed, weighting, uploader_stats),
+                                                 need - len(picked), rng=rng))
+    selected_keys.update((c['kind'], c['id']) for c in picked)
+    return picked
+
+
+def select_from_candidates(global_pool, followed_user_ids, is_viewed, desired_counts, limit, rng, preselected=()):
+    """
+    Complète `preselected` (bucket 'followed', déjà tiré) avec les autres
+    buckets du pool global. Retourne les candidats retenus (dicts), mélangés.
+    """
+    all_candidates = global_pool.candidates
+    uploader_stats = global_pool.uploader_stats
+
+    # --- Construire pools selon buckets ---
+    # découpage pré-calculé dans le pool global ; seul creator_discovery
+    # dépend des suivis (coût borné par la taille du pool)
+    pools = {
+        'ultra_new': global_pool.ultra_new,
+        'popular': global_pool.popular,
+        'creator_discovery': [c for c in global_pool.creators if c['uploader_id'] not in followed_user_ids],
+        'blogs': global_pool.blogs,
+        'random': all_candidates,
+    }
 
     # --- Sélection par bucket (d'abord essayer de prendre items non-vus) ---
-    selected = []
-    selected_keys = set()
-
-    def take_from_pool(pool, need):
-        """
-        Prend jusqu'à `need` items depuis pool en priorisant non-vus, puis vus si autorisé.
-        Pool = list of candidate dicts.
-        """
-        nonlocal selected, selected_keys
-        if not pool or need <= 0:
-            return []
-        # prefer non-vus
-        non_viewed = [c for c in pool if (c['kind'], c['obj'].id) not in viewed_items and (c['kind'], c['obj'].id) not in selected_keys]
-        viewed = [c for c in pool if (c['kind'], c['obj'].id) in viewed_items and (c['kind'], c['obj'].id) not in selected_keys]
-        picked = []
-        # random pick from non_viewed
-        try:
-            cnt = min(len(non_viewed), need)
-            if cnt > 0:
-                # sample uniformly; could be replaced by weighted_sample_no_replace using influence or likes
-                sampled = sample(non_viewed, cnt)
-                picked.extend(sampled)
-        except ValueError:
-            sampled = non_viewed[:min(len(non_viewed), need)]
-            picked.extend(sampled)
-        if len(picked) < need and ALLOW_VIEWED_IF_INSUFFICIENT:
-            need2 = need - len(picked)
-            try:
-                cnt2 = min(len(viewed), need2)
-                if cnt2 > 0:
-                    sampled2 = sample(viewed, cnt2)
-                    picked.extend(sampled2)
-            except ValueError:
-                picked.extend(viewed[:min(len(viewed), need2)])
-        # mark selected
-        for c in picked:
-            selected.append(c)
-            selected_keys.add((c['kind'], c['obj'].id))
-        return picked
-
-    # iterate buckets in order of importance to prefer followed first, etc.
-    bucket_priority = ['followed', 'ultra_new', 'popular', 'creator_discovery', 'blogs', 'random']
-    for b in bucket_priority:
-        need = desired_counts.get(b, 0)
-        pool = pools.get(b, [])
-        take_from_pool(pool, need)
+    selected = list(preselected)
+    selected_keys = {(c['kind'], c['id']) for c in selected}
+
+    # iterate buckets in order of importance ('followed' : déjà tiré)
+    for b in BUCKET_PRIORITY:
+        if b in pools:
+            selected += take_candidates(pools[b], desired_counts.get(b, 0), BUCKET_WEIGHTING.get(b),
+                                        uploader_stats, is_viewed, selected_keys, rng)
 
     # --- if we didn't reach limit, fill from remaining non-selected non-viewed, then viewed if allowed ---
     if len(selected) < limit:
         remaining_needed = limit - len(selected)
-        remaining_candidates = [c for c in all_candidates if (c['kind'], c['obj'].id) not in selected_keys]
+        remaining_candidates = [c for c in all_candidates if (c['kind'], c['id']) not in selected_keys]
         # prefer non-viewed first
-        non_viewed_rem = [c for c in remaining_candidates if (c['kind'], c['obj'].id) not in viewed_items]
-        try:
-            add = sample(non_viewed_rem, min(remaining_needed, len(non_viewed_rem)))
-        except ValueError:
-            add = non_viewed_rem[:min(remaining_needed, len(non_viewed_rem))]
+        non_viewed_rem, viewed_rem = [], []
+        for c in remaining_candidates:
+            (viewed_rem if is_viewed(c) else non_viewed_rem).append(c)
+        add = rng.sample(non_viewed_rem, min(remaining_needed, len(non_viewed_rem)))
         for c in add:
-            selected.append(c); selected_keys.add((c['kind'], c['obj'].id))
+            selected.append(c); selected_keys.add((c['kind'], c['id']))
         remaining_needed = limit - len(selected)
         if remaining_needed > 0 and ALLOW_VIEWED_IF_INSUFFICIENT:
-            viewed_rem = [c for c in remaining_candidates if (c['kind'], c['obj'].id) in viewed_items]
-            try:
-                add2 = sample(viewed_rem, min(remaining_needed, len(viewed_rem)))
-            except ValueError:
-                add2 = viewed_rem[:min(remaining_needed, len(viewed_rem))]
+            add2 = rng.sample(viewed_rem, min(remaining_needed, len(viewed_rem)))
             for c in add2:
-                selected.append(c); selected_keys.add((c['kind'], c['obj'].id))
+                selected.append(c); selected_keys.add((c['kind'], c['id']))
 
     # --- Mélange final pour donner l'aspect aléatoire demandé ---
-    shuffle(selected)
+    rng.shuffle(selected)
+    return selected
+
+
+# --- Sélection vectorisée (colonnes NumPy, blog/columns.py) ---
+def _sample_indices(available, weights, need, gen):
+    """
+    Efraimidis–Spirakis vectorisé : clé log(u)/w pour chaque indice disponible,
+    puis les `need` plus grandes clés (argpartition, O(n)). Tirage uniforme sans poids.
+    """
+    idx = np.flatnonzero(available)
+    if need <= 0 or not idx.size:
+        return idx[:0]
+    if idx.size <= need:
+        return idx
+    if weights is None:
+        return gen.choice(idx, size=need, replace=False)
+    keys = np.log1p(-gen.random(idx.size)) / weights[idx]
+    return idx[np.argpartition(-keys, need - 1)[:need]]
+
+
+def select_from_columns(global_pool, followed_user_ids, viewed_filter, desired_counts, limit, rng, preselected=()):
+    """
+    Même sélection que select_from_candidates, par masques booléens sur les
+    colonnes du pool : pas de dict ni de liste intermédiaire par candidat.
+    Retourne les candidats retenus (dicts du pool + `preselected`), mélangés.
+    """
+    cols = global_pool.columns
+    # générateur NumPy dérivé de `rng` : feed reproductible à graine égale
+    gen = np.random.default_rng(rng.getrandbits(64))
+    followed = cols.followed_mask(followed_user_ids)
+    viewed = cols.viewed_mask(viewed_filter)
+    buckets = {
+        'ultra_new': cols.ultra_new,
+        'popular': cols.popular,
+        'creator_discovery': cols.is_creator & ~followed,
+        'blogs': cols.blogs,
+        'random': None,  # tout le pool
+    }
+    free = np.ones(len(cols), dtype=bool)  # candidats pas encore retenus
+    for c in preselected:
+        i = global_pool.index.get((c['kind'], c['id']))
+        if i is not None:
+            free[i] = False
+    picked = []
+
+    def take(mask, need, weights):
+        available = free if mask is None else mask & free
+        chosen = _sample_indices(available & ~viewed, weights, need, gen)
+        if chosen.size < need and ALLOW_VIEWED_IF_INSUFFICIENT:
+            chosen = np.concatenate([chosen, _sample_indices(available & viewed, weights, need - chosen.size, gen)])
+        free[chosen] = False
+        picked.append(chosen)
+        return chosen.size
+
+    total = len(preselected)
+    for b in BUCKET_PRIORITY:
+        if b in buckets:
+            total += take(buckets[b], desired_counts.get(b, 0), cols.weights[BUCKET_WEIGHTING.get(b)])
+    if total < limit:
+        take(None, limit - total, None)
 
-    # --- Retourner les instances (Photo/Blog) ---
-    return [c['obj'] for c in selected[:limit]]
\ No newline at end of file
+    candidates = global_pool.candidates
+    selected = list(preselected) + [candidates[i] for i in np.concatenate(picked).tolist()]
+    rng.shuffle(selected)
+    return selected
@@ -0,0 +1,122 @@
+# blog/anonymous_feed.py
+"""
+Accueil des visiteurs anonymes : un feed partagé, calculé une fois par
+intervalle.
+
+Le contenu (les ANONYMOUS_FEED_SIZE photos les plus récentes, hors échec
+de traitement) est le même pour tous les visiteurs : il est construit une
+fois puis servi depuis la mémoire du processus ou le cache partagé, pour la
+page HTML (instances Photo, données de card attachées) comme pour le scroll
+JSON (items déjà sérialisés, rien de "liké").
+
+Anti-rafale (lien partagé, pic de trafic anonyme) :
+  - génération fraîche pendant ANONYMOUS_FEED_FRESH_SECONDS ;
+  - ensuite périmée mais servable jusqu'à ANONYMOUS_FEED_STALE_SECONDS
+    (stale-while-revalidate) : une seule requête la reconstruit, sous un
+    verrou `cache.add` commun à tous les processus (single-flight) ; les
+    autres servent l'ancienne génération sans attendre ;
+  - à froid (aucune génération servable), les requêtes sans le verrou
+    attendent au plus ANONYMOUS_FEED_WAIT_SECONDS la génération en cours
+    plutôt que de la recalculer chacune.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .metrics import ANONYMOUS_FEED
+from .models import Photo
+from .prefetch import attach_card_data
+from .serializers import serialize_photos
+from .utils import publications_time
+
+# --- Hyperparamètres ---
+ANONYMOUS_FEED_SIZE = 100
+ANONYMOUS_FEED_FRESH_SECONDS = getattr(settings, 'ANONYMOUS_FEED_FRESH_SECONDS', 30)
+ANONYMOUS_FEED_STALE_SECONDS = 300    # au-delà, plus rien n'est servi sans reconstruction
+ANONYMOUS_FEED_LOCK_SECONDS = 30      # verrou rendu de lui-même si son détenteur meurt en route
+ANONYMOUS_FEED_WAIT_SECONDS = 2.0
+ANONYMOUS_FEED_POLL_SECONDS = 0.05
+
+_FEED_KEY = "feed:anonymous"
+_LOCK_KEY = "feed:anonymous:lock"
+
+_local = None
+
+
+class AnonymousFeed:
+    """Une génération : photos prêtes pour les templates et leurs items JSON, dans le même ordre."""
+
+    def __init__(self, photos, items):
+        self.photos = photos
+        self.items = items
+        self.built_at = timezone.now()
+
+    def age(self, now=None):
+        return ((now or timezone.now()) - self.built_at).total_seconds()
+
+    def page(self, start, end):
+        """Items JSON [start:end], date relative recalculée à la lecture."""
+        return [dict(item, date_facebook=publications_time(photo.date_created))
+                for item, photo in zip(self.items[start:end], self.photos[start:end])]
+
+
+def build_feed():
+    photos = list(Photo.objects.select_related("uploader")
+                  .exclude(processing_state=Photo.PROCESSING_FAILED)
+                  .order_by("-date_created")[:ANONYMOUS_FEED_SIZE])
+    items = serialize_photos(photos, None)
+    # billet lié, tags, profile_url pour le rendu HTML (tags déjà préchargés si cards construites)
+    attach_card_data(photos, None)
+    return AnonymousFeed(photos, items)
+
+
+def _servable(feed, now, max_age):
+    return feed is not None and feed.age(now) < max_age
+
+
+def get_anonymous_feed():
+    """Génération à servir : fraîche, sinon périmée pendant qu'une seule requête reconstruit."""
+    global _local
+    now = timezone.now()
+    feed = _local
+    if not _servable(feed, now, ANONYMOUS_FEED_FRESH_SECONDS):
+        shared = cache.get(_FEED_KEY)
+        if shared is not None and (feed is None or shared.built_at > feed.built_at):
+            feed = _local = shared
+    if _servable(feed, now, ANONYMOUS_FEED_FRESH_SECONDS):
+        ANONYMOUS_FEED.inc(result='fresh')
+        return feed
+
+    if cache.add(_LOCK_KEY, True, ANONYMOUS_FEED_LOCK_SECONDS):
+        try:
+            feed = _local = build_feed()
+            cache.set(_FEED_KEY, feed, ANONYMOUS_FEED_STALE_SECONDS)
+        finally:
+            cache.delete(_LOCK_KEY)
+        ANONYMOUS_FEED.inc(result='rebuild')
+        return feed
+    if _servable(feed, now, ANONYMOUS_FEED_STALE_SECONDS):
+        ANONYMOUS_FEED.inc(result='stale')
+        return feed
+
+    # à froid, reconstruction en cours ailleurs : on l'attend
+    deadline = time.monotonic() + ANONYMOUS_FEED_WAIT_SECONDS
+    while time.monotonic() < deadline:
+        time.sleep(ANONYMOUS_FEED_POLL_SECONDS)
+        shared = cache.get(_FEED_KEY)
+        if _servable(shared, timezone.now(), ANONYMOUS_FEED_STALE_SECONDS):
+            _local = shared
+            ANONYMOUS_FEED.inc(result='wait')
+            return shared
+    # détenteur du verrou trop lent : calcul pour cette requête seulement
+    ANONYMOUS_FEED.inc(result='rebuild')
+    return build_feed()
+
+
+def reset_anonymous_feed():
+    """Oublie la génération en mémoire et partagée (tests, commandes)."""
+    global _local
+    _local = None
+    cache.delete(_FEED_KEY)
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        import blog.signals  # <- branche les signaux (invalidation du feed)
+        from blog import instrumentation, metrics
+        instrumentation.add_hook(metrics.record_feed_trace)
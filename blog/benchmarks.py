@@ -0,0 +1,65 @@
+# blog/benchmarks.py
+"""
+Outils communs aux commandes de benchmark (bench_suite, bench_concurrent_writes) :
+base SQLite isolée, percentiles, révision git du code mesuré.
+"""
+import statistics
+import subprocess
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.management.base import CommandError
+from django.db import connection
+
+from . import view_events
+
+
+def percentiles(samples_ms):
+    """p50 / p95 / p99 (interpolation linéaire entre les rangs, comme numpy par défaut)."""
+    if len(samples_ms) == 1:
+        return {f'p{q}_ms': round(samples_ms[0], 3) for q in (50, 95, 99)}
+    cuts = statistics.quantiles(samples_ms, n=100, method='inclusive')
+    return {f'p{q}_ms': round(cuts[q - 1], 3) for q in (50, 95, 99)}
+
+
+def summarize(samples_ms, queries):
+    return {
+        'iterations': len(samples_ms),
+        **percentiles(samples_ms),
+        'mean_ms': round(statistics.fmean(samples_ms), 3),
+        'min_ms': round(min(samples_ms), 3),
+        'max_ms': round(max(samples_ms), 3),
+        'queries_min': min(queries),
+        'queries_max': max(queries),
+        'queries_mean': round(statistics.fmean(queries), 2),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+@contextmanager
+def isolated_database(path, keepdb=False):
+    """
+    Bascule la connexion 'default' sur une base SQLite dédiée (`path`), migrée
+    comme une base de test ; supprimée à la sortie sauf `keepdb`.
+    """
+    if connection.vendor != 'sqlite':
+        raise CommandError("Les benchmarks ne savent isoler que des bases SQLite.")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    saved = test_settings.get('NAME')
+    test_settings['NAME'] = str(path)
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        # les impressions en attente visent la base de bench : à écrire avant de la quitter
+        view_events.flush()
+        connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=keepdb)
+        test_settings['NAME'] = saved
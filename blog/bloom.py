@@ -0,0 +1,147 @@
+# blog/bloom.py
+"""
+Filtre de Bloom extensible (scalable Bloom filter), sérialisable en bytes.
+
+Structure : une suite de tranches (filtres de Bloom classiques). Quand la
+tranche courante atteint sa capacité, on en ouvre une nouvelle, deux fois
+plus grande et avec un taux d'erreur deux fois plus faible : le taux de faux
+positifs global reste borné par `error_rate` quelle que soit la taille.
+Au-delà de `max_slices`, la plus ancienne tranche est oubliée : la mémoire
+est bornée, au prix d'"oublier" les éléments les plus anciens.
+
+Test d'appartenance en O(k) (k ≈ 7 pour 1 %) : un hash blake2b, puis
+double hachage h1 + i·h2 pour les k positions.
+"""
+import hashlib
+import math
+import struct
+
+_MAGIC = b'BLM1'
+_HEADER = struct.Struct('>4sBdI')      # magic, nb tranches, error_rate, capacité initiale
+_SLICE_HEADER = struct.Struct('>IIBI')  # capacité, nb éléments, k, m (bits)
+
+GROWTH = 2          # facteur de capacité entre deux tranches
+TIGHTENING = 0.5    # facteur du taux d'erreur entre deux tranches
+
+
+def _hashes(key):
+    digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'big'), int.from_bytes(digest[8:], 'big') | 1
+
+
+class _Slice:
+    __slots__ = ('capacity', 'count', 'k', 'm', 'bits')
+
+    def __init__(self, capacity, error_rate, count=0, k=None, m=None, bits=None):
+        self.capacity = capacity
+        self.count = count
+        if m is None:
+            m = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+            k = max(1, int(round(m / capacity * math.log(2))))
+        self.m = m
+        self.k = k
+        self.bits = bits if bits is not None else bytearray((m + 7) // 8)
+
+    def positions(self, h1, h2):
+        m = self.m
+        return [(h1 + i * h2) % m for i in range(self.k)]
+
+    def contains(self, h1, h2):
+        # s'arrête au premier bit à 0 (cas courant pour un élément absent)
+        bits, m = self.bits, self.m
+        for i in range(self.k):
+            p = (h1 + i * h2) % m
+            if not bits[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+    def add(self, h1, h2):
+        """Pose les bits ; retourne True si l'élément semblait absent."""
+        bits = self.bits
+        new = False
+        for p in self.positions(h1, h2):
+            byte, mask = p >> 3, 1 << (p & 7)
+            if not bits[byte] & mask:
+                bits[byte] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+
+class ScalableBloomFilter:
+    """Ensemble probabiliste de chaînes (pas de faux négatifs, sauf tranches oubliées)."""
+
+    def __init__(self, initial_capacity=1000, error_rate=0.01, max_slices=6):
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.max_slices = max_slices
+        self.slices = []
+
+    def _slice_error(self, index):
+        # somme géométrique : Σ p0·r^i <= p0 / (1 - r) = error_rate
+        return self.error_rate * (1 - TIGHTENING) * (TIGHTENING ** index)
+
+    def _writable_slice(self):
+        if self.slices and self.slices[-1].count < self.slices[-1].capacity:
+            return self.slices[-1]
+        index = len(self.slices)
+        capacity = self.initial_capacity * (GROWTH ** index)
+        self.slices.append(_Slice(capacity, self._slice_error(index)))
+        if len(self.slices) > self.max_slices:
+            self.slices.pop(0)
+        return self.slices[-1]
+
+    def __contains__(self, key):
+        h1, h2 = _hashes(key)
+        return any(s.contains(h1, h2) for s in reversed(self.slices))
+
+    def add(self, key):
+        """Ajoute `key` ; retourne False si elle était (probablement) déjà présente."""
+        h1, h2 = _hashes(key)
+        if any(s.contains(h1, h2) for s in self.slices):
+            return False
+        return self._writable_slice().add(h1, h2)
+
+    def update(self, keys):
+        return sum(1 for key in keys if self.add(key))
+
+    def __len__(self):
+        return sum(s.count for s in self.slices)
+
+    @property
+    def size_in_bytes(self):
+        return sum(len(s.bits) for s in self.slices)
+
+    def to_bytes(self):
+        parts = [_HEADER.pack(_MAGIC, len(self.slices), self.error_rate, self.initial_capacity)]
+        for s in self.slices:
+            parts.append(_SLICE_HEADER.pack(s.capacity, s.count, s.k, s.m))
+            parts.append(bytes(s.bits))
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data, max_slices=6):
+        """Relit un filtre sérialisé ; ValueError si le blob est invalide."""
+        data = bytes(data)
+        try:
+            magic, nslices, error_rate, initial_capacity = _HEADER.unpack_from(data, 0)
+        except struct.error as exc:
+            raise ValueError("filtre de Bloom tronqué") from exc
+        if magic != _MAGIC:
+            raise ValueError("format de filtre de Bloom inconnu")
+        bloom = cls(initial_capacity, error_rate, max_slices)
+        offset = _HEADER.size
+        for _ in range(nslices):
+            try:
+                capacity, count, k, m = _SLICE_HEADER.unpack_from(data, offset)
+            except struct.error as exc:
+                raise ValueError("filtre de Bloom tronqué") from exc
+            offset += _SLICE_HEADER.size
+            size = (m + 7) // 8
+            bits = bytearray(data[offset:offset + size])
+            if len(bits) != size:
+                raise ValueError("filtre de Bloom tronqué")
+            offset += size
+            bloom.slices.append(_Slice(capacity, error_rate, count=count, k=k, m=m, bits=bits))
+        return bloom
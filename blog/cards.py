@@ -0,0 +1,176 @@
+# blog/cards.py
+"""
+Cache en lecture traversante des données de card : photo, billet,
+utilisateur (uploader).
+
+Chaque objet a sa card, un dict indépendant du lecteur (ni état "liké", ni
+date relative), rangée sous `card:<kind>:<id>` dans le cache
+CARD_CACHE_ALIAS, avec la version CARD_VERSION : incrémentée quand le format
+d'une card change, les anciennes entrées ne sont plus lues.
+
+Lecture par lot : un get_many pour toutes les cards d'une page ; les
+manquantes sont construites en un nombre fixe de requêtes puis rangées par
+un set_many. Invalidation par signaux (blog/signals.py) sur Photo, Blog,
+Like et User, et explicite là où les écritures passent par update()
+(worker d'images, reconcile_likes). Compteur de hits/misses :
+fotoblog_card_cache_lookups_total (kind, result).
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+
+from .metrics import CARD_CACHE_LOOKUPS
+from .models import Blog, Photo
+from .prefetch import profile_url, profile_url_template, related_blogs
+from .renditions import image_sources
+
+# --- Hyperparamètres ---
+CARD_CACHE_ALIAS = 'cards'
+CARD_VERSION = 1
+CARD_CACHE_TIMEOUT = 600        # s : borne aussi la durée d'une card lue sur une réplique en retard
+
+_EMPTY_IMAGE = {"url": None, "srcset": {}}
+
+User = get_user_model()
+
+
+def card_cache():
+    """Cache CARD_CACHE_ALIAS (réglage CACHES), à défaut le cache par défaut."""
+    alias = getattr(settings, 'CARD_CACHE_ALIAS', CARD_CACHE_ALIAS)
+    return caches[alias if alias in settings.CACHES else DEFAULT_CACHE_ALIAS]
+
+
+def card_key(kind, obj_id):
+    return f"card:{kind}:{obj_id}"
+
+
+def read_through(kind, ids, build):
+    """
+    {id: card} pour `ids` : un get_many, puis build(ids manquants) -> {id: card}
+    pour les absentes, rangées par un set_many. Les objets introuvables
+    n'ont pas de card (absents du résultat).
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return {}
+    cache = card_cache()
+    found = cache.get_many([card_key(kind, i) for i in ids], version=CARD_VERSION)
+    cards = {i: found[card_key(kind, i)] for i in ids if card_key(kind, i) in found}
+    missing = [i for i in ids if i not in cards]
+    CARD_CACHE_LOOKUPS.inc(len(cards), kind=kind, result='hit')
+    if missing:
+        CARD_CACHE_LOOKUPS.inc(len(missing), kind=kind, result='miss')
+        built = build(missing)
+        cache.set_many({card_key(kind, i): card for i, card in built.items()},
+                       timeout=getattr(settings, 'CARD_CACHE_TIMEOUT', CARD_CACHE_TIMEOUT), version=CARD_VERSION)
+        cards.update(built)
+    return cards
+
+
+def invalidate(kind, ids):
+    """
+    Supprime les cards tout de suite, et de nouveau au COMMIT : une lecture
+    faite entre les deux (données pas encore validées) ne reste pas en cache.
+    """
+    keys = [card_key(kind, i) for i in ids if i is not None]
+    if not keys:
+        return
+
+    def delete():
+        card_cache().delete_many(keys, version=CARD_VERSION)
+
+    delete()
+    transaction.on_commit(delete)
+
+
+def invalidate_model(model, ids):
+    """invalidate() selon le modèle (Photo, Blog, User) ; sans effet pour les autres."""
+    kind = {Photo: 'photo', Blog: 'blog', User: 'user'}.get(model)
+    if kind is not None:
+        invalidate(kind, ids)
+
+
+# ======================================================
+# Construction des cards (objets absents du cache)
+# ======================================================
+def build_photo_cards(photos):
+    """Cards de photos déjà chargées : billet lié et tags en 2 requêtes pour tout le lot."""
+    related = related_blogs([p.id for p in photos])
+    prefetch_related_objects(photos, "tags")
+    cards = {}
+    for photo in photos:
+        image = image_sources(photo, "image") or _EMPTY_IMAGE
+        blog = related.get(photo.id)
+        cards[photo.id] = {
+            "id": photo.id,
+            "url": image["url"],
+            "srcset": image["srcset"],
+            "caption": photo.caption or "",
+            "uploader_id": photo.uploader_id,
+            "likes_count": photo.likes_count,
+            "date_created": photo.date_created,
+            "related_blog": {"id": blog.id, "title": blog.title} if blog else None,
+            "tags": [tag.name for tag in photo.tags.all()],
+        }
+    return cards
+
+
+def build_blog_cards(blogs):
+    prefetch_related_objects(blogs, "tags")
+    return {
+        blog.id: {
+            "id": blog.id,
+            "title": blog.title,
+            "author_id": blog.author_id,
+            "photo_id": blog.photo_id,
+            "date_created": blog.date_created,
+            "tags": [tag.name for tag in blog.tags.all()],
+        }
+        for blog in blogs
+    }
+
+
+def build_user_cards(users):
+    template = profile_url_template()
+    cards = {}
+    for user in users:
+        avatar = image_sources(user, "profile_photo", default="thumb")
+        cards[user.id] = {
+            "id": user.id,
+            "username": user.username,
+            "profile_photo": avatar["url"] if avatar else None,
+            "role": user.role or "",
+            "profile_url": profile_url(template, user.username),
+        }
+    return cards
+
+
+# ======================================================
+# Lecture traversante
+# ======================================================
+def _loader(model, instances, build):
+    """build() sur les instances déjà chargées, les autres lues en une requête."""
+    known = {obj.id: obj for obj in instances or ()}
+
+    def load(ids):
+        objects = [known[i] for i in ids if i in known]
+        rest = [i for i in ids if i not in known]
+        if rest:
+            objects += list(model.objects.filter(id__in=rest))
+        return build(objects)
+    return load
+
+
+def photo_cards(photo_ids, photos=None):
+    """{photo_id: card} ; `photos` : instances déjà chargées, utilisées pour les cards manquantes."""
+    return read_through('photo', photo_ids, _loader(Photo, photos, build_photo_cards))
+
+
+def blog_cards(blog_ids, blogs=None):
+    return read_through('blog', blog_ids, _loader(Blog, blogs, build_blog_cards))
+
+
+def user_cards(user_ids, users=None):
+    return read_through('user', user_ids, _loader(User, users, build_user_cards))
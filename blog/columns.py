@@ -0,0 +1,103 @@
+# blog/columns.py
+"""
+Représentation colonnaire du pool de candidats (NumPy).
+
+Au lieu d'une liste de dicts parcourue en Python à chaque feed, une
+génération du pool (blog/pool.py) porte des tableaux alignés :
+    kind, id, uploader, âge (s), likes, influence, is_creator
+    + hash blake2b (h1, h2) de la clé "kind:id" pour le filtre de vues
+et les masques booléens des buckets indépendants du lecteur. Par requête,
+il ne reste que deux masques (suivis, vus) et des tirages vectorisés
+(voir algorithme.select_from_columns).
+
+NumPy est une dépendance optionnelle : sans lui, HAS_NUMPY vaut False, le
+pool ne construit pas de colonnes et l'algorithme garde la sélection en
+Python pur.
+"""
+from .bloom import _hashes
+from .view_events import viewed_key
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    np = None
+
+HAS_NUMPY = np is not None
+
+KIND_CODES = {'photo': 0, 'blog': 1}
+NO_UPLOADER = -1
+
+
+class CandidateColumns:
+    """Colonnes d'une génération du pool ; l'indice i correspond à candidates[i]."""
+
+    def __init__(self, candidates, uploader_stats, built_at, new_upload_window_hours, popular_min_likes):
+        n = len(candidates)
+        now = built_at.timestamp()
+        uploaders = [c['uploader_id'] for c in candidates]
+        self.kind = np.fromiter((KIND_CODES[c['kind']] for c in candidates), dtype=np.int8, count=n)
+        self.ids = np.fromiter((c['id'] for c in candidates), dtype=np.int64, count=n)
+        self.uploader = np.fromiter((NO_UPLOADER if uid is None else uid for uid in uploaders), dtype=np.int64, count=n)
+        self.age_seconds = np.fromiter(
+            (now - c['date_created'].timestamp() if c['date_created'] else np.inf for c in candidates),
+            dtype=np.float64, count=n,
+        )
+        self.likes = np.fromiter((c['likes_count'] or 0 for c in candidates), dtype=np.int64, count=n)
+        self.influence = np.fromiter(
+            (uploader_stats.get(uid, {}).get('influence_score', 0.0) for uid in uploaders), dtype=np.float64, count=n,
+        )
+        self.is_creator = np.fromiter(
+            (uploader_stats.get(uid, {}).get('is_creator', False) for uid in uploaders), dtype=bool, count=n,
+        )
+        hashes = [_hashes(viewed_key(c['kind'], c['id'])) for c in candidates]
+        self.h1 = np.fromiter((h for h, _ in hashes), dtype=np.uint64, count=n)
+        self.h2 = np.fromiter((h for _, h in hashes), dtype=np.uint64, count=n)
+
+        # buckets indépendants du lecteur
+        self.ultra_new = self.age_seconds <= new_upload_window_hours * 3600
+        self.popular = self.likes >= popular_min_likes
+        self.blogs = self.kind == KIND_CODES['blog']
+        # pondérations de BUCKET_WEIGHTING ; None = tirage uniforme
+        self.weights = {
+            'likes': 1.0 + self.likes,
+            'influence': 1.0 + self.influence,
+            None: None,
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        arrays = (self.kind, self.ids, self.uploader, self.age_seconds, self.likes, self.influence,
+                  self.is_creator, self.h1, self.h2, self.ultra_new, self.popular, self.blogs,
+                  self.weights['likes'], self.weights['influence'])
+        return sum(a.nbytes for a in arrays)
+
+    def followed_mask(self, followed_user_ids):
+        if not followed_user_ids:
+            return np.zeros(len(self), dtype=bool)
+        followed = np.fromiter(followed_user_ids, dtype=np.int64, count=len(followed_user_ids))
+        return np.isin(self.uploader, followed)
+
+    def viewed_mask(self, bloom):
+        """
+        Appartenance au filtre de Bloom pour tous les candidats, sans boucle Python :
+        mêmes positions (h1 + i·h2) mod m que ScalableBloomFilter, calculées
+        sur h1 mod m et h2 mod m (< 2^32, pas de dépassement en int64).
+        """
+        n = len(self)
+        viewed = np.zeros(n, dtype=bool)
+        if bloom is None or not n:
+            return viewed
+        for s in bloom.slices:
+            m = np.uint64(s.m)
+            a = (self.h1 % m).astype(np.int64)
+            b = (self.h2 % m).astype(np.int64)
+            bits = np.frombuffer(bytes(s.bits), dtype=np.uint8)
+            hit = np.ones(n, dtype=bool)
+            for i in range(s.k):
+                p = (a + i * b) % s.m
+                hit &= ((bits[p >> 3] >> (p & 7)) & 1).astype(bool)
+            viewed |= hit
+        return viewed
@@ -1,11 +1,13 @@
-from django.db.models import Count
-
 def user_stats(request):
-    if request.user.is_authenticated:
-        user = request.user
-        followers_count = user.followers.count()
-        photos_count = user.photo_set.count()
-        likes_count = sum(photo.likes.count() for photo in user.photo_set.all())
+    """
+    Statistiques de l'utilisateur connecté, lues sur les compteurs
+    dénormalisés de User : aucune requête en plus du chargement de request.user.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        followers_count = user.followers_count
+        photos_count = user.photos_count
+        likes_count = user.likes_received_count
     else:
         followers_count = photos_count = likes_count = 0
 
@@ -14,6 +16,3 @@ def user_stats(request):
         'photos_count': photos_count,
         'likes_count': likes_count,
     }
-    
-    
-    
\ No newline at end of file
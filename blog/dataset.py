@@ -0,0 +1,275 @@
+# blog/dataset.py
+"""
+Jeux de données synthétiques, reproductibles (graine), pour les benchmarks
+(`manage.py generate_dataset`, `manage.py bench_suite`).
+
+Tout est écrit par bulk_create dans une transaction, avec un seul hachage
+de mot de passe partagé par tous les comptes. Les signaux ne sont donc pas
+déclenchés : les compteurs dénormalisés (Photo.likes_count,
+User.photos_count / followers_count / likes_received_count) sont calculés
+en mémoire pendant la génération, puis UploaderStats et les timelines sont
+reconstruits comme après un import (recompute_uploader_stats, backfill).
+
+Distribution : quelques créateurs concentrent les photos, les abonnés et
+les likes (poids en 1 / rang ** POPULARITY_EXPONENT) ; les dates sont
+plus denses vers le présent, pour que le bucket "ultra récent" soit peuplé.
+"""
+import random
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+from taggit.models import Tag, TaggedItem
+
+from .models import Blog, Like, Photo, TimelineEntry
+from .stats import recompute_uploader_stats
+from . import timelines
+
+User = get_user_model()
+
+# --- Hyperparamètres ---
+BULK_BATCH_SIZE = 1000
+POPULARITY_EXPONENT = 0.8
+CREATOR_PHOTO_SHARE = 0.8      # part des photos publiées par des créateurs
+DEFAULT_PASSWORD = "Bench1234"
+
+DATASET_PRESETS = {
+    'small': {'users': 200, 'creators': 20, 'photos': 2000, 'blogs': 200,
+              'likes': 10000, 'follows': 1000, 'tags': 50},
+    'medium': {'users': 2000, 'creators': 200, 'photos': 20000, 'blogs': 2000,
+               'likes': 100000, 'follows': 20000, 'tags': 200},
+    'large': {'users': 20000, 'creators': 1000, 'photos': 200000, 'blogs': 20000,
+              'likes': 1000000, 'follows': 200000, 'tags': 1000},
+}
+DATASET_FIELDS = ('users', 'creators', 'photos', 'blogs', 'likes', 'follows', 'tags')
+
+WORDS = ("lumière", "ville", "montagne", "portrait", "nuit", "mer", "forêt", "voyage", "street",
+         "café", "pluie", "hiver", "été", "architecture", "nature", "noir", "couleur", "marché")
+
+
+# ======================================================
+# Options des commandes
+# ======================================================
+def add_dataset_arguments(parser):
+    parser.add_argument('--size', choices=sorted(DATASET_PRESETS), default='small',
+                        help="Jeu de paramètres de départ (défaut : small).")
+    for field in DATASET_FIELDS:
+        parser.add_argument(f'--{field}', type=int, help=f"Surcharge du preset : nombre de {field}.")
+    parser.add_argument('--tags-per-item', type=int, default=2, help="Tags par photo / billet (au plus).")
+    parser.add_argument('--days', type=int, default=60, help="Ancienneté maximale des contenus, en jours.")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--prefix', default='bench', help="Préfixe des noms d'utilisateur générés.")
+
+
+def dataset_params(options):
+    """Paramètres effectifs : preset choisi, surchargé par les options explicites."""
+    params = dict(DATASET_PRESETS[options['size']])
+    for field in DATASET_FIELDS:
+        if options.get(field) is not None:
+            params[field] = options[field]
+    params['creators'] = min(params['creators'], params['users'])
+    for key in ('tags_per_item', 'days', 'seed', 'prefix'):
+        params[key] = options[key]
+    return params
+
+
+# ======================================================
+# Génération
+# ======================================================
+def _popularity(n):
+    """Poids cumulés 1 / rang ** POPULARITY_EXPONENT (pour rng.choices)."""
+    return list(accumulate(1 / (rank + 1) ** POPULARITY_EXPONENT for rank in range(n)))
+
+
+def _pairs(rng, target, draw, limit):
+    """Jusqu'à `target` couples distincts tirés par `draw()` (au plus `limit` possibles)."""
+    target = min(target, limit)
+    pairs = set()
+    attempts = 0
+    while len(pairs) < target and attempts < target * 10:
+        pair = draw()
+        if pair is not None:
+            pairs.add(pair)
+        attempts += 1
+    return sorted(pairs)
+
+
+def _build_timelines(photo_objs, photo_rows, blog_objs, blog_rows, follow_pairs, user_ids, user_counts):
+    """
+    Timelines des abonnés, telles que les laisseraient timelines.backfill()
+    puis trim_timelines() : les BACKFILL_PER_CREATOR dernières photos et
+    derniers billets de chaque créateur suivi (hors fan-out à la lecture), TIMELINE_MAX_LENGTH
+    au plus par abonné. Calculées en mémoire puis insérées par lots.
+    """
+    recent = {}
+    for obj, (author, date) in zip(photo_objs, photo_rows):
+        recent.setdefault((author, 'photo_id'), []).append((date, 'photo_id', obj.id))
+    for obj, (author, _, date) in zip(blog_objs, blog_rows):
+        recent.setdefault((author, 'blog_id'), []).append((date, 'blog_id', obj.id))
+    for items in recent.values():
+        items.sort(reverse=True)
+        del items[timelines.BACKFILL_PER_CREATOR:]
+
+    followed = {}
+    for follower, creator in follow_pairs:
+        if user_counts[creator]['followers_count'] <= timelines.FANOUT_MAX_FOLLOWERS:
+            followed.setdefault(follower, []).append(creator)
+
+    total = 0
+    batch = []
+    for follower, creators in followed.items():
+        entries = sorted(((*item, c) for c in creators for field in ('photo_id', 'blog_id')
+                          for item in recent.get((c, field), ())), reverse=True)
+        for date, field, object_id, creator in entries[:timelines.TIMELINE_MAX_LENGTH]:
+            batch.append(TimelineEntry(user_id=user_ids[follower], author_id=user_ids[creator],
+                                       date_created=date, **{field: object_id}))
+        if len(batch) >= BULK_BATCH_SIZE * 10:
+            total += len(TimelineEntry.objects.bulk_create(batch, batch_size=BULK_BATCH_SIZE))
+            batch = []
+    total += len(TimelineEntry.objects.bulk_create(batch, batch_size=BULK_BATCH_SIZE))
+    return total
+
+
+def generate(users, creators, photos, blogs, likes, follows, tags,
+             tags_per_item=2, days=60, seed=42, prefix='bench', password=DEFAULT_PASSWORD):
+    """
+    Crée le jeu de données et retourne le nombre de lignes par table.
+    Les `creators` premiers comptes sont créateurs ; lève ValueError si des
+    comptes `<prefix>_...` existent déjà.
+    """
+    if User.objects.filter(username__startswith=f"{prefix}_").exists():
+        raise ValueError(f"Des utilisateurs '{prefix}_*' existent déjà : changez de préfixe ou de base.")
+    rng = random.Random(seed)
+    now = timezone.now()
+    horizon = days * 86400
+
+    def past(after=None):
+        # densité croissante vers le présent ; `after` : pas avant cette date
+        age = rng.random() ** 2 * horizon
+        if after is not None:
+            age = min(age, (now - after).total_seconds())
+        return now - timedelta(seconds=age)
+
+    creator_weights = _popularity(creators)
+    creator_range = range(creators)
+
+    def pick_creator():
+        return rng.choices(creator_range, cum_weights=creator_weights)[0]
+
+    # --- contenus et relations, par index ---
+    photo_rows = []       # (uploader, date)
+    photos_by_user = {}
+    for i in range(photos):
+        uploader = pick_creator() if creators and rng.random() < CREATOR_PHOTO_SHARE else rng.randrange(users)
+        photo_rows.append((uploader, past()))
+        photos_by_user.setdefault(uploader, []).append(i)
+
+    blog_rows = []        # (author, photo index ou None, date)
+    for _ in range(blogs if creators else 0):
+        author = pick_creator()
+        own = photos_by_user.get(author)
+        photo = rng.choice(own) if own else None
+        blog_rows.append((author, photo, past(after=photo_rows[photo][1] if photo is not None else None)))
+
+    photo_weights = _popularity(photos)
+    photo_range = range(photos)
+    like_pairs = _pairs(
+        rng, likes,
+        lambda: (rng.choices(photo_range, cum_weights=photo_weights)[0], rng.randrange(users)),
+        photos * users,
+    ) if photos else []
+
+    def draw_follow():
+        follower, creator = rng.randrange(users), pick_creator()
+        return (follower, creator) if follower != creator else None
+
+    follow_pairs = _pairs(rng, follows, draw_follow, (users - 1) * creators) if creators else []
+
+    # --- compteurs dénormalisés ---
+    likes_count = [0] * photos
+    for photo, _ in like_pairs:
+        likes_count[photo] += 1
+    user_counts = [{'photos_count': 0, 'followers_count': 0, 'likes_received_count': 0} for _ in range(users)]
+    for i, (uploader, _) in enumerate(photo_rows):
+        user_counts[uploader]['photos_count'] += 1
+        user_counts[uploader]['likes_received_count'] += likes_count[i]
+    for _, creator in follow_pairs:
+        user_counts[creator]['followers_count'] += 1
+
+    hashed = make_password(password)
+    with transaction.atomic():
+        user_objs = User.objects.bulk_create(
+            [User(username=f"{prefix}_{i:06d}", email=f"{prefix}_{i:06d}@example.com", password=hashed,
+                  role=User.CREATOR if i < creators else User.SUBSCRIBER, **user_counts[i])
+             for i in range(users)],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        user_ids = [u.id for u in user_objs]
+
+        photo_objs = Photo.objects.bulk_create(
+            [Photo(image=f"{prefix}/{i}.jpg", caption=f"{rng.choice(WORDS)} {i}", uploader_id=user_ids[uploader],
+                   likes_count=likes_count[i], processing_state=Photo.PROCESSING_READY)
+             for i, (uploader, _) in enumerate(photo_rows)],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        blog_objs = Blog.objects.bulk_create(
+            [Blog(title=f"{rng.choice(WORDS).capitalize()} {i}", content=" ".join(rng.choices(WORDS, k=60)),
+                  author_id=user_ids[author], photo_id=photo_objs[photo].id if photo is not None else None)
+             for i, (author, photo, _) in enumerate(blog_rows)],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        # date_created est en auto_now_add : bulk_create l'écrase, on la repose ensuite
+        for obj, row in zip(photo_objs, photo_rows):
+            obj.date_created = row[1]
+        for obj, row in zip(blog_objs, blog_rows):
+            obj.date_created = row[2]
+        Photo.objects.bulk_update(photo_objs, ['date_created'], batch_size=BULK_BATCH_SIZE)
+        Blog.objects.bulk_update(blog_objs, ['date_created'], batch_size=BULK_BATCH_SIZE)
+
+        Like.objects.bulk_create(
+            [Like(photo_id=photo_objs[p].id, user_id=user_ids[u]) for p, u in like_pairs],
+            batch_size=BULK_BATCH_SIZE,
+        )
+        Follow = User.follows.through
+        Follow.objects.bulk_create(
+            [Follow(from_user_id=user_ids[f], to_user_id=user_ids[c]) for f, c in follow_pairs],
+            batch_size=BULK_BATCH_SIZE,
+        )
+
+        tagged = 0
+        if tags and tags_per_item:
+            tag_objs = Tag.objects.bulk_create(
+                [Tag(name=f"{prefix}-{WORDS[i % len(WORDS)]}-{i}", slug=f"{prefix}-{WORDS[i % len(WORDS)]}-{i}")
+                 for i in range(tags)],
+                batch_size=BULK_BATCH_SIZE,
+            )
+            tag_weights = _popularity(tags)
+            items = []
+            for model, objs in ((Photo, photo_objs), (Blog, blog_objs)):
+                content_type = ContentType.objects.get_for_model(model)
+                for obj in objs:
+                    chosen = set(rng.choices(range(tags), cum_weights=tag_weights, k=rng.randint(0, tags_per_item)))
+                    items += [TaggedItem(tag_id=tag_objs[t].id, content_type=content_type, object_id=obj.id)
+                              for t in chosen]
+            TaggedItem.objects.bulk_create(items, batch_size=BULK_BATCH_SIZE)
+            tagged = len(items)
+
+        # read models normalement tenus par les signaux
+        recompute_uploader_stats([user_ids[i] for i in set(photos_by_user) | {a for a, _, _ in blog_rows}])
+        timeline_entries = _build_timelines(photo_objs, photo_rows, blog_objs, blog_rows, follow_pairs,
+                                            user_ids, user_counts)
+
+    return {
+        'users': len(user_objs),
+        'photos': len(photo_objs),
+        'blogs': len(blog_objs),
+        'likes': len(like_pairs),
+        'follows': len(follow_pairs),
+        'tags': tags if tagged else 0,
+        'tagged_items': tagged,
+        'timeline_entries': timeline_entries,
+    }
@@ -0,0 +1,149 @@
+# blog/images.py
+"""
+Traitement des images hors requête.
+
+Les vues sauvegardent l'original et créent un ImageJob ; le worker
+(`manage.py process_images`) réclame les jobs par lots et produit les
+renditions (tailles/formats) dans un pool de processus, puis met à jour
+l'état des modèles. Un pool cassé (processus fils tué, par exemple par
+manque de mémoire sur une très grande image) fait échouer les jobs du lot
+via fail_job ; le worker recrée alors le pool.
+"""
+import time
+import uuid
+from concurrent.futures import BrokenExecutor
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import cards
+from .metrics import IMAGE_JOBS, IMAGE_RESIZE_DURATION
+from .models import ImageJob, Photo
+from .renditions import build_renditions, plan_renditions, render_renditions
+
+MAX_ATTEMPTS = 3
+STALE_AFTER = timedelta(minutes=10)   # job "processing" abandonné (worker mort)
+
+
+def claim_jobs(batch_size, worker_id=None):
+    """Réserve jusqu'à `batch_size` jobs en attente pour ce worker."""
+    worker_id = worker_id or uuid.uuid4().hex
+    now = timezone.now()
+    with transaction.atomic():
+        # jobs abandonnés par un worker arrêté en plein traitement
+        ImageJob.objects.filter(status=ImageJob.PROCESSING, date_claimed__lt=now - STALE_AFTER).update(
+            status=ImageJob.PENDING, worker=''
+        )
+        ids = list(ImageJob.objects.filter(status=ImageJob.PENDING).order_by('id').values_list('id', flat=True)[:batch_size])
+        ImageJob.objects.filter(id__in=ids, status=ImageJob.PENDING).update(
+            status=ImageJob.PROCESSING, worker=worker_id, date_claimed=now, attempts=F('attempts') + 1
+        )
+    return list(ImageJob.objects.filter(worker=worker_id, status=ImageJob.PROCESSING).select_related('content_type'))
+
+
+def job_source(job):
+    """
+    Retourne (nom_stockage, storage) du fichier ciblé par le job, ou
+    (None, None) si l'objet ou le fichier n'existe plus.
+    """
+    model = job.content_type.model_class()
+    name = model.objects.filter(pk=job.object_id).values_list(job.field_name, flat=True).first()
+    if not name:
+        return None, None
+    storage = model._meta.get_field(job.field_name).storage
+    return (name, storage) if storage.exists(name) else (None, None)
+
+
+def _set_photo_state(job, state):
+    if job.content_type.model_class() is Photo:
+        Photo.objects.filter(pk=job.object_id).update(processing_state=state)
+        cards.invalidate('photo', [job.object_id])
+
+
+def complete_job(job, renditions):
+    model = job.content_type.model_class()
+    renditions_field = model.RENDITIONS[job.field_name][0]
+    model.objects.filter(pk=job.object_id).update(**{renditions_field: renditions})
+    # update() sans signal : URLs de la card (photo ou avatar) à recalculer
+    cards.invalidate_model(model, [job.object_id])
+    ImageJob.objects.filter(pk=job.pk).update(status=ImageJob.DONE, error='', date_processed=timezone.now())
+    _set_photo_state(job, Photo.PROCESSING_READY)
+
+
+def fail_job(job, error):
+    """Remet le job en attente, ou le marque en échec après MAX_ATTEMPTS."""
+    final = job.attempts >= MAX_ATTEMPTS
+    ImageJob.objects.filter(pk=job.pk).update(
+        status=ImageJob.FAILED if final else ImageJob.PENDING,
+        worker='',
+        error=str(error)[:2000],
+        date_processed=timezone.now() if final else None,
+    )
+    if final:
+        _set_photo_state(job, Photo.PROCESSING_FAILED)
+
+
+def _job_error(job, error):
+    fail_job(job, error)
+    IMAGE_JOBS.inc(result='error')
+
+
+def process_batch(jobs, executor):
+    """
+    Traite un lot de jobs réservés avec `executor` (ProcessPoolExecutor ou
+    équivalent). Retourne (nb_ok, nb_erreurs, pool_cassé) : si pool_cassé,
+    `executor` n'accepte plus de tâches et doit être recréé ; les jobs
+    concernés sont repassés par fail_job (nouvel essai ou échec).
+    """
+    ok = errors = 0
+    broken = False
+    futures = []
+    for job in jobs:
+        name, storage = job_source(job)
+        if name is None:
+            _job_error(job, "fichier introuvable")
+            errors += 1
+            continue
+        sizes = job.content_type.model_class().RENDITIONS[job.field_name][1]
+        targets, names = plan_renditions(name, sizes, storage)
+        # durée soumission -> fin, mesurée à la complétion (pas dans l'ordre du lot)
+        submitted = time.perf_counter()
+        try:
+            future = executor.submit(render_renditions, storage.path(name), targets)
+        except Exception as e:
+            broken = broken or isinstance(e, BrokenExecutor)
+            _job_error(job, e)
+            errors += 1
+            continue
+        future.add_done_callback(lambda f, t=submitted: IMAGE_RESIZE_DURATION.observe(time.perf_counter() - t))
+        futures.append((job, names, future))
+
+    for job, names, future in futures:
+        try:
+            rendered_sizes = future.result()
+        except Exception as e:
+            broken = broken or isinstance(e, BrokenExecutor)
+            _job_error(job, e)
+            errors += 1
+        else:
+            complete_job(job, build_renditions(names, rendered_sizes))
+            IMAGE_JOBS.inc(result='ok')
+            ok += 1
+    return ok, errors, broken
+
+
+def enqueue_missing():
+    """Crée un job pour chaque image existante sans renditions (reprise de l'historique)."""
+    User = get_user_model()
+    count = 0
+    for model, field_name in ((Photo, 'image'), (User, 'profile_photo')):
+        renditions_field = model.RENDITIONS[field_name][0]
+        missing = (model.objects.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                   .filter(**{renditions_field: {}}).values_list('pk', flat=True))
+        for pk in missing.iterator():
+            ImageJob.enqueue(model(pk=pk), field_name)
+            count += 1
+    return count
@@ -0,0 +1,205 @@
+# blog/instrumentation.py
+"""
+Instrumentation du pipeline de feed (compute_feed_for_user).
+
+Le calcul est découpé en étapes nommées ; chaque étape est mesurée par
+FeedTrace.stage() : durée, nombre de requêtes SQL (execute_wrapper sur
+toutes les connexions, réplique comprise, donc aussi hors DEBUG) et compteurs libres (candidats, items retenus...).
+En fin de calcul, la trace est passée aux hooks enregistrés (add_hook) :
+par défaut, `histogram` agrège les durées par étape dans le processus.
+
+Exposition (staff ou DEBUG seulement) : en-tête Server-Timing sur la
+réponse, champ `feed_timings` du JSON, et `?profile=1` pour un profil
+cProfile de la requête (voir profile_response).
+"""
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+
+logger = logging.getLogger(__name__)
+
+# --- Hyperparamètres ---
+HISTOGRAM_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf'))
+PROFILE_TOP_FUNCTIONS = 60     # lignes du rapport cProfile
+PROFILE_QUERY_FLAG = 'profile'
+
+
+# ======================================================
+# Trace d'un calcul de feed
+# ======================================================
+class FeedTrace:
+    """Étapes mesurées d'un calcul : [{'name', 'ms', 'queries', ...compteurs}]."""
+
+    def __init__(self):
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name):
+        """
+        Mesure le bloc ; le dict produit accepte des compteurs :
+            with trace.stage('pool') as s:
+                s['candidates'] = len(pool.candidates)
+        """
+        record = {'name': name}
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        start = time.perf_counter()
+        try:
+            # lectures du feed sur la réplique (blog/routers.py) : toutes les connexions comptent
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(count))
+                yield record
+        finally:
+            record['ms'] = round((time.perf_counter() - start) * 1000, 3)
+            record['queries'] = queries
+            self.stages.append(record)
+
+    @property
+    def total_ms(self):
+        return round(sum(s['ms'] for s in self.stages), 3)
+
+    def as_dict(self):
+        return {'total_ms': self.total_ms, 'stages': self.stages}
+
+    def server_timing(self):
+        """Valeur d'en-tête Server-Timing (lisible dans l'onglet réseau du navigateur)."""
+        parts = []
+        for s in self.stages:
+            counters = ' '.join(f"{k}={v}" for k, v in s.items() if k not in ('name', 'ms'))
+            parts.append(f'feed-{s["name"]};dur={s["ms"]};desc="{counters}"')
+        return ', '.join(parts)
+
+
+# ======================================================
+# Hooks
+# ======================================================
+_hooks = []
+
+
+def add_hook(hook):
+    """`hook(trace)` est appelé après chaque calcul de feed instrumenté."""
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def remove_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def emit(trace):
+    for hook in list(_hooks):
+        try:
+            hook(trace)
+        except Exception:
+            # un hook défaillant ne doit pas casser le feed
+            logger.exception("Hook d'instrumentation du feed en échec : %r", hook)
+
+
+# ======================================================
+# Histogramme en mémoire du processus
+# ======================================================
+class StageHistogram:
+    """Répartition des durées par étape sur HISTOGRAM_BUCKETS_MS (bornes supérieures incluses)."""
+
+    def __init__(self, buckets=HISTOGRAM_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._data = {}
+
+    def observe(self, name, ms):
+        with self._lock:
+            data = self._data.setdefault(name, {'count': 0, 'sum_ms': 0.0, 'counts': [0] * len(self.buckets)})
+            data['count'] += 1
+            data['sum_ms'] += ms
+            for i, bound in enumerate(self.buckets):
+                if ms <= bound:
+                    data['counts'][i] += 1
+                    break
+
+    def __call__(self, trace):
+        for s in trace.stages:
+            self.observe(s['name'], s['ms'])
+        self.observe('total', trace.total_ms)
+
+    def quantile(self, name, q):
+        """Borne supérieure du bucket contenant le quantile q (approximation)."""
+        data = self._data.get(name)
+        if not data or not data['count']:
+            return None
+        rank = q * data['count']
+        seen = 0
+        for bound, n in zip(self.buckets, data['counts']):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.buckets[-1]
+
+    def snapshot(self):
+        with self._lock:
+            names = list(self._data)
+        return {
+            name: {
+                'count': self._data[name]['count'],
+                'mean_ms': round(self._data[name]['sum_ms'] / self._data[name]['count'], 3),
+                'p50_ms': self.quantile(name, 0.5),
+                'p95_ms': self.quantile(name, 0.95),
+                'buckets': dict(zip(map(str, self.buckets), self._data[name]['counts'])),
+            }
+            for name in names
+        }
+
+    def reset(self):
+        with self._lock:
+            self._data = {}
+
+
+histogram = StageHistogram()
+add_hook(histogram)
+
+
+# ======================================================
+# Exposition (staff / DEBUG)
+# ======================================================
+def timings_visible(request):
+    user = getattr(request, 'user', None)
+    return settings.DEBUG or bool(user is not None and user.is_staff)
+
+
+def profile_requested(request):
+    user = getattr(request, 'user', None)
+    return bool(request.GET.get(PROFILE_QUERY_FLAG)) and user is not None and user.is_staff
+
+
+def profile_response(handler):
+    """
+    Exécute `handler()` (qui retourne une réponse) sous cProfile et renvoie
+    le rapport texte, trié par temps cumulé, à la place de la réponse.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        response = handler()
+        if hasattr(response, 'render') and not getattr(response, 'is_rendered', True):
+            response.render()  # le rendu du template fait partie de la requête
+    finally:
+        profiler.disable()
+    out = io.StringIO()
+    stats = pstats.Stats(profiler, stream=out)
+    stats.sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+    return HttpResponse(f"statut de la réponse profilée : {response.status_code}\n\n{out.getvalue()}",
+                        content_type='text/plain; charset=utf-8')
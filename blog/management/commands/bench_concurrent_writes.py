@@ -0,0 +1,145 @@
+# blog/management/commands/bench_concurrent_writes.py
+import logging
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from blog import cards, metrics, pool, writes
+from blog.benchmarks import isolated_database, percentiles
+from blog.dataset import generate
+from blog.models import Photo
+
+User = get_user_model()
+
+# mode -> (OPTIONS de la connexion, rejeu sur verrou, écrivain unique)
+MODES = {
+    # réglages d'origine : journal rollback, transactions DEFERRED, pas de rejeu
+    'rollback': ({'init_command': 'PRAGMA journal_mode=DELETE'}, False, False),
+    'wal': (settings.DATABASES['default'].get('OPTIONS', {}), True, False),
+    'wal+queue': (settings.DATABASES['default'].get('OPTIONS', {}), True, True),
+}
+DATASET = {'users': 100, 'creators': 10, 'photos': 500, 'blogs': 20, 'likes': 2000, 'follows': 200, 'tags': 0}
+
+
+class Command(BaseCommand):
+    help = ("Benchmark d'écritures concurrentes (toggles de like, lectures de profil) par threads sur une base "
+            "SQLite fichier : réglages d'origine vs WAL + pragmas + rejeu, avec ou sans écrivain unique.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', action='append', choices=sorted(MODES),
+                            help="Mode à mesurer (répétable) ; défaut : tous.")
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--ops', type=int, default=200, help="Opérations par thread.")
+        parser.add_argument('--read-ratio', type=float, default=0.3,
+                            help="Part de lectures (page JSON d'un profil) parmi les opérations.")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _worker(self, user, client, photo_ids, creators, options, barrier, results):
+        rng = random.Random(f"{options['seed']}-{user.id}")
+        latencies, errors = [], {}
+        try:
+            barrier.wait()
+            for _ in range(options['ops']):
+                if rng.random() < options['read_ratio']:
+                    path, method = reverse('user-profile', args=[rng.choice(creators)]) + '?offset=0', client.get
+                else:
+                    path, method = reverse('toggle_like', args=[rng.choice(photo_ids)]), client.post
+                start = time.perf_counter()
+                try:
+                    status = method(path).status_code
+                except Exception as exc:
+                    status = type(exc).__name__
+                if status == 200:
+                    latencies.append((time.perf_counter() - start) * 1000)
+                else:
+                    errors[str(status)] = errors.get(str(status), 0) + 1
+        finally:
+            connection.close()
+            results.append((latencies, errors))
+
+    def _run_mode(self, name, options, directory):
+        db_options, retry, queued = MODES[name]
+        with isolated_database(Path(directory) / f"{name.replace('+', '-')}.sqlite3"):
+            generate(**DATASET, seed=options['seed'])
+            users = list(User.objects.order_by('id')[:options['threads']])
+            photo_ids = list(Photo.objects.values_list('id', flat=True))
+            creators = list(User.objects.filter(role=User.CREATOR).values_list('username', flat=True))
+            cache.clear()
+            cards.card_cache().clear()
+            pool.reset_pool()
+
+            saved = connection.settings_dict['OPTIONS']
+            connection.settings_dict['OPTIONS'] = dict(db_options)
+            connection.close()  # les connexions suivantes (threads compris) prennent les nouvelles options
+            writes.write_queue = writes.WriteQueue()
+            try:
+                with override_settings(WRITE_QUEUE_ENABLED=queued), \
+                        mock.patch.object(writes, 'WRITE_RETRY_ATTEMPTS', writes.WRITE_RETRY_ATTEMPTS if retry else 1):
+                    # sessions créées avant la mesure, une à une
+                    clients = []
+                    for user in users:
+                        clients.append(Client())
+                        clients[-1].force_login(user)
+                    barrier = threading.Barrier(len(users) + 1)
+                    results = []
+                    threads = [threading.Thread(target=self._worker,
+                                                args=(user, client, photo_ids, creators, options, barrier, results))
+                               for user, client in zip(users, clients)]
+                    for thread in threads:
+                        thread.start()
+                    barrier.wait()
+                    start = time.perf_counter()
+                    for thread in threads:
+                        thread.join()
+                    elapsed = time.perf_counter() - start
+            finally:
+                writes.write_queue.close()
+                connection.settings_dict['OPTIONS'] = saved
+                connection.close()
+            batches = writes.write_queue.batches
+
+        latencies = sorted(ms for lat, _ in results for ms in lat)
+        errors = {}
+        for _, errs in results:
+            for key, count in errs.items():
+                errors[key] = errors.get(key, 0) + count
+        return {
+            'ops_per_s': len(latencies) / elapsed,
+            'ok': len(latencies),
+            'errors': errors,
+            'batches': batches,
+            **(percentiles(latencies) if latencies else {'p50_ms': 0, 'p95_ms': 0, 'p99_ms': 0}),
+        }
+
+    def handle(self, *args, **options):
+        modes = options['mode'] or list(MODES)
+        self.stdout.write(f"{options['threads']} threads x {options['ops']} opérations"
+                          f" ({options['read_ratio']:.0%} de lectures)")
+        self.stdout.write(f"{'mode':<10} {'ops/s':>8} {'ok':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+                          f" {'lots':>6}  erreurs")
+        # fichiers de métriques du bench hors de ceux du site ; pas de page d'erreur DEBUG
+        # ni de traces pour les échecs attendus ("database is locked"), seulement comptés ;
+        # pas de réplique (seule la base 'default' est isolée)
+        logging.disable(logging.CRITICAL)
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch.object(metrics.registry, 'directory', Path(directory)), \
+                override_settings(DEBUG=False, REQUEST_LOG_ENABLED=False, REQUEST_QUERY_BUDGET_RAISE=False,
+                                  REPLICA_READS_ENABLED=False):
+            for name in modes:
+                r = self._run_mode(name, options, directory)
+                errors = ', '.join(f"{k}={v}" for k, v in sorted(r['errors'].items())) or '-'
+                self.stdout.write(f"{name:<10} {r['ops_per_s']:>8.0f} {r['ok']:>6} {r['p50_ms']:>8.1f}"
+                                  f" {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['batches'] or '-':>6}  {errors}")
+        logging.disable(logging.NOTSET)
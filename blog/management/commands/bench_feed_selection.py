@@ -0,0 +1,93 @@
+# blog/management/commands/bench_feed_selection.py
+import random
+import sys
+import time
+import tracemalloc
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from blog.algorithme import NEW_UPLOAD_WINDOW_HOURS, bucket_counts, select_from_candidates, select_from_columns
+from blog.columns import HAS_NUMPY
+from blog.pool import CandidatePool
+from blog.view_events import new_viewed_filter, viewed_key
+
+
+def _synthetic_pool(n, rng):
+    """Pool de n candidats (1 billet sur 5) répartis sur n/20 uploaders, sans base de données."""
+    now = timezone.now()
+    uploaders = max(1, n // 20)
+    candidates = [
+        {
+            'kind': 'blog' if i % 5 == 0 else 'photo',
+            'id': i,
+            'uploader_id': rng.randrange(uploaders),
+            'date_created': now - timedelta(hours=rng.random() * 24 * 60),
+            'likes_count': int(rng.paretovariate(1.2)) - 1,
+        }
+        for i in range(n)
+    ]
+    uploader_stats = {uid: {'is_creator': uid % 4 == 0, 'influence_score': rng.random() * 30}
+                      for uid in range(uploaders)}
+    return CandidatePool(candidates, uploader_stats, now, 0, NEW_UPLOAD_WINDOW_HOURS), uploaders
+
+
+def _dicts_size(candidates):
+    """Taille approximative de la liste de dicts (conteneurs + valeurs non partagées)."""
+    total = sys.getsizeof(candidates)
+    for c in candidates:
+        total += sys.getsizeof(c) + sum(sys.getsizeof(v) for v in c.values() if not isinstance(v, str))
+    return total
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark : sélection du feed en Python (dicts) vs vectorisée (colonnes NumPy)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='500,10000,100000', help="Tailles de pool, séparées par des virgules.")
+        parser.add_argument('--limit', type=int, default=20, help="Taille du feed demandé.")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _measure(self, fn, repeat):
+        """Meilleur temps sur `repeat` appels, et pic d'allocation d'un appel."""
+        best = float('inf')
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return best, peak
+
+    def handle(self, *args, **options):
+        if not HAS_NUMPY:
+            raise CommandError("NumPy n'est pas installé : seule la sélection en Python est disponible.")
+        rng = random.Random(options['seed'])
+        limit = options['limit']
+        counts = bucket_counts(limit)
+        self.stdout.write(
+            f"{'n':>8} {'python (ms)':>12} {'numpy (ms)':>11} {'gain':>7}"
+            f" {'pic py (Ko)':>12} {'pic np (Ko)':>12} {'o/cand dicts':>13} {'o/cand cols':>12}"
+        )
+        for n in [int(x) for x in options['sizes'].split(',') if x.strip()]:
+            pool, uploaders = _synthetic_pool(n, rng)
+            followed = set(rng.sample(range(uploaders), min(uploaders, 30)))
+            viewed = new_viewed_filter()
+            viewed.update(viewed_key(c['kind'], c['id']) for c in pool.candidates if rng.random() < 0.3)
+
+            def is_viewed(c):
+                return viewed_key(c['kind'], c['id']) in viewed
+
+            old, old_peak = self._measure(
+                lambda: select_from_candidates(pool, followed, is_viewed, counts, limit, rng), options['repeat'])
+            new, new_peak = self._measure(
+                lambda: select_from_columns(pool, followed, viewed, counts, limit, rng), options['repeat'])
+            self.stdout.write(
+                f"{n:>8} {old * 1000:>12.2f} {new * 1000:>11.2f} {old / new:>6.1f}x"
+                f" {old_peak / 1024:>12.0f} {new_peak / 1024:>12.0f}"
+                f" {_dicts_size(pool.candidates) / n:>13.0f} {pool.columns.nbytes / n:>12.0f}"
+            )
@@ -0,0 +1,63 @@
+# blog/management/commands/bench_sampling.py
+import math
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.algorithme import weighted_sample_no_replace
+
+
+def _legacy_weighted_sample(items, weights, k):
+    """Ancienne implémentation (O(n·k)), gardée uniquement comme référence."""
+    if k <= 0 or not items:
+        return []
+    pool = list(zip(items, weights))
+    chosen = []
+    for _ in range(min(k, len(pool))):
+        total = sum(w for (_, w) in pool if w > 0)
+        if total <= 0:
+            remaining = [it for it, _ in pool]
+            chosen.extend(random.sample(remaining, min(k - len(chosen), len(remaining))))
+            break
+        r = math.fsum([w for (_, w) in pool]) * 0.0
+        pick = random.random() * total
+        acc = 0.0
+        for i, (it, w) in enumerate(pool):
+            if w <= 0:
+                continue
+            acc += w
+            if pick <= acc:
+                chosen.append(it)
+                pool.pop(i)
+                break
+    return chosen
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark : échantillonnage pondéré sans remise (ancien vs Efraimidis–Spirakis)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='500,5000,50000', help="Tailles de pool, séparées par des virgules.")
+        parser.add_argument('-k', type=int, default=100, help="Nombre d'items tirés par appel.")
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _time(self, fn, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        return best
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        k = options['k']
+        self.stdout.write(f"{'n':>8} {'k':>5} {'ancien (ms)':>12} {'nouveau (ms)':>13} {'gain':>8}")
+        for n in [int(x) for x in options['sizes'].split(',') if x.strip()]:
+            items = list(range(n))
+            weights = [1.0 + rng.paretovariate(1.5) for _ in items]
+            old = self._time(lambda: _legacy_weighted_sample(items, weights, k), options['repeat'])
+            new = self._time(lambda: weighted_sample_no_replace(items, weights, k, rng=rng), options['repeat'])
+            self.stdout.write(f"{n:>8} {k:>5} {old * 1000:>12.2f} {new * 1000:>13.2f} {old / new:>7.1f}x")
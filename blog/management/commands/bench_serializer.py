@@ -0,0 +1,104 @@
+# blog/management/commands/bench_serializer.py
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse, NoReverseMatch
+
+from blog import cards
+from blog.models import Photo, Like
+from blog.renditions import image_sources
+from blog.serializers import serialize_photo_ids
+from blog.utils import publications_time
+
+User = get_user_model()
+
+
+def _legacy_serialize(photo_ids, user):
+    """
+    Ancienne boucle des endpoints JSON (ids non hydratés -> get() par item,
+    reverse() par item), gardée uniquement comme référence.
+    """
+    liked = set(Like.objects.filter(user=user, photo_id__in=photo_ids).values_list("photo_id", flat=True))
+    items = []
+    for pid in photo_ids:
+        try:
+            photo = Photo.objects.select_related("uploader").get(id=pid)
+        except Photo.DoesNotExist:
+            continue
+        uploader = photo.uploader
+        avatar = image_sources(uploader, "profile_photo", default="thumb")
+        image = image_sources(photo, "image") or {"url": None, "srcset": {}}
+        try:
+            profile_url = reverse("user-profile", kwargs={"username": uploader.username})
+        except NoReverseMatch:
+            profile_url = f"/profile/{uploader.username}/"
+        related_blog = photo.blog_set.first()
+        items.append({
+            "id": photo.id,
+            "url": image["url"],
+            "srcset": image["srcset"],
+            "caption": photo.caption or "",
+            "uploader": {
+                "id": uploader.id,
+                "username": uploader.username,
+                "profile_photo": avatar["url"] if avatar else None,
+                "role": uploader.role or "",
+                "profile_url": profile_url,
+            },
+            "likes_count": int(photo.likes_count or 0),
+            "liked": photo.id in liked,
+            "date_created": photo.date_created.isoformat(),
+            "date_facebook": publications_time(photo.date_created),
+            "related_blog": {"id": related_blog.id, "title": related_blog.title} if related_blog else None,
+            "tags": [tag.name for tag in photo.tags.all()],
+        })
+    return items
+
+
+class Command(BaseCommand):
+    help = ("Micro-benchmark : sérialisation JSON des cards (boucle par item vs serializer par batch, "
+            "cache de cards vide puis chaud).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='20,50,100', help="Tailles de batch, séparées par des virgules.")
+        parser.add_argument('--user', help="Utilisateur pour l'état 'liké' (défaut : premier utilisateur).")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def _measure(self, fn, repeat):
+        """(meilleur temps en secondes, nombre de requêtes d'un appel)."""
+        with CaptureQueriesContext(connection) as ctx:
+            fn()
+        best = float('inf')
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+        return best, len(ctx.captured_queries)
+
+    def handle(self, *args, **options):
+        user = (User.objects.filter(username=options['user']).first() if options['user']
+                else User.objects.order_by('id').first())
+        if user is None:
+            raise CommandError("Aucun utilisateur en base.")
+        sizes = [int(x) for x in options['sizes'].split(',') if x.strip()]
+        ids = list(Photo.objects.order_by('-date_created').values_list('id', flat=True)[:max(sizes)])
+        if not ids:
+            raise CommandError("Aucune photo en base.")
+
+        def cold(batch):
+            cards.card_cache().clear()
+            return serialize_photo_ids(batch, user)
+
+        self.stdout.write(f"{'n':>6} {'ancien µs/item':>15} {'req.':>5} {'batch µs/item':>14} {'req.':>5}"
+                          f" {'cards µs/item':>14} {'req.':>5} {'gain':>7}")
+        for n in sizes:
+            batch = ids[:n]
+            old, old_q = self._measure(lambda: _legacy_serialize(batch, user), options['repeat'])
+            new, new_q = self._measure(lambda: cold(batch), options['repeat'])
+            warm, warm_q = self._measure(lambda: serialize_photo_ids(batch, user), options['repeat'])
+            per = [t / len(batch) * 1e6 for t in (old, new, warm)]
+            self.stdout.write(f"{len(batch):>6} {per[0]:>15.1f} {old_q:>5} {per[1]:>14.1f} {new_q:>5}"
+                              f" {per[2]:>14.1f} {warm_q:>5} {old / warm:>6.1f}x")
@@ -0,0 +1,242 @@
+# blog/management/commands/bench_suite.py
+import json
+import platform
+import random
+import sqlite3
+import tempfile
+import time
+from itertools import cycle, islice
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from blog import anonymous_feed, cards, metrics, pool, snapshots, stats
+from blog.algorithme import compute_feed_for_user
+from blog.benchmarks import git_revision, isolated_database, summarize
+from blog.columns import HAS_NUMPY
+from blog.context_processors import user_stats
+from blog.dataset import add_dataset_arguments, dataset_params, generate
+from blog.models import Photo
+
+User = get_user_model()
+
+SCENARIOS = ('feed', 'home_json', 'home_json_scroll', 'home_anonymous', 'profile', 'toggle_like', 'user_stats')
+SAMPLE_USERS = 50              # utilisateurs (et créateurs) parcourus en boucle par les scénarios
+DEFAULT_DB = Path(settings.BASE_DIR) / 'var' / 'bench' / 'bench.sqlite3'
+
+
+class Command(BaseCommand):
+    help = ("Suite de benchmarks sur une base SQLite isolée et un jeu de données généré : feed, endpoints "
+            "(home JSON, profil, like) et context processor ; p50/p95/p99 et requêtes SQL, sortie JSON.")
+
+    def add_arguments(self, parser):
+        add_dataset_arguments(parser)
+        parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                            help="Scénario à exécuter (répétable) ; défaut : tous.")
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10, help="Itérations non mesurées en tête de scénario.")
+        parser.add_argument('--db', type=Path, default=DEFAULT_DB, help="Fichier SQLite du benchmark.")
+        parser.add_argument('--keepdb', action='store_true',
+                            help="Conserve la base, et la réutilise si le jeu de données demandé est identique.")
+        parser.add_argument('--output', help="Fichier JSON des résultats ('-' : sortie standard).")
+        parser.add_argument('--compare', help="Résultats JSON d'un run précédent, à comparer.")
+
+    # ======================================================
+    # Mesure
+    # ======================================================
+    def _measure(self, steps, iterations, warmup):
+        """Exécute `warmup + iterations` étapes ; durée (ms) et requêtes SQL de chacune."""
+        queries = 0
+
+        def count(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        samples, counts = [], []
+        for i, step in enumerate(islice(steps, warmup + iterations)):
+            queries = 0
+            with connection.execute_wrapper(count):
+                start = time.perf_counter()
+                step()
+                elapsed = time.perf_counter() - start
+            if i >= warmup:
+                samples.append(elapsed * 1000)
+                counts.append(queries)
+        if not samples:
+            raise CommandError("Aucune itération mesurée.")
+        return summarize(samples, counts)
+
+    def _client(self, user):
+        client = self._clients.get(user.id)
+        if client is None:
+            client = self._clients[user.id] = Client()
+            client.force_login(user)
+        return client
+
+    @staticmethod
+    def _request(client, method, path, **extra):
+        def step():
+            response = getattr(client, method)(path, **extra)
+            if response.status_code != 200:
+                raise CommandError(f"{method.upper()} {path} : statut {response.status_code}")
+            return response
+        return step
+
+    # ======================================================
+    # Scénarios : générateurs d'étapes (la préparation entre deux yield n'est pas mesurée)
+    # ======================================================
+    def scenario_feed(self, env):
+        for i, user in enumerate(cycle(env['viewers'])):
+            yield lambda: compute_feed_for_user(user, limit=snapshots.SNAPSHOT_SIZE, rng=random.Random(i))
+
+    def scenario_home_json(self, env):
+        # snapshot invalidé : calcul du feed + hydratation + JSON de la première page
+        for user in cycle(env['viewers']):
+            snapshots.invalidate_snapshots([user.id])
+            yield self._request(self._client(user), 'get', '/', data={'offset': 0, 'limit': 20},
+                                HTTP_ACCEPT='application/json')
+
+    def scenario_home_json_scroll(self, env):
+        # page suivante servie par le snapshot (curseur de la première page)
+        for user in cycle(env['viewers']):
+            client = self._client(user)
+            first = client.get('/', {'offset': 0, 'limit': 20}, HTTP_ACCEPT='application/json').json()
+            if not first.get('next_cursor'):
+                raise CommandError(f"Feed de {user.username} sur une seule page : rien à faire défiler.")
+            yield self._request(client, 'get', '/', data={'cursor': first['next_cursor'], 'limit': 20},
+                                HTTP_ACCEPT='application/json')
+
+    def scenario_home_anonymous(self, env):
+        # visiteur : page HTML puis page JSON, servies par la génération partagée du feed anonyme
+        client = Client()
+        while True:
+            yield self._request(client, 'get', '/')
+            yield self._request(client, 'get', '/', data={'offset': 20, 'limit': 20}, HTTP_ACCEPT='application/json')
+
+    def scenario_profile(self, env):
+        for user, creator in zip(cycle(env['viewers']), cycle(env['creators'])):
+            yield self._request(self._client(user), 'get', reverse('user-profile', args=[creator.username]))
+
+    def scenario_toggle_like(self, env):
+        # like puis unlike de la même photo : le jeu de données revient à son état initial
+        for user, photo_id in zip(cycle(env['viewers']), cycle(env['photo_ids'])):
+            step = self._request(self._client(user), 'post', reverse('toggle_like', args=[photo_id]))
+            yield step
+            yield step
+
+    def scenario_user_stats(self, env):
+        factory = RequestFactory()
+        for user in cycle(env['viewers']):
+            request = factory.get('/')
+            request.user = user
+            yield lambda: user_stats(request)
+
+    def _environment(self, rng):
+        subscribers = list(User.objects.filter(role=User.SUBSCRIBER, follows__isnull=False)
+                           .distinct().order_by('id'))
+        creators = list(User.objects.filter(role=User.CREATOR).order_by('-followers_count', 'id')[:SAMPLE_USERS])
+        photo_ids = list(Photo.objects.order_by('id').values_list('id', flat=True))
+        if not subscribers or not creators or not photo_ids:
+            raise CommandError("Jeu de données incomplet : il faut des abonnés qui suivent, des créateurs et des photos.")
+        return {
+            'viewers': rng.sample(subscribers, min(SAMPLE_USERS, len(subscribers))),
+            'creators': creators,
+            'photo_ids': rng.sample(photo_ids, min(SAMPLE_USERS, len(photo_ids))),
+        }
+
+    # ======================================================
+    # Exécution
+    # ======================================================
+    def handle(self, *args, **options):
+        params = dataset_params(options)
+        scenarios = options['scenario'] or list(SCENARIOS)
+        db_path = options['db'].resolve()
+        params_path = db_path.with_suffix('.json')
+        reuse = (options['keepdb'] and db_path.exists() and params_path.exists()
+                 and json.loads(params_path.read_text()) == params)
+        if options['keepdb'] and not reuse:
+            db_path.unlink(missing_ok=True)
+
+        self._clients = {}
+        report = {
+            'meta': {
+                'git': git_revision(),
+                'date': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'sqlite': sqlite3.sqlite_version,
+                'numpy': HAS_NUMPY,
+                'iterations': options['iterations'],
+                'warmup': options['warmup'],
+                'dataset': params,
+            },
+            'scenarios': {},
+        }
+        # ni journal des requêtes ni fichiers de métriques : le bench ne pollue pas ceux du site ;
+        # pas de réplique (seule la base 'default' est isolée)
+        with tempfile.TemporaryDirectory() as metrics_dir, \
+                override_settings(REQUEST_LOG_ENABLED=False, REQUEST_QUERY_BUDGET_RAISE=False,
+                                  REPLICA_READS_ENABLED=False), \
+                isolated_database(db_path, options['keepdb']):
+            metrics.registry.directory = Path(metrics_dir)
+            if reuse:
+                self.stdout.write(f"Base réutilisée : {db_path}")
+            else:
+                start = time.perf_counter()
+                report['meta']['dataset_counts'] = generate(**params)
+                report['meta']['dataset_seconds'] = round(time.perf_counter() - start, 1)
+                self.stdout.write(f"Jeu de données généré en {report['meta']['dataset_seconds']} s : "
+                                  + ", ".join(f"{k}={v}" for k, v in report['meta']['dataset_counts'].items()))
+                if options['keepdb']:
+                    params_path.write_text(json.dumps(params))
+
+            cache.clear()
+            cards.card_cache().clear()
+            pool.reset_pool()
+            anonymous_feed.reset_anonymous_feed()
+            stats.clear_influence_cache()
+            env = self._environment(random.Random(params['seed']))
+
+            self.stdout.write(f"{'scénario':<18} {'itér.':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+                              f" {'moy. ms':>9} {'requêtes':>10}")
+            for name in scenarios:
+                steps = getattr(self, f'scenario_{name}')(env)
+                result = report['scenarios'][name] = self._measure(steps, options['iterations'], options['warmup'])
+                queries = (f"{result['queries_min']}" if result['queries_min'] == result['queries_max']
+                           else f"{result['queries_min']}-{result['queries_max']}")
+                self.stdout.write(f"{name:<18} {result['iterations']:>6} {result['p50_ms']:>9.3f}"
+                                  f" {result['p95_ms']:>9.3f} {result['p99_ms']:>9.3f}"
+                                  f" {result['mean_ms']:>9.3f} {queries:>10}")
+
+        if options['compare']:
+            self._compare(json.loads(Path(options['compare']).read_text()), report)
+        if options['output'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+        elif options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {options['output']}"))
+
+    def _compare(self, baseline, report):
+        self.stdout.write(f"\ncomparaison avec {baseline['meta'].get('git') or '?'}"
+                          f" (jeu de données {'identique' if baseline['meta'].get('dataset') == report['meta']['dataset'] else 'DIFFÉRENT'})")
+        self.stdout.write(f"{'scénario':<18} {'p50':>9} {'p95':>9} {'p99':>9} {'requêtes':>10}")
+        for name, result in report['scenarios'].items():
+            before = baseline['scenarios'].get(name)
+            if before is None:
+                continue
+
+            def delta(key):
+                return f"{(result[key] - before[key]) / before[key] * 100:+.1f}%" if before[key] else "-"
+
+            queries = f"{result['queries_mean'] - before['queries_mean']:+.1f}"
+            self.stdout.write(f"{name:<18} {delta('p50_ms'):>9} {delta('p95_ms'):>9} {delta('p99_ms'):>9} {queries:>10}")
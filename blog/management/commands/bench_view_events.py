@@ -0,0 +1,63 @@
+# blog/management/commands/bench_view_events.py
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from blog.models import Photo, PhotoView
+from blog.view_events import ViewEventBuffer
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Débit d'ingestion des impressions : un INSERT par événement vs buffer + bulk_create. "
+            "Les lignes écrites sont annulées à la fin (sauf --keep).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=20000)
+        parser.add_argument('--flush-size', type=int, default=1000)
+        parser.add_argument('--keep', action='store_true', help="Conserve les vues écrites.")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def _events(self, n, rng):
+        user_ids = list(User.objects.values_list('id', flat=True))
+        photo_ids = list(Photo.objects.values_list('id', flat=True))
+        if not user_ids or not photo_ids:
+            raise CommandError("Il faut au moins un utilisateur et une photo en base.")
+        return [(rng.choice(user_ids), rng.choice(photo_ids)) for _ in range(n)]
+
+    def _naive(self, events):
+        # une écriture (autocommit) par impression, comme un get_or_create par card
+        for user_id, photo_id in events:
+            PhotoView.objects.bulk_create([PhotoView(user_id=user_id, photo_id=photo_id)], ignore_conflicts=True)
+
+    def _buffered(self, events, flush_size):
+        buffer = ViewEventBuffer(flush_size=flush_size, flush_interval=float('inf'))
+        for user_id, photo_id in events:
+            buffer.record('photo', user_id, [photo_id])
+        buffer.flush()
+
+    def _run(self, label, fn, n, keep):
+        """Mesure fn ; les vues créées sont supprimées ensuite, sauf --keep."""
+        before = set(PhotoView.objects.values_list('id', flat=True)) if not keep else None
+        t0 = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t0
+        if not keep:
+            PhotoView.objects.exclude(id__in=before).delete()
+        self.stdout.write(f"{label:<28} {n:>8} {elapsed:>9.2f} s {n / elapsed:>12.0f} év./s")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        n = options['events']
+        events = self._events(n, rng)
+        journal = connection.cursor().execute("PRAGMA journal_mode").fetchone()[0] if connection.vendor == 'sqlite' else '-'
+        self.stdout.write(f"base : {connection.vendor} (journal_mode={journal})")
+        self.stdout.write(f"{'méthode':<28} {'événements':>8} {'durée':>11} {'débit':>16}")
+        naive_n = min(n, 2000)  # le chemin naïf est lent : échantillon réduit
+        self._run("INSERT par événement", lambda: self._naive(events[:naive_n]), naive_n, options['keep'])
+        self._run(f"buffer (flush {options['flush_size']})",
+                  lambda: self._buffered(events, options['flush_size']), n, options['keep'])
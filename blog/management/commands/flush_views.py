@@ -0,0 +1,23 @@
+# blog/management/commands/flush_views.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog import view_events
+
+
+class Command(BaseCommand):
+    help = "Réinjecte en base les impressions mises en spool (PhotoView / BlogView)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Secondes entre deux passes ; 0 = une seule passe (cron).")
+
+    def handle(self, *args, **options):
+        while True:
+            count = view_events.flush_spool()
+            if count or not options['interval']:
+                self.stdout.write(self.style.SUCCESS(f"{count} impression(s) traitée(s) depuis {view_events.SPOOL_DIR}."))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
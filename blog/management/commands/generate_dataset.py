@@ -0,0 +1,28 @@
+# blog/management/commands/generate_dataset.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.dataset import DEFAULT_PASSWORD, add_dataset_arguments, dataset_params, generate
+
+
+class Command(BaseCommand):
+    help = ("Génère un jeu de données synthétique et reproductible (utilisateurs, créateurs, photos, billets, "
+            "likes, follows, tags) par bulk_create, dans la base configurée.")
+
+    def add_arguments(self, parser):
+        add_dataset_arguments(parser)
+        parser.add_argument('--password', default=DEFAULT_PASSWORD, help="Mot de passe commun des comptes générés.")
+
+    def handle(self, *args, **options):
+        params = dataset_params(options)
+        self.stdout.write("Paramètres : " + ", ".join(f"{k}={v}" for k, v in params.items()))
+        start = time.perf_counter()
+        try:
+            counts = generate(password=options['password'], **params)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(", ".join(f"{k}={v}" for k, v in counts.items()))
+        self.stdout.write(self.style.SUCCESS(
+            f"Jeu de données généré en {elapsed:.1f} s (mot de passe : {options['password']})."))
@@ -0,0 +1,50 @@
+# blog/management/commands/process_images.py
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from blog.images import claim_jobs, enqueue_missing, process_batch
+from blog.metrics import registry
+
+
+class Command(BaseCommand):
+    help = "Worker : produit les renditions des images en attente (ImageJob) dans un pool de processus."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help="Taille du pool de processus.")
+        parser.add_argument('--batch', type=int, default=20, help="Jobs réservés par tour.")
+        parser.add_argument('--interval', type=float, default=2.0, help="Attente (s) quand la file est vide.")
+        parser.add_argument('--once', action='store_true', help="Vide la file puis s'arrête.")
+        parser.add_argument('--enqueue-missing', action='store_true',
+                            help="Ajoute d'abord à la file les images existantes sans renditions.")
+
+    def handle(self, *args, **options):
+        if options['enqueue_missing']:
+            self.stdout.write(f"{enqueue_missing()} image(s) ajoutée(s) à la file")
+        worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.stdout.write(f"Worker {worker_id} ({options['workers']} processus)")
+        executor = ProcessPoolExecutor(max_workers=options['workers'])
+        try:
+            while True:
+                close_old_connections()
+                jobs = claim_jobs(options['batch'], worker_id)
+                if jobs:
+                    ok, errors, broken = process_batch(jobs, executor)
+                    self.stdout.write(f"{ok} image(s) traitée(s), {errors} erreur(s)")
+                    if broken:
+                        # processus fils mort (mémoire, signal) : le pool n'accepte plus rien
+                        self.stderr.write("Pool de processus cassé : recréé.")
+                        executor.shutdown(wait=False, cancel_futures=True)
+                        executor = ProcessPoolExecutor(max_workers=options['workers'])
+                    registry.flush_if_due()  # pas de fin de requête dans un worker
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        finally:
+            executor.shutdown()
@@ -0,0 +1,40 @@
+# blog/management/commands/rebuild_viewed_filters.py
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import BlogView, PhotoView, ViewedFilter
+from blog.view_events import new_viewed_filter, viewed_key
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Reconstruit les filtres de vues (Bloom) depuis PhotoView/BlogView : "
+            "reprise de l'historique ou changement des paramètres du filtre.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', default=[], help="Nom d'utilisateur (répétable) ; défaut : tous.")
+
+    def handle(self, *args, **options):
+        user_ids = set(PhotoView.objects.values_list('user_id', flat=True).distinct())
+        user_ids |= set(BlogView.objects.values_list('user_id', flat=True).distinct())
+        if options['user']:
+            user_ids &= set(User.objects.filter(username__in=options['user']).values_list('id', flat=True))
+
+        total_bytes = 0
+        for user_id in sorted(user_ids):
+            views = [(d, viewed_key('photo', pid)) for pid, d in
+                     PhotoView.objects.filter(user_id=user_id).values_list('photo_id', 'date_viewed').iterator()]
+            views += [(d, viewed_key('blog', bid)) for bid, d in
+                      BlogView.objects.filter(user_id=user_id).values_list('blog_id', 'date_viewed').iterator()]
+            bloom = new_viewed_filter()
+            # ordre chronologique : les vues récentes occupent les tranches conservées
+            bloom.update(key for _d, key in sorted(views))
+            data = bloom.to_bytes()
+            with transaction.atomic():
+                ViewedFilter.objects.update_or_create(user_id=user_id, defaults={'data': data})
+            total_bytes += len(data)
+            self.stdout.write(f"user {user_id}: {len(views)} vue(s), {len(data)} octets")
+
+        self.stdout.write(self.style.SUCCESS(f"{len(user_ids)} filtre(s) reconstruit(s), {total_bytes} octets au total."))
@@ -0,0 +1,24 @@
+# blog/management/commands/recompute_uploader_stats.py
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.stats import recompute_uploader_stats
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ("Recalcule UploaderStats (likes, photos, billets, activité récente, influence) depuis les "
+            "tables sources. À lancer périodiquement : fait vieillir la fenêtre d'activité récente.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', action='append', default=[], help="Nom d'utilisateur (répétable) ; défaut : tous.")
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options['user']:
+            user_ids = list(User.objects.filter(username__in=options['user']).values_list('id', flat=True))
+        with transaction.atomic():
+            count = recompute_uploader_stats(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"{count} uploader(s) recalculé(s)."))
@@ -0,0 +1,61 @@
+# blog/management/commands/reconcile_likes.py
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from blog import cards, stats
+from blog.models import Like, Photo, UploaderStats
+
+User = get_user_model()
+
+
+def _likes_received(owner):
+    """Likes reçus par l'uploader OuterRef(owner), comptés dans la table Like."""
+    counts = (Like.objects.filter(photo__uploader=OuterRef(owner)).order_by()
+              .values('photo__uploader').annotate(c=Count('id')).values('c'))
+    return Coalesce(Subquery(counts), 0)
+
+
+class Command(BaseCommand):
+    help = ("Recalcule les compteurs de likes dénormalisés (Photo.likes_count, User.likes_received_count, "
+            "UploaderStats.likes_count) depuis la table Like et corrige les écarts.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Affiche les écarts sans les corriger.")
+
+    def _reconcile(self, queryset, field, real, label, dry_run):
+        """Lignes de `queryset` dont `field` diffère de `real` : affichées, puis corrigées. Retourne leurs pk."""
+        drifted = list(queryset.annotate(real_count=real).exclude(**{field: real})
+                       .values_list('pk', field, 'real_count'))
+        for pk, stored, count in drifted:
+            self.stdout.write(f"{label} {pk}: {stored} -> {count}")
+        ids = [d[0] for d in drifted]
+        if ids and not dry_run:
+            queryset.filter(pk__in=ids).update(**{field: real})
+        return ids
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        likes = Like.objects.filter(photo=OuterRef('pk')).order_by().values('photo').annotate(c=Count('id')).values('c')
+        with transaction.atomic():
+            photo_ids = self._reconcile(Photo.objects.all(), 'likes_count', Coalesce(Subquery(likes), 0),
+                                        "photo", dry_run)
+            if photo_ids and not dry_run:
+                cards.invalidate('photo', photo_ids)
+
+            # likes supprimés en cascade (suppression du user qui likait) : les totaux
+            # par uploader dérivent comme ceux des photos
+            user_ids = self._reconcile(User.objects.all(), 'likes_received_count', _likes_received('pk'),
+                                       "utilisateur", dry_run)
+            uploader_ids = self._reconcile(UploaderStats.objects.all(), 'likes_count', _likes_received('user'),
+                                           "uploader", dry_run)
+            if uploader_ids and not dry_run:
+                UploaderStats.objects.filter(pk__in=uploader_ids).update(influence_score=stats.INFLUENCE_EXPRESSION)
+                stats.clear_influence_cache()
+
+        verb = "à corriger" if dry_run else "corrigée(s)"
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(photo_ids)} photo(s), {len(user_ids)} utilisateur(s), {len(uploader_ids)} uploader(s) {verb}."
+        ))
@@ -0,0 +1,32 @@
+# blog/management/commands/refresh_replica.py
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from blog.routers import REPLICA_BACKUP_PAGES, refresh_replica
+
+
+class Command(BaseCommand):
+    help = ("Recopie la base primaire vers la réplique SQLite locale (API de backup en ligne) ; "
+            "avec --interval, en boucle, pour simuler une réplique en retard.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', help="Fichier de la réplique ; défaut : NAME de l'alias 'replica'.")
+        parser.add_argument('--interval', type=float, default=0,
+                            help="Recopie toutes les N secondes (0 : une seule fois).")
+        parser.add_argument('--pages', type=int, default=REPLICA_BACKUP_PAGES,
+                            help="Pages copiées par pas (-1 : tout en un pas, écrivains bloqués pendant la copie).")
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            start = time.perf_counter()
+            try:
+                pages = refresh_replica(options['target'], options['pages'])
+            except ValueError as exc:
+                raise CommandError(str(exc))
+            self.stdout.write(f"Réplique rafraîchie : {pages} page(s) en {(time.perf_counter() - start) * 1000:.0f} ms")
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,15 @@
+# blog/management/commands/trim_timelines.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.timelines import TIMELINE_MAX_LENGTH, trim_timelines
+
+
+class Command(BaseCommand):
+    help = (f"Rogne toutes les timelines d'abonnés à {TIMELINE_MAX_LENGTH} entrées "
+            "(complète le rognage fait au fil des fan-out).")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            deleted = trim_timelines()
+        self.stdout.write(self.style.SUCCESS(f"{deleted} entrée(s) supprimée(s)."))
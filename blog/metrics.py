@@ -0,0 +1,364 @@
+# blog/metrics.py
+"""
+Registre de métriques en mémoire (compteurs, jauges, histogrammes), exposé
+au format texte Prometheus par la vue `metrics` (staff seulement).
+
+Chemin chaud : une mise à jour = un verrou non contendu + une addition dans
+un dict (~2 µs) ; aucune E/S.
+
+Multi-processus (workers gunicorn, worker d'images) : chaque processus
+écrit périodiquement ses valeurs dans METRICS_DIR/metrics-<pid>-<début>.json
+(écriture atomique : fichier temporaire puis rename), à la fin d'une
+requête si METRICS_FLUSH_SECONDS est écoulé, et à l'arrêt. La vue agrège
+tous les fichiers : compteurs et histogrammes additionnés, jauges
+additionnées sur les seuls processus vivants.
+
+Processus arrêtés : leurs compteurs et histogrammes sont reportés dans
+METRICS_DIR/aggregate.json puis leur fichier est supprimé. Avec l'instant
+de démarrage dans le nom, un pid réutilisé n'écrase jamais le fichier
+d'un processus mort : les totaux ne reculent pas (Prometheus y verrait
+une remise à zéro du compteur).
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de report, les fichiers des processus arrêtés restent lus
+    fcntl = None
+
+from django.conf import settings
+from django.core.signals import request_finished
+
+# --- Hyperparamètres ---
+METRICS_DIR = Path(getattr(settings, 'METRICS_DIR', Path(settings.BASE_DIR) / 'var' / 'metrics'))
+METRICS_FLUSH_SECONDS = 5.0
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+
+# ======================================================
+# Types de métriques
+# ======================================================
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def samples(self):
+        with self._lock:
+            return [[dict(key), value] for key, value in self._values.items()]
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = _key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = _key(labels)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = {'counts': [0] * (len(self.buckets) + 1), 'sum': 0.0}
+            # compteurs par bucket non cumulés ; le dernier est +Inf
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data['counts'][i] += 1
+                    break
+            else:
+                data['counts'][-1] += 1
+            data['sum'] += value
+
+    def samples(self):
+        with self._lock:
+            return [[dict(key), {'counts': list(v['counts']), 'sum': v['sum']}] for key, v in self._values.items()]
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+# ======================================================
+# Registre
+# ======================================================
+class Registry:
+
+    def __init__(self, directory=METRICS_DIR):
+        self.directory = Path(directory)
+        self._metrics = {}
+        self._last_flush = time.monotonic()
+        self._pid = self._started = None
+
+    def _register(self, cls, name, help_text, **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, help_text, **kwargs)
+        return metric
+
+    def counter(self, name, help_text):
+        return self._register(Counter, name, help_text)
+
+    def gauge(self, name, help_text):
+        return self._register(Gauge, name, help_text)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, help_text, buckets=buckets)
+
+    # --- fichiers par processus ---
+    def dump(self):
+        return {
+            name: {'type': m.kind, 'help': m.help, 'buckets': getattr(m, 'buckets', None), 'samples': m.samples()}
+            for name, m in self._metrics.items()
+        }
+
+    def _path(self):
+        """Fichier de ce processus ; identité (pid, début) renouvelée après un fork."""
+        if self._pid != os.getpid():
+            self._pid, self._started = os.getpid(), time.time_ns()
+        return self.directory / f"metrics-{self._pid}-{self._started}.json"
+
+    def flush(self):
+        """Écrit les valeurs de ce processus (remplace son fichier)."""
+        self._last_flush = time.monotonic()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        _write_json(self._path(), self.dump())
+
+    def flush_if_due(self):
+        if time.monotonic() - self._last_flush >= METRICS_FLUSH_SECONDS:
+            self.flush()
+
+    def _process_files(self):
+        """[(chemin, vivant)] des fichiers par processus ; d'un même pid, seul le plus récent peut être vivant."""
+        files = []
+        for path in self.directory.glob('metrics-*.json'):
+            try:
+                # metrics-<pid>-<début>.json (metrics-<pid>.json : ancien format)
+                pid, _, started = path.stem.split('-', 1)[1].partition('-')
+                files.append((path, int(pid), int(started or 0)))
+            except ValueError:
+                continue
+        latest = {}
+        for _, pid, started in files:
+            latest[pid] = max(latest.get(pid, started), started)
+        return [(path, started == latest[pid] and _pid_alive(pid)) for path, pid, started in sorted(files)]
+
+    def _read_aggregate(self):
+        try:
+            return json.loads((self.directory / 'aggregate.json').read_text(encoding='utf-8'))
+        except (ValueError, OSError):
+            return {'folded': [], 'metrics': {}}
+
+    def _fold(self, paths):
+        """
+        Reporte compteurs et histogrammes des fichiers de processus arrêtés
+        dans aggregate.json, puis supprime ces fichiers. Sous verrou (deux
+        vues peuvent agréger en même temps) ; les noms reportés sont gardés
+        dans l'agrégat : un arrêt entre l'écriture et la suppression ne
+        compte rien deux fois.
+        """
+        if fcntl is None or not paths:
+            return
+        with open(self.directory / 'aggregate.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            aggregate = self._read_aggregate()
+            folded = {name for name in aggregate['folded'] if (self.directory / name).exists()}
+            merged = _merge({}, aggregate['metrics'], gauges=False)
+            added = []
+            for path in paths:
+                if path.name in folded:
+                    continue
+                try:
+                    _merge(merged, json.loads(path.read_text(encoding='utf-8')), gauges=False)
+                except (ValueError, OSError):
+                    continue  # déjà reporté et supprimé par un autre processus, ou illisible
+                added.append(path.name)
+            if added:
+                folded.update(added)
+                _write_json(self.directory / 'aggregate.json', {'folded': sorted(folded), 'metrics': _as_dump(merged)})
+            for name in folded:
+                (self.directory / name).unlink(missing_ok=True)
+
+    def collect(self):
+        """Agrège l'agrégat des processus arrêtés et les fichiers des vivants (celui-ci compris, fraîchement écrit)."""
+        self.flush()
+        files = self._process_files()
+        self._fold([path for path, alive in files if not alive])
+        merged = _merge({}, self._read_aggregate()['metrics'], gauges=False)
+        for path, alive in files:
+            try:
+                data = json.loads(path.read_text(encoding='utf-8'))
+            except (ValueError, OSError):
+                continue  # reporté entre-temps (ou illisible)
+            _merge(merged, data, gauges=alive)
+        return merged
+
+    def exposition(self):
+        """Texte au format d'exposition Prometheus (version 0.0.4)."""
+        lines = []
+        for name, metric in sorted(self.collect().items()):
+            lines.append(f"# HELP {name} {metric['help']}")
+            lines.append(f"# TYPE {name} {metric['type']}")
+            for key, value in sorted(metric['samples'].items()):
+                labels = dict(key)
+                if metric['type'] == 'histogram':
+                    cumulative = 0
+                    bounds = [str(b) for b in metric['buckets']] + ['+Inf']
+                    for bound, count in zip(bounds, value['counts']):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {cumulative}")
+                    lines.append(f"{name}_sum{_labels(labels)} {value['sum']}")
+                    lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+                else:
+                    lines.append(f"{name}{_labels(labels)} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in sorted(labels.items())) + '}'
+
+
+def _write_json(path, data):
+    tmp = path.with_suffix('.tmp')
+    tmp.write_text(json.dumps(data), encoding='utf-8')
+    os.replace(tmp, path)
+
+
+def _merge(merged, data, gauges=True):
+    """Additionne les métriques `data` (format de Registry.dump) dans `merged` ; jauges ignorées si not gauges."""
+    for name, metric in data.items():
+        if metric['type'] == 'gauge' and not gauges:
+            continue
+        target = merged.setdefault(name, {**metric, 'samples': {}})
+        for labels, value in metric['samples']:
+            key = _key(labels)
+            current = target['samples'].get(key)
+            if metric['type'] == 'histogram':
+                if current is None:
+                    current = target['samples'][key] = {'counts': [0] * len(value['counts']), 'sum': 0.0}
+                current['counts'] = [a + b for a, b in zip(current['counts'], value['counts'])]
+                current['sum'] += value['sum']
+            else:
+                target['samples'][key] = (current or 0) + value
+    return merged
+
+
+def _as_dump(merged):
+    """Inverse de _merge : retour au format de Registry.dump."""
+    return {name: {**metric, 'samples': [[dict(key), value] for key, value in metric['samples'].items()]}
+            for name, metric in merged.items()}
+
+
+def _pid_alive(pid):
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+registry = Registry()
+
+
+def _flush(force=False):
+    try:
+        registry.flush() if force else registry.flush_if_due()
+    except OSError:
+        pass  # répertoire indisponible : les valeurs restent en mémoire
+
+
+def _flush_if_due(**kwargs):
+    _flush()
+
+
+request_finished.connect(_flush_if_due, dispatch_uid='blog.metrics.flush_if_due')
+atexit.register(_flush, force=True)
+
+
+# ======================================================
+# Métriques de l'application
+# ======================================================
+FEED_COMPUTATIONS = registry.counter('fotoblog_feed_computations_total', "Calculs de feed personnalisés.")
+FEED_DURATION = registry.histogram('fotoblog_feed_duration_seconds', "Durée d'un calcul de feed.")
+FEED_STAGE_DURATION = registry.histogram('fotoblog_feed_stage_duration_seconds', "Durée par étape du calcul de feed.")
+FEED_SNAPSHOTS = registry.counter('fotoblog_feed_snapshot_lookups_total',
+                                  "Lectures du snapshot de feed (result=hit|miss).")
+FEED_POOL = registry.counter('fotoblog_feed_pool_lookups_total',
+                             "Lectures du pool global (source=process|shared|rebuild).")
+ANONYMOUS_FEED = registry.counter('fotoblog_anonymous_feed_lookups_total',
+                                  "Lectures du feed anonyme partagé (result=fresh|stale|rebuild|wait).")
+LIKES_TOGGLED = registry.counter('fotoblog_likes_toggled_total', "Likes posés/retirés (action=like|unlike).")
+IMAGE_RESIZE_DURATION = registry.histogram('fotoblog_image_resize_duration_seconds',
+                                           "Production des renditions d'une image (soumission -> fin).")
+IMAGE_JOBS = registry.counter('fotoblog_image_jobs_total', "Jobs d'image traités (result=ok|error).")
+SIGNUP_DB_RETRIES = registry.counter('fotoblog_signup_db_lock_retries_total',
+                                     "Nouvelles tentatives d'inscription sur base verrouillée.")
+CARD_CACHE_LOOKUPS = registry.counter('fotoblog_card_cache_lookups_total',
+                                      "Lectures du cache de cards (kind=photo|blog|user, result=hit|miss).")
+HTTP_REQUESTS = registry.counter('fotoblog_http_requests_total', "Requêtes HTTP (route, status).")
+HTTP_DURATION = registry.histogram('fotoblog_http_request_duration_seconds', "Durée des requêtes HTTP par route.")
+
+
+def record_feed_trace(trace):
+    """Hook d'instrumentation du feed (blog/instrumentation.py)."""
+    FEED_COMPUTATIONS.inc()
+    FEED_DURATION.observe(trace.total_ms / 1000)
+    for stage in trace.stages:
+        FEED_STAGE_DURATION.observe(stage['ms'] / 1000, stage=stage['name'])
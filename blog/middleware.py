@@ -0,0 +1,135 @@
+# blog/middleware.py
+"""
+Mesures par requête : durée totale, requêtes SQL (nombre et temps), rendu
+du template, taille de la réponse, nom de route résolu (home, toggle_like,
+user-profile, ...). Chaque requête produit une ligne du journal JSONL
+(blog/request_log.py, écrit hors requête).
+
+Budgets de requêtes SQL par route (QUERY_BUDGETS, surchargé par le réglage
+REQUEST_QUERY_BUDGETS) : un dépassement est journalisé, ou lève
+QueryBudgetExceeded si REQUEST_QUERY_BUDGET_RAISE est vrai (tests).
+
+ReplicaStickinessMiddleware : après une écriture réussie, l'utilisateur lit
+sur le primaire le temps que la réplique rattrape (blog/routers.py).
+"""
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .metrics import HTTP_DURATION, HTTP_REQUESTS
+from .request_log import writer
+from .routers import mark_written
+
+logger = logging.getLogger(__name__)
+
+# --- Hyperparamètres ---
+# requêtes SQL maximales par nom de route (sessions et auth comprises)
+QUERY_BUDGETS = {
+    'home': 20,
+    'user-profile': 12,
+    'toggle_like': 15,
+    'view_blog': 15,
+}
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def query_budget(url_name):
+    budgets = getattr(settings, 'REQUEST_QUERY_BUDGETS', None) or QUERY_BUDGETS
+    return budgets.get(url_name)
+
+
+class _QueryTimer:
+    """execute_wrapper : compte les requêtes et cumule leur durée (toutes les connexions)."""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestMetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = getattr(settings, 'REQUEST_LOG_ENABLED', True)
+
+    def __call__(self, request):
+        timer = _QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(timer))
+            response = self.get_response(request)
+        elapsed = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        url_name = match.view_name if match else None
+        entry = {
+            'ts': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'url_name': url_name,
+            'status': response.status_code,
+            'ms': round(elapsed * 1000, 3),
+            'db_queries': timer.count,
+            'db_ms': round(timer.seconds * 1000, 3),
+            'template_ms': getattr(request, '_template_ms', None),
+            'bytes': None if response.streaming else len(response.content),
+        }
+        if self.enabled:
+            writer.write(entry)
+        HTTP_REQUESTS.inc(route=url_name or '', status=response.status_code)
+        HTTP_DURATION.observe(elapsed, route=url_name or '')
+        self._check_budget(url_name, timer.count, request)
+        return response
+
+    def process_template_response(self, request, response):
+        # appelé juste avant response.render() ; le callback marque la fin du rendu
+        start = time.perf_counter()
+
+        def rendered(resp):
+            request._template_ms = round((time.perf_counter() - start) * 1000, 3)
+
+        response.add_post_render_callback(rendered)
+        return response
+
+    def _check_budget(self, url_name, queries, request):
+        budget = query_budget(url_name)
+        if budget is None or queries <= budget:
+            return
+        message = f"{url_name} ({request.method} {request.path}) : {queries} requêtes SQL pour un budget de {budget}"
+        if getattr(settings, 'REQUEST_QUERY_BUDGET_RAISE', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning("Budget de requêtes dépassé : %s", message)
+
+
+class ReplicaStickinessMiddleware:
+    """Après AuthenticationMiddleware : toute requête non sûre réussie colle son auteur au primaire."""
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in self.SAFE_METHODS and response.status_code < 400:
+            # request.user après la vue : utilisateur tout juste connecté ou inscrit compris
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                mark_written(user.pk)
+        return response
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_likes_count(apps, schema_editor):
+    Photo = apps.get_model('blog', 'Photo')
+    Like = apps.get_model('blog', 'Like')
+    counts = Like.objects.filter(photo=OuterRef('pk')).order_by().values('photo').annotate(c=Count('id')).values('c')
+    Photo.objects.update(likes_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_auto_20250923_1117'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='photo',
+            name='likes_count',
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(fill_likes_count, migrations.RunPython.noop),
+    ]
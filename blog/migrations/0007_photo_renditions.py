@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_image_jobs'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='imagejob',
+            name='max_height',
+        ),
+        migrations.RemoveField(
+            model_name='imagejob',
+            name='max_width',
+        ),
+        migrations.AddField(
+            model_name='photo',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentification', '0006_user_profile_renditions'),
+        ('blog', '0009_view_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ViewedFilter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='viewed_filter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('data', models.BinaryField()),
+                ('date_updated', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
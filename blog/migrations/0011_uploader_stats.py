@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:53
+
+from datetime import timedelta
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def fill_uploader_stats(apps, schema_editor):
+    Photo = apps.get_model('blog', 'Photo')
+    Blog = apps.get_model('blog', 'Blog')
+    UploaderStats = apps.get_model('blog', 'UploaderStats')
+    now = django.utils.timezone.now()
+    cutoff = now - timedelta(days=30)
+    rows = {}
+    for it in Photo.objects.values('uploader_id').annotate(
+            likes=Sum('likes_count'), n=Count('id'), recent=Count('id', filter=Q(date_created__gte=cutoff))):
+        rows[it['uploader_id']] = dict(likes_count=it['likes'] or 0, photos_count=it['n'], blogs_count=0,
+                                       recent_posts_count=it['recent'])
+    for it in Blog.objects.values('author_id').annotate(n=Count('id'), recent=Count('id', filter=Q(date_created__gte=cutoff))):
+        row = rows.setdefault(it['author_id'], dict(likes_count=0, photos_count=0, blogs_count=0, recent_posts_count=0))
+        row['blogs_count'] = it['n']
+        row['recent_posts_count'] += it['recent']
+    UploaderStats.objects.bulk_create([
+        UploaderStats(
+            user_id=uid, date_refreshed=now,
+            influence_score=r['likes_count'] * 10.0 / (r['photos_count'] + 1) + min(r['recent_posts_count'] / 10.0, 1.0) * 20.0,
+            **r
+        )
+        for uid, r in rows.items()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentification', '0006_user_profile_renditions'),
+        ('blog', '0010_viewed_filter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploaderStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='uploader_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('likes_count', models.PositiveIntegerField(default=0)),
+                ('photos_count', models.PositiveIntegerField(default=0)),
+                ('blogs_count', models.PositiveIntegerField(default=0)),
+                ('recent_posts_count', models.PositiveIntegerField(default=0)),
+                ('influence_score', models.FloatField(db_index=True, default=0.0)),
+                ('date_refreshed', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(fill_uploader_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:02
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_timelines(apps, schema_editor):
+    """Timelines des follows existants : 50 derniers contenus par créateur suivi, 500 entrées max."""
+    User = apps.get_model('authentification', 'User')
+    Photo = apps.get_model('blog', 'Photo')
+    Blog = apps.get_model('blog', 'Blog')
+    TimelineEntry = apps.get_model('blog', 'TimelineEntry')
+    followers_by_creator = {}
+    for follower_id, creator_id in User.follows.through.objects.values_list('from_user_id', 'to_user_id'):
+        followers_by_creator.setdefault(creator_id, []).append(follower_id)
+    timelines = {}
+    for creator_id, followers in followers_by_creator.items():
+        if len(followers) > 5000:
+            continue  # créateur lu à la demande (fan-out à la lecture)
+        items = [('photo_id', pk, date) for pk, date in Photo.objects.filter(uploader_id=creator_id)
+                 .order_by('-date_created', '-id').values_list('id', 'date_created')[:50]]
+        items += [('blog_id', pk, date) for pk, date in Blog.objects.filter(author_id=creator_id)
+                  .order_by('-date_created', '-id').values_list('id', 'date_created')[:50]]
+        for follower_id in followers:
+            timelines.setdefault(follower_id, []).extend((creator_id, *item) for item in items)
+    entries = []
+    for follower_id, items in timelines.items():
+        items.sort(key=lambda item: item[3], reverse=True)
+        entries += [TimelineEntry(user_id=follower_id, author_id=creator_id, date_created=date, **{field: pk})
+                    for creator_id, field, pk, date in items[:500]]
+    TimelineEntry.objects.bulk_create(entries, batch_size=500, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentification', '0006_user_profile_renditions'),
+        ('blog', '0011_uploader_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_created', models.DateTimeField()),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('blog', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.blog')),
+                ('photo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.photo')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', '-date_created', '-id'], name='timeline_user_recent_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'photo'), name='timeline_unique_photo'), models.UniqueConstraint(fields=('user', 'blog'), name='timeline_unique_blog')],
+            },
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
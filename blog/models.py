@@ -1,45 +1,79 @@
 # blog/models.py
 from django.conf import settings
+from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
-from PIL import Image
+from django.utils import timezone
 from .utils import user_directory_path
 from taggit.managers import TaggableManager  # <-- import pour les tags
 
 
 class Photo(models.Model):
-    IMAGE_MAX_SIZE = (800, 800)
+    # champ image -> (champ JSON des renditions, {label: largeur max})
+    RENDITIONS = {
+        'image': ('renditions', {'thumb': 320, 'medium': 800, 'full': 1600}),
+    }
+
+    PROCESSING_PENDING = "pending"
+    PROCESSING_READY = "ready"
+    PROCESSING_FAILED = "failed"
+    PROCESSING_CHOICES = (
+        (PROCESSING_PENDING, "En attente"),
+        (PROCESSING_READY, "Prête"),
+        (PROCESSING_FAILED, "Échec"),
+    )
 
     image = models.ImageField(upload_to=user_directory_path)
     caption = models.CharField(max_length=128, blank=True)
     uploader = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     date_created = models.DateTimeField(auto_now_add=True)
 
+    # Compteur dénormalisé des likes (maintenu par ToggleLikeView, réconcilié
+    # par `manage.py reconcile_likes`). Indexé pour le tri par popularité.
+    likes_count = models.PositiveIntegerField(default=0, db_index=True)
+
+    # État du redimensionnement asynchrone (voir ImageJob / `manage.py process_images`)
+    processing_state = models.CharField(max_length=10, choices=PROCESSING_CHOICES, default=PROCESSING_READY)
+    # Déclinaisons tailles/formats produites par le worker (voir blog/renditions.py)
+    renditions = models.JSONField(default=dict, blank=True)
+
     # --- Nouveau champ tags ---
     tags = TaggableManager(blank=True)
 
+    class Meta:
+        indexes = [
+            # pagination par clé du profil (blog/pagination.py)
+            models.Index(fields=['uploader', '-date_created', '-id'], name='photo_uploader_recent_idx'),
+            # fenêtres récentes / ultra_new du pool de candidats, accueil anonyme (tri par date)
+            models.Index(fields=['-date_created'], name='photo_recent_idx'),
+        ]
+
     def __str__(self):
         return f"{self.caption[:20]}"
 
-    def likes_count(self):
-        return self.likes.count()
-
     def save(self, *args, **kwargs):
-        """Redimensionnement automatique de l’image"""
+        """Sauvegarde l'original tel quel ; les renditions sont produites hors requête."""
+        new_image = bool(self.image) and not self.image._committed
+        if new_image:
+            self.processing_state = self.PROCESSING_PENDING
+            self.renditions = {}
         super().save(*args, **kwargs)
-        if self.image:
-            image = Image.open(self.image.path)
-            if image.height > self.IMAGE_MAX_SIZE[1] or image.width > self.IMAGE_MAX_SIZE[0]:
-                image.thumbnail(self.IMAGE_MAX_SIZE)
-                image.save(self.image.path)
+        if new_image:
+            ImageJob.enqueue(self, 'image')
 
 
 class Like(models.Model):
     photo = models.ForeignKey(Photo, on_delete=models.CASCADE, related_name='likes')
-    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # index implicite remplacé par like_user_photo_idx (user en tête)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
     date_created = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         unique_together = ('photo', 'user')
+        indexes = [
+            # état "liké" des cards d'un feed (user = ? AND photo_id IN ...), likes d'un utilisateur : couvrant
+            models.Index(fields=['user', 'photo'], name='like_user_photo_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} aime {self.photo.caption[:20]}"
@@ -49,12 +83,165 @@ class Blog(models.Model):
     photo = models.ForeignKey(Photo, null=True, blank=True, on_delete=models.SET_NULL)
     title = models.CharField(max_length=128)
     content = models.TextField()
-    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    # index implicite remplacé par blog_author_recent_idx (author en tête)
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_index=False)
     date_created = models.DateTimeField(auto_now_add=True)
     starred = models.BooleanField(default=False)
 
     # --- Nouveau champ tags ---
     tags = TaggableManager(blank=True)
 
+    class Meta:
+        indexes = [
+            # billets d'un auteur par date (timelines, stats d'uploader), comme photo_uploader_recent_idx
+            models.Index(fields=['author', '-date_created', '-id'], name='blog_author_recent_idx'),
+            # billets récents / derniers billets du pool de candidats
+            models.Index(fields=['-date_created'], name='blog_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} par {self.author.username}"
+
+
+class PhotoView(models.Model):
+    """
+    Première impression d'une photo pour un utilisateur (card rendue dans un
+    feed). Alimentée par lots via blog/view_events.py ; lue par l'algorithme
+    pour écarter les contenus déjà vus.
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    photo = models.ForeignKey(Photo, on_delete=models.CASCADE)
+    date_viewed = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # (user, photo) en tête : sert aussi la lecture "vus par user"
+        unique_together = ('user', 'photo')
+
+    def __str__(self):
+        return f"{self.user_id} a vu la photo {self.photo_id}"
+
+
+class BlogView(models.Model):
+    """Première impression d'un billet pour un utilisateur (voir PhotoView)."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    blog = models.ForeignKey(Blog, on_delete=models.CASCADE)
+    date_viewed = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        unique_together = ('user', 'blog')
+
+    def __str__(self):
+        return f"{self.user_id} a vu le billet {self.blog_id}"
+
+
+class UploaderStats(models.Model):
+    """
+    Read model des statistiques d'un uploader utilisées par l'algorithme
+    (influence, statut créateur). Tenu à jour par incréments (likes, uploads,
+    billets : voir blog/stats.py) et recalculable par `manage.py recompute_uploader_stats`.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                                primary_key=True, related_name='uploader_stats')
+    likes_count = models.PositiveIntegerField(default=0)
+    photos_count = models.PositiveIntegerField(default=0)
+    blogs_count = models.PositiveIntegerField(default=0)
+    # photos + billets des INFLUENCE_RECENT_DAYS derniers jours (décroissance au recalcul)
+    recent_posts_count = models.PositiveIntegerField(default=0)
+    influence_score = models.FloatField(default=0.0, db_index=True)
+    date_refreshed = models.DateTimeField(default=timezone.now)
+
+    @property
+    def is_creator(self):
+        return self.blogs_count > 0
+
+    def __str__(self):
+        return f"Stats de {self.user_id} (influence {self.influence_score:.1f})"
+
+
+class ViewedFilter(models.Model):
+    """
+    Filtre de Bloom (blog/bloom.py) des contenus vus par un utilisateur,
+    mis à jour à chaque flush des impressions : l'algorithme teste
+    l'appartenance sans relire tout l'historique PhotoView/BlogView.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+                                primary_key=True, related_name='viewed_filter')
+    data = models.BinaryField()
+    date_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Filtre de vues de {self.user_id} ({len(self.data)} octets)"
+
+
+class TimelineEntry(models.Model):
+    """
+    Contenu d'un créateur suivi, recopié dans la timeline de l'abonné au
+    moment de l'upload (fan-out à l'écriture, voir blog/timelines.py).
+    Exactement un de `photo` / `blog` est renseigné ; la suppression du
+    contenu supprime ses entrées (CASCADE).
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='timeline')
+    author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    photo = models.ForeignKey(Photo, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    blog = models.ForeignKey(Blog, null=True, blank=True, on_delete=models.CASCADE, related_name='+')
+    # date du contenu (pas de l'insertion) : ordre de lecture de la timeline
+    date_created = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # lecture des N plus récentes et rognage par utilisateur
+            models.Index(fields=['user', '-date_created', '-id'], name='timeline_user_recent_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'photo'], name='timeline_unique_photo'),
+            models.UniqueConstraint(fields=['user', 'blog'], name='timeline_unique_blog'),
+        ]
+
+    def __str__(self):
+        target = f"photo {self.photo_id}" if self.photo_id else f"billet {self.blog_id}"
+        return f"Timeline de {self.user_id} : {target}"
+
+
+class ImageJob(models.Model):
+    """
+    File d'attente (en base) des images dont il faut produire les renditions
+    hors requête (tailles déclarées dans `<Modèle>.RENDITIONS`).
+    Consommée par `manage.py process_images`.
+    """
+    PENDING = "pending"
+    PROCESSING = "processing"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = (
+        (PENDING, "En attente"),
+        (PROCESSING, "En cours"),
+        (DONE, "Terminé"),
+        (FAILED, "Échec"),
+    )
+
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveBigIntegerField()
+    target = GenericForeignKey('content_type', 'object_id')
+    field_name = models.CharField(max_length=64)
+
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=64, blank=True)
+    error = models.TextField(blank=True)
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_claimed = models.DateTimeField(null=True, blank=True)
+    date_processed = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'id'])]
+
     def __str__(self):
-        return f"{self.title} par {self.author.username}"
\ No newline at end of file
+        return f"{self.content_type.model}#{self.object_id}.{self.field_name} ({self.status})"
+
+    @classmethod
+    def enqueue(cls, instance, field_name):
+        return cls.objects.create(
+            content_type=ContentType.objects.get_for_model(instance),
+            object_id=instance.pk,
+            field_name=field_name,
+        )
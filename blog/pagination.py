@@ -0,0 +1,52 @@
+# blog/pagination.py
+"""
+Pagination par clé (keyset / seek) sur (date_created, id), du plus récent
+au plus ancien.
+
+Au lieu d'un OFFSET (coût proportionnel à la profondeur du scroll) ou d'une
+liste matérialisée, chaque page reprend "après" la dernière card servie :
+WHERE (date_created, id) < (d, i) ORDER BY date_created DESC, id DESC LIMIT n+1,
+servi par l'index (uploader, -date_created, -id) de Photo. La ligne en plus
+indique s'il reste une page, sans COUNT.
+"""
+import base64
+import binascii
+from datetime import datetime
+
+from django.db.models import Q
+
+KEYSET_ORDERING = ('-date_created', '-id')
+
+
+def encode_keyset_cursor(date_created, pk):
+    raw = f"{date_created.isoformat()}|{int(pk)}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_keyset_cursor(cursor):
+    """Retourne (date_created, id) ; None si le curseur est absent ou invalide."""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        date_str, pk = base64.urlsafe_b64decode(padded.encode()).decode().split("|", 1)
+        return datetime.fromisoformat(date_str), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def keyset_page(queryset, cursor, limit):
+    """
+    Retourne (objets de la page, curseur suivant ou None).
+    `queryset` : instances ayant date_created et id ; l'ordre est imposé ici.
+    """
+    queryset = queryset.order_by(*KEYSET_ORDERING)
+    position = decode_keyset_cursor(cursor)
+    if position is not None:
+        date_created, pk = position
+        queryset = queryset.filter(Q(date_created__lt=date_created) | Q(date_created=date_created, id__lt=pk))
+    rows = list(queryset[:limit + 1])
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_keyset_cursor(last.date_created, last.id)
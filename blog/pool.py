@@ -0,0 +1,134 @@
+# blog/pool.py
+"""
+Pool global de candidats du feed, partagé par tous les utilisateurs.
+
+Tout ce qui ne dépend pas du lecteur est calculé une fois par génération :
+candidats (ultra_new ∪ récents ∪ top likés, photos puis billets), stats des
+uploaders, et pré-découpage par bucket (ultra_new, popular, blogs,
+créateurs, position par contenu). Le feed d'un utilisateur n'applique plus
+que ses filtres personnels (suivis, vus, likés) et le bucket 'followed',
+lu dans sa timeline (blog/timelines.py), sur un pool borné à
+CANDIDATE_MAX : sa latence ne dépend plus de la taille du catalogue.
+
+Avec NumPy, chaque génération porte aussi ses colonnes (blog/columns.py).
+
+Deux niveaux de cache :
+  - processus : la génération courante est gardée en mémoire ;
+  - partagé   : le pool construit est aussi posé dans le cache Django, les
+    autres processus le relisent au lieu de refaire les requêtes.
+Un numéro de version (cache Django) est incrémenté à chaque nouvel upload :
+le pool est alors reconstruit, au plus une fois par GLOBAL_POOL_MIN_REBUILD_SECONDS.
+"""
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .columns import HAS_NUMPY, CandidateColumns
+from .metrics import FEED_POOL
+
+# --- Hyperparamètres ---
+GLOBAL_POOL_REFRESH_SECONDS = getattr(settings, 'FEED_GLOBAL_POOL_REFRESH_SECONDS', 60)  # durée de vie d'une génération
+GLOBAL_POOL_MIN_REBUILD_SECONDS = 5   # délai mini entre deux reconstructions sur upload
+POPULAR_MIN_LIKES = 10                # seuil du bucket 'popular'
+
+_POOL_KEY = "feed:global_pool"
+_VERSION_KEY = "feed:global_pool:version"
+
+_lock = threading.Lock()
+_local = None
+
+
+class CandidatePool:
+    """Génération du pool : candidats + découpage par bucket, indépendants du lecteur."""
+
+    def __init__(self, candidates, uploader_stats, built_at, version, new_upload_window_hours):
+        self.candidates = candidates
+        self.uploader_stats = uploader_stats
+        self.built_at = built_at
+        self.version = version
+
+        ultra_new_cutoff = built_at - timedelta(hours=new_upload_window_hours)
+        self.ultra_new = [c for c in candidates if c['date_created'] and c['date_created'] >= ultra_new_cutoff]
+        self.popular = [c for c in candidates if (c['likes_count'] or 0) >= POPULAR_MIN_LIKES]
+        self.blogs = [c for c in candidates if c['kind'] == 'blog']
+        self.creators = [c for c in candidates
+                         if uploader_stats.get(c['uploader_id'], {}).get('is_creator', False)]
+        # position de chaque contenu dans `candidates` (et dans les colonnes)
+        self.index = {(c['kind'], c['id']): i for i, c in enumerate(candidates)}
+        # mêmes données en colonnes pour la sélection vectorisée (si NumPy est installé)
+        self.columns = (CandidateColumns(candidates, uploader_stats, built_at, new_upload_window_hours, POPULAR_MIN_LIKES)
+                        if HAS_NUMPY else None)
+
+    def age(self, now=None):
+        return ((now or timezone.now()) - self.built_at).total_seconds()
+
+
+def build_pool(version=0):
+    """Construit une génération depuis la base (requêtes de candidate_rows_for + stats)."""
+    from .algorithme import NEW_UPLOAD_WINDOW_HOURS, candidate_rows_for
+    from .stats import influence_for
+
+    now = timezone.now()
+    candidates = [
+        {'kind': kind, 'id': obj_id, 'uploader_id': uploader_id, 'date_created': date_created, 'likes_count': likes_count}
+        for (kind, obj_id, uploader_id, date_created, likes_count) in candidate_rows_for(now)
+    ]
+    uploader_stats = influence_for({c['uploader_id'] for c in candidates if c['uploader_id'] is not None})
+    return CandidatePool(candidates, uploader_stats, now, version, NEW_UPLOAD_WINDOW_HOURS)
+
+
+def _current_version():
+    return cache.get(_VERSION_KEY, 0)
+
+
+def _usable(pool, version, now):
+    """Génération servable : pas expirée, et à jour (ou reconstruite il y a trop peu de temps)."""
+    if pool is None:
+        return False
+    age = pool.age(now)
+    if age >= GLOBAL_POOL_REFRESH_SECONDS:
+        return False
+    return pool.version == version or age < GLOBAL_POOL_MIN_REBUILD_SECONDS
+
+
+def get_global_pool():
+    """Génération courante du pool : mémoire du processus, sinon cache partagé, sinon reconstruction."""
+    global _local
+    version = _current_version()
+    now = timezone.now()
+    if _usable(_local, version, now):
+        FEED_POOL.inc(source='process')
+        return _local
+    with _lock:
+        if _usable(_local, version, now):
+            FEED_POOL.inc(source='process')
+            return _local
+        shared = cache.get(_POOL_KEY)
+        if _usable(shared, version, now):
+            FEED_POOL.inc(source='shared')
+            _local = shared
+        else:
+            FEED_POOL.inc(source='rebuild')
+            _local = build_pool(version)
+            cache.set(_POOL_KEY, _local, GLOBAL_POOL_REFRESH_SECONDS)
+        return _local
+
+
+def mark_pool_stale():
+    """Nouveau contenu : la prochaine lecture reconstruit le pool (anti-rafale : voir MIN_REBUILD)."""
+    if cache.add(_VERSION_KEY, 1, None):
+        return
+    try:
+        cache.incr(_VERSION_KEY)
+    except ValueError:
+        cache.set(_VERSION_KEY, 1, None)
+
+
+def reset_pool():
+    """Oublie la génération en mémoire et partagée (tests, commandes)."""
+    global _local
+    _local = None
+    cache.delete(_POOL_KEY)
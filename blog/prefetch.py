@@ -0,0 +1,77 @@
+# blog/prefetch.py
+"""
+Préchargement groupé des données affichées sur une card de photo.
+
+Les templates (home.html, user_profile.html, publications_action.html)
+lisent pour chaque photo : le billet associé, les tags, l'état "liké" de
+l'utilisateur connecté et les infos de l'uploader. Plutôt que de laisser
+chaque card déclencher ses propres requêtes, on attache tout en une passe
+sur la page : le nombre de requêtes ne dépend plus de la taille de page.
+"""
+from urllib.parse import quote
+
+from django.db.models import prefetch_related_objects
+from django.urls import reverse, NoReverseMatch
+
+from .models import Blog, Like
+
+_USERNAME_PLACEHOLDER = "__username__"
+
+
+def profile_url_template():
+    """
+    Gabarit d'URL de profil, résolu une seule fois par batch :
+    profile_url_template().format(username=...) évite un reverse() par ligne.
+    """
+    try:
+        url = reverse("user-profile", kwargs={"username": _USERNAME_PLACEHOLDER})
+    except NoReverseMatch:
+        url = f"/profile/{_USERNAME_PLACEHOLDER}/"
+    return url.replace("{", "{{").replace("}", "}}").replace(_USERNAME_PLACEHOLDER, "{username}")
+
+
+def profile_url(template, username):
+    # même échappement que reverse() pour un segment de chemin
+    return template.format(username=quote(username, safe="~:@!$&'()*+,;="))
+
+
+def related_blogs(photo_ids):
+    """{photo_id: billet lié} en une requête : le premier par id, comme `photo.blog_set.all|first`."""
+    related = {}
+    for blog in Blog.objects.filter(photo_id__in=photo_ids).order_by("id"):
+        related.setdefault(blog.photo_id, blog)
+    return related
+
+
+def attach_card_data(photos, user):
+    """
+    Attache sur chaque photo de `photos` (liste d'instances, uploader déjà
+    chargé via select_related) :
+      - photo.related_blog : premier billet lié (ou None)       -> 1 requête
+      - photo.tags.all()   : servis depuis le cache de prefetch -> 1 requête
+      - photo.liked        : like de l'utilisateur connecté     -> 1 requête
+      - photo.uploader.profile_url
+    Retourne le dict {photo_id: True} des photos likées (clé `photo_likes`
+    attendue par les templates).
+    """
+    photos = [p for p in photos if getattr(p, "id", None) is not None]
+    if not photos:
+        return {}
+    photo_ids = [p.id for p in photos]
+
+    related = related_blogs(photo_ids)
+
+    prefetch_related_objects(photos, "tags")
+
+    photo_likes = {}
+    if user is not None and user.is_authenticated:
+        liked_ids = Like.objects.filter(user=user, photo_id__in=photo_ids).values_list("photo_id", flat=True)
+        photo_likes = {int(pid): True for pid in liked_ids}
+
+    template = profile_url_template()
+    for photo in photos:
+        photo.related_blog = related.get(photo.id)
+        photo.liked = photo.id in photo_likes
+        photo.uploader.profile_url = profile_url(template, photo.uploader.username)
+
+    return photo_likes
@@ -0,0 +1,134 @@
+# blog/renditions.py
+"""
+Déclinaisons (renditions) d'une image : plusieurs largeurs et formats
+(JPEG de repli + WebP/AVIF si Pillow les supporte), stockées à côté de
+l'original sous user_directory_path, dans un sous-dossier `renditions/`.
+
+Structure enregistrée sur le modèle (JSONField) :
+    {"thumb": {"width": 320, "height": 240, "jpeg": "<nom>", "webp": "<nom>", "avif": "<nom>"}, ...}
+"""
+import os
+
+from PIL import Image, ImageOps, features
+
+# (clé, format Pillow, type MIME), du plus compact au format de repli
+FORMATS = (
+    ('avif', 'AVIF', 'image/avif'),
+    ('webp', 'WEBP', 'image/webp'),
+    ('jpeg', 'JPEG', 'image/jpeg'),
+)
+FALLBACK_FORMAT = 'jpeg'
+QUALITY = {'avif': 55, 'webp': 75, 'jpeg': 82}
+
+
+def available_formats():
+    """Formats réellement encodables par le Pillow installé (JPEG toujours présent)."""
+    return [f for f in FORMATS if f[0] == FALLBACK_FORMAT or features.check(f[0])]
+
+
+def rendition_name(original_name, label, ext):
+    directory, filename = os.path.split(original_name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, "renditions", f"{stem}_{label}.{ext}")
+
+
+def render_renditions(src_path, targets):
+    """
+    Génère les fichiers des renditions. Fonction de module (picklable) :
+    exécutée dans les processus du pool du worker.
+
+    targets : [(label, largeur_max, [(clé, format Pillow, chemin absolu), ...]), ...]
+    Retourne {label: (largeur, hauteur)} ; les labels plus larges que
+    l'original (après le premier) sont ignorés pour ne pas dupliquer l'image.
+    """
+    sizes = {}
+    with Image.open(src_path) as original:
+        original = ImageOps.exif_transpose(original)
+        reached_original = False
+        for label, max_width, outputs in sorted(targets, key=lambda t: t[1]):
+            if reached_original:
+                break
+            image = original.copy()
+            if image.width > max_width:
+                image.thumbnail((max_width, max_width * 10))
+            else:
+                reached_original = True
+            for key, pil_format, path in outputs:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                out = image.convert('RGB') if key == 'jpeg' and image.mode not in ('RGB', 'L') else image
+                out.save(path, pil_format, quality=QUALITY.get(key, 80))
+            sizes[label] = image.size
+    return sizes
+
+
+def plan_renditions(original_name, sizes, storage):
+    """
+    Prépare les cibles pour render_renditions() et les noms à enregistrer.
+    Retourne (targets, names) avec names = {label: {clé: nom_stockage}}.
+    """
+    formats = available_formats()
+    targets, names = [], {}
+    for label, width in sizes.items():
+        outputs = []
+        names[label] = {}
+        for key, pil_format, _mime in formats:
+            name = rendition_name(original_name, label, key)
+            outputs.append((key, pil_format, storage.path(name)))
+            names[label][key] = name
+        targets.append((label, width, outputs))
+    return targets, names
+
+
+def build_renditions(names, rendered_sizes):
+    """Assemble le dict stocké sur le modèle à partir des tailles réellement produites."""
+    renditions = {}
+    for label, (width, height) in rendered_sizes.items():
+        renditions[label] = dict(names[label], width=width, height=height)
+    return renditions
+
+
+def srcset(renditions, fmt, url):
+    """Chaîne srcset ('url 320w, url 800w') pour un format ; '' si absent."""
+    entries = sorted(
+        (r['width'], r[fmt]) for r in (renditions or {}).values() if r.get(fmt)
+    )
+    return ", ".join(f"{url(name)} {width}w" for width, name in entries)
+
+
+def srcsets(renditions, url):
+    """{clé_format: srcset} pour tous les formats présents (utilisé par le JSON)."""
+    result = {}
+    for key, _pil_format, _mime in FORMATS:
+        value = srcset(renditions, key, url)
+        if value:
+            result[key] = value
+    return result
+
+
+def rendition_url(renditions, label, url, fmt=FALLBACK_FORMAT):
+    """URL d'une rendition (format de repli par défaut), None si absente."""
+    rendition = (renditions or {}).get(label) or {}
+    name = rendition.get(fmt)
+    return url(name) if name else None
+
+
+def image_sources(obj, field_name, default='medium'):
+    """
+    URLs d'affichage d'un champ image d'un modèle déclarant RENDITIONS.
+    Retourne {'url': rendition `default` (JPEG) ou à défaut la plus grande
+    disponible ou l'original, 'srcset': {clé_format: srcset}} ;
+    None si le champ est vide.
+    """
+    image = getattr(obj, field_name, None)
+    if not image or not getattr(image, 'name', ''):
+        return None
+    renditions = getattr(obj, obj.RENDITIONS[field_name][0], None) or {}
+    url = image.storage.url
+    fallback = rendition_url(renditions, default, url)
+    if fallback is None and renditions:
+        largest = max(renditions, key=lambda label: renditions[label].get('width', 0))
+        fallback = rendition_url(renditions, largest, url)
+    return {
+        'url': fallback or image.url,
+        'srcset': srcsets(renditions, url),
+    }
@@ -0,0 +1,127 @@
+# blog/request_log.py
+"""
+Journal des requêtes au format JSON lines, écrit hors du chemin de la requête.
+
+La requête ne fait qu'un `queue.put` (quelques µs) ; un thread d'arrière-plan
+vide la file par lots (REQUEST_LOG_BATCH_SIZE lignes ou
+REQUEST_LOG_FLUSH_SECONDS), en un seul write() par lot, et fait tourner le
+fichier au-delà de REQUEST_LOG_MAX_BYTES :
+    requests.jsonl -> requests.jsonl.1 -> ... -> requests.jsonl.<BACKUP_COUNT>
+Si la file déborde (disque bloqué), les entrées en trop sont comptées et
+abandonnées plutôt que de ralentir les requêtes.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# --- Hyperparamètres ---
+REQUEST_LOG_DIR = Path(getattr(settings, 'REQUEST_LOG_DIR', Path(settings.BASE_DIR) / 'var' / 'request_log'))
+REQUEST_LOG_FILENAME = 'requests.jsonl'
+REQUEST_LOG_MAX_BYTES = 10 * 1024 * 1024
+REQUEST_LOG_BACKUP_COUNT = 5
+REQUEST_LOG_BATCH_SIZE = 200
+REQUEST_LOG_FLUSH_SECONDS = 1.0
+REQUEST_LOG_QUEUE_SIZE = 10000
+
+
+class RequestLogWriter:
+    """File d'entrées (dicts) vidée par lots dans un fichier JSONL tournant."""
+
+    def __init__(self, directory=REQUEST_LOG_DIR, filename=REQUEST_LOG_FILENAME,
+                 max_bytes=REQUEST_LOG_MAX_BYTES, backup_count=REQUEST_LOG_BACKUP_COUNT,
+                 batch_size=REQUEST_LOG_BATCH_SIZE, flush_seconds=REQUEST_LOG_FLUSH_SECONDS):
+        self.path = Path(directory) / filename
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=REQUEST_LOG_QUEUE_SIZE)
+        self._lock = threading.Lock()   # un seul écrivain à la fois (thread ou flush())
+        self._thread = None
+        self._stopping = threading.Event()
+
+    # --- côté requête ---
+    def write(self, entry):
+        """Non bloquant : démarre le thread au premier appel, abandonne si la file est pleine."""
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self.dropped += 1
+
+    # --- côté thread ---
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='request-log-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._take_batch(timeout=self.flush_seconds)
+            if batch:
+                self._write_batch(batch)
+
+    def _take_batch(self, timeout=None):
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=timeout) if timeout else self._queue.get_nowait())
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _write_batch(self, batch):
+        data = ''.join(json.dumps(entry, separators=(',', ':'), default=str) + '\n' for entry in batch)
+        with self._lock:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._rotate_if_needed(len(data))
+                with open(self.path, 'a', encoding='utf-8') as fh:
+                    fh.write(data)
+            except OSError:
+                self.dropped += len(batch)
+                logger.warning("Écriture du journal des requêtes impossible (%s)", self.path, exc_info=True)
+
+    def _rotate_if_needed(self, incoming):
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size + incoming <= self.max_bytes:
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            src = self.path.with_name(f"{self.path.name}.{i}")
+            if src.exists():
+                os.replace(src, self.path.with_name(f"{self.path.name}.{i + 1}"))
+        if self.backup_count:
+            os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+        else:
+            self.path.unlink()
+
+    def flush(self):
+        """Écrit immédiatement tout ce qui est en file (arrêt, tests)."""
+        while True:
+            batch = self._take_batch()
+            if not batch:
+                return
+            self._write_batch(batch)
+
+    def close(self):
+        self._stopping.set()
+        self.flush()
+
+
+writer = RequestLogWriter()
+atexit.register(writer.close)
@@ -0,0 +1,142 @@
+# blog/routers.py
+"""
+Lectures sur réplique, écritures sur le primaire.
+
+Les lectures ne partent vers la réplique (alias REPLICA_ALIAS) qu'à
+l'intérieur d'un bloc read_from_replica() : pages en lecture seule
+(ReplicaReadsMixin sur HomeView, UserProfileView, BlogDetailView) et
+algorithme de feed. Partout ailleurs, et dans toute transaction ouverte
+sur le primaire, lectures comme écritures restent sur 'default'.
+
+Lire ses propres écritures : après une requête d'écriture réussie
+(ReplicaStickinessMiddleware), l'utilisateur est collé au primaire pendant
+REPLICA_STICKY_SECONDS, le temps que la réplique rattrape son retard.
+
+En local, la réplique est un second fichier SQLite recopié depuis le
+primaire par l'API de backup en ligne (`manage.py refresh_replica`) ;
+activée par le réglage REPLICA_READS_ENABLED.
+"""
+import sqlite3
+from contextlib import closing, contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# --- Hyperparamètres ---
+REPLICA_ALIAS = 'replica'
+REPLICA_STICKY_SECONDS = 10     # > intervalle de rafraîchissement (ou retard de réplication) de la réplique
+REPLICA_BACKUP_PAGES = 1024     # pages copiées par pas de backup ; les écrivains passent entre deux pas
+
+_read_alias = ContextVar('fotoblog_read_alias', default=None)
+
+
+def replica_enabled():
+    return getattr(settings, 'REPLICA_READS_ENABLED', False) and REPLICA_ALIAS in settings.DATABASES
+
+
+# ======================================================
+# Lire ses écritures
+# ======================================================
+def sticky_key(user_id):
+    return f"replica:sticky:{user_id}"
+
+
+def mark_written(user_id):
+    """`user_id` vient d'écrire : ses lectures restent sur le primaire pendant REPLICA_STICKY_SECONDS."""
+    if user_id is not None and replica_enabled():
+        seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', REPLICA_STICKY_SECONDS)
+        cache.set(sticky_key(user_id), True, seconds)
+
+
+def is_sticky(user):
+    return user is not None and user.is_authenticated and cache.get(sticky_key(user.pk)) is not None
+
+
+@contextmanager
+def read_from_replica(user=None):
+    """
+    Lectures du bloc sur la réplique, sauf réplique désactivée ou `user`
+    collé au primaire (écriture récente) : elles restent alors sur 'default'.
+    """
+    alias = REPLICA_ALIAS if replica_enabled() and not is_sticky(user) else None
+    token = _read_alias.set(alias)
+    try:
+        yield alias or DEFAULT_DB_ALIAS
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaReadsMixin:
+    """Vue : GET/HEAD servis depuis la réplique, rendu différé du template compris."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+        # session et request.user chargés ici, donc sur le primaire
+        with read_from_replica(request.user):
+            response = super().dispatch(request, *args, **kwargs)
+        if hasattr(response, 'render') and not response.is_rendered:
+            # TemplateResponse : rendue après les middlewares, dans un nouveau bloc
+            render = response.render
+
+            def render_from_replica():
+                with read_from_replica(request.user):
+                    return render()
+            response.render = render_from_replica
+        return response
+
+
+# ======================================================
+# Routeur (réglage DATABASE_ROUTERS)
+# ======================================================
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        alias = _read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            # explicite : sinon Django relirait une instance sur la base d'où elle vient
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # mêmes données des deux côtés : une instance lue sur la réplique se lie à une instance du primaire
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, REPLICA_ALIAS}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # schéma de la réplique recopié avec les données (refresh_replica)
+        return db != REPLICA_ALIAS
+
+
+# ======================================================
+# Réplique locale : copie SQLite par l'API de backup
+# ======================================================
+def refresh_replica(target=None, pages=REPLICA_BACKUP_PAGES):
+    """
+    Copie la base 'default' vers `target` (par défaut le fichier de l'alias
+    REPLICA_ALIAS) par l'API de backup en ligne de SQLite : copie cohérente
+    sans arrêter les écrivains, lecteurs de la réplique servis pendant la
+    copie. Retourne le nombre de pages copiées.
+    """
+    source = connections[DEFAULT_DB_ALIAS]
+    if source.vendor != 'sqlite':
+        raise ValueError("La réplique locale ne se recopie que depuis une base SQLite.")
+    target = Path(target or settings.DATABASES[REPLICA_ALIAS]['NAME'])
+    target.parent.mkdir(parents=True, exist_ok=True)
+    source.ensure_connection()
+    copied = 0
+
+    def progress(status, remaining, total):
+        nonlocal copied
+        copied = total
+
+    with closing(sqlite3.connect(target)) as replica:
+        source.connection.backup(replica, pages=pages, progress=progress)
+    return copied
@@ -0,0 +1,93 @@
+# blog/serializers.py
+"""
+Sérialisation JSON des cards de photos (scroll infini de HomeView et
+UserProfileView).
+
+Le serializer travaille par batch d'ids et lit les cards de photos et
+d'uploaders dans le cache de cards (blog/cards.py, un get_many par type) ;
+seules les cards absentes sont construites (photos, billets liés, tags,
+uploaders : un nombre fixe de requêtes quel que soit le batch). Reste une
+requête par batch pour l'état "liké", propre au lecteur. La boucle par item
+ne fait plus que de l'assemblage de dicts.
+"""
+from . import cards
+from .models import Like, Photo
+from .utils import publications_time
+
+
+def hydrate_photos(photo_ids):
+    """Charge les Photo (+ uploader) en une requête, dans l'ordre des ids."""
+    if not photo_ids:
+        return []
+    photos_map = Photo.objects.select_related("uploader").in_bulk(photo_ids)
+    return [photos_map[pid] for pid in photo_ids if pid in photos_map]
+
+
+def serialize_photo(card, uploader, liked):
+    """Dict JSON d'une photo : sa card, celle de son uploader, l'état "liké" du lecteur."""
+    date_created = card["date_created"]
+    return {
+        "id": card["id"],
+        "url": card["url"],
+        "srcset": card["srcset"],
+        "caption": card["caption"],
+        "uploader": uploader,
+        "likes_count": card["likes_count"],
+        "liked": liked,
+        "date_created": date_created.isoformat() if date_created else None,
+        "date_facebook": publications_time(date_created),
+        "related_blog": card["related_blog"],
+        "tags": card["tags"],
+    }
+
+
+def liked_photo_ids(photo_ids, user):
+    if user is None or not user.is_authenticated or not photo_ids:
+        return set()
+    return set(Like.objects.filter(user=user, photo_id__in=photo_ids).values_list("photo_id", flat=True))
+
+
+def serialize_photo_ids(photo_ids, user, photos=None):
+    """
+    Point d'entrée des endpoints JSON : ids ordonnés -> liste de dicts JSON.
+    Cards en cache : 1 requête (likes du lecteur) ; sinon au plus 4 de plus
+    (photos, billets liés, tags, uploaders). `photos` : instances déjà
+    chargées (uploader compris), réutilisées pour les cards absentes.
+    """
+    photo_ids = list(photo_ids)
+    photos = list(photos or ())
+    known = {p.id: p for p in photos}
+
+    def load(ids):
+        # photos absentes du cache lues avec leur uploader : sa card se construit sans requête de plus
+        loaded = hydrate_photos([i for i in ids if i not in known])
+        photos.extend(loaded)
+        return cards.build_photo_cards([known[i] for i in ids if i in known] + loaded)
+
+    photo_cards = cards.read_through("photo", photo_ids, load)
+    uploader_cards = cards.user_cards([c["uploader_id"] for c in photo_cards.values()], [p.uploader for p in photos])
+    liked = liked_photo_ids(list(photo_cards), user)
+    return [
+        serialize_photo(photo_cards[pid], uploader_cards.get(photo_cards[pid]["uploader_id"]), pid in liked)
+        for pid in photo_ids if pid in photo_cards
+    ]
+
+
+def serialize_photos(photos, user):
+    """Liste de dicts JSON pour des instances Photo (uploader chargé)."""
+    photos = list(photos)
+    return serialize_photo_ids([p.id for p in photos], user, photos)
+
+
+def feed_payload(items, offset, limit, has_next, total, **extra):
+    """Enveloppe commune des réponses de scroll infini."""
+    payload = {
+        "photos": items,
+        "offset": offset,
+        "limit": limit,
+        "returned": len(items),
+        "has_next": has_next,
+        "total": total,
+    }
+    payload.update(extra)
+    return payload
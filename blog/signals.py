@@ -0,0 +1,156 @@
+# blog/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import cards, stats, timelines
+from .models import Photo, Blog, Like
+from .pool import mark_pool_stale
+from .snapshots import invalidate_snapshots, mark_published
+
+User = get_user_model()
+
+
+def _followers_of(user_id):
+    return list(User.objects.filter(follows=user_id).values_list('id', flat=True))
+
+
+@receiver(m2m_changed, sender=User.follows.through)
+def invalidate_feed_on_follow(sender, instance, action, reverse, pk_set, **kwargs):
+    """Follow/unfollow : le feed des abonnés concernés doit être recalculé."""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_snapshots([instance.pk])
+        return
+    # côté créateur (creator.followers.add/remove/clear) : pk_set = abonnés
+    if action in ('post_add', 'post_remove'):
+        invalidate_snapshots(pk_set or [])
+    elif action == 'pre_clear':
+        invalidate_snapshots(_followers_of(instance.pk))
+
+
+@receiver(post_save, sender=Photo)
+def count_photo_upload(sender, instance, created, **kwargs):
+    if created:
+        User.objects.filter(pk=instance.uploader_id).update(photos_count=F('photos_count') + 1)
+
+
+@receiver(post_delete, sender=Photo)
+def count_photo_delete(sender, instance, **kwargs):
+    # les likes de la photo partent avec elle (CASCADE)
+    User.objects.filter(pk=instance.uploader_id).update(
+        photos_count=Greatest(F('photos_count') - 1, 0),
+        likes_received_count=Greatest(F('likes_received_count') - instance.likes_count, 0),
+    )
+
+
+@receiver(post_save, sender=Photo)
+def uploader_stats_on_photo_upload(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.uploader_id, photos_count=1, recent_posts_count=1)
+
+
+@receiver(post_delete, sender=Photo)
+def uploader_stats_on_photo_delete(sender, instance, **kwargs):
+    stats.bump(instance.uploader_id, photos_count=-1, likes_count=-instance.likes_count,
+               recent_posts_count=-int(stats.is_recent(instance.date_created)))
+
+
+@receiver(post_save, sender=Blog)
+def uploader_stats_on_blog_post(sender, instance, created, **kwargs):
+    if created:
+        stats.bump(instance.author_id, blogs_count=1, recent_posts_count=1)
+
+
+@receiver(post_delete, sender=Blog)
+def uploader_stats_on_blog_delete(sender, instance, **kwargs):
+    stats.bump(instance.author_id, blogs_count=-1,
+               recent_posts_count=-int(stats.is_recent(instance.date_created)))
+
+
+@receiver(post_save, sender=Photo)
+def invalidate_feed_on_photo_upload(sender, instance, created, **kwargs):
+    if created:
+        mark_pool_stale()
+        mark_published(instance.uploader_id)
+
+
+@receiver(post_save, sender=Blog)
+def invalidate_feed_on_blog_post(sender, instance, created, **kwargs):
+    if created:
+        mark_pool_stale()
+        mark_published(instance.author_id)
+
+
+# --- Timelines (fan-out à l'écriture, voir blog/timelines.py) ---
+@receiver(post_save, sender=Photo)
+def timeline_on_photo_upload(sender, instance, created, **kwargs):
+    if created:
+        timelines.fan_out('photo', instance.pk, instance.uploader_id, instance.date_created)
+
+
+@receiver(post_save, sender=Blog)
+def timeline_on_blog_post(sender, instance, created, **kwargs):
+    if created:
+        timelines.fan_out('blog', instance.pk, instance.author_id, instance.date_created)
+
+
+@receiver(m2m_changed, sender=User.follows.through)
+def timeline_on_follow(sender, instance, action, reverse, pk_set, **kwargs):
+    """Follow : backfill des derniers contenus ; unfollow : retrait des entrées du créateur."""
+    if action in ('post_add', 'post_remove'):
+        followers, creators = (pk_set or [], [instance.pk]) if reverse else ([instance.pk], pk_set or [])
+        if action == 'post_add':
+            timelines.backfill(followers, creators)
+        else:
+            timelines.remove_author(followers, creators)
+    elif action == 'pre_clear':
+        if reverse:
+            timelines.remove_author(_followers_of(instance.pk), [instance.pk])
+        else:
+            timelines.remove_author([instance.pk], list(instance.follows.values_list('id', flat=True)))
+
+
+# --- Cards en cache (blog/cards.py) ---
+@receiver(post_save, sender=Photo)
+@receiver(post_delete, sender=Photo)
+def invalidate_photo_card(sender, instance, **kwargs):
+    cards.invalidate('photo', [instance.pk])
+
+
+@receiver(post_save, sender=Like)
+@receiver(post_delete, sender=Like)
+def invalidate_card_on_like(sender, instance, **kwargs):
+    # likes_count de la card
+    cards.invalidate('photo', [instance.photo_id])
+
+
+@receiver(pre_save, sender=Blog)
+def remember_blog_photo(sender, instance, **kwargs):
+    """Photo liée avant modification : sa card porte encore ce billet."""
+    instance._previous_photo_id = (
+        Blog.objects.filter(pk=instance.pk).values_list('photo_id', flat=True).first() if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Blog)
+@receiver(post_delete, sender=Blog)
+def invalidate_blog_card(sender, instance, **kwargs):
+    # billet lié (id, titre) des cards de photos
+    cards.invalidate('blog', [instance.pk])
+    cards.invalidate('photo', {instance.photo_id, getattr(instance, '_previous_photo_id', None)})
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_card(sender, instance, **kwargs):
+    cards.invalidate('user', [instance.pk])
+
+
+@receiver(m2m_changed, sender=Photo.tags.through)
+def invalidate_card_on_tags(sender, instance, action, reverse, **kwargs):
+    # through partagé par Photo et Blog (taggit)
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        cards.invalidate_model(type(instance), [instance.pk])
@@ -0,0 +1,129 @@
+# blog/snapshots.py
+"""
+Snapshots de feed par utilisateur.
+
+Le feed personnalisé est calculé une seule fois par "génération" puis stocké
+dans le cache sous forme de liste ordonnée d'ids de photos. Les appels de
+scroll infini lisent ensuite une tranche de cette liste via un curseur opaque
+(token de génération + position), sans recalculer le feed : l'ordre reste
+stable d'une page à l'autre.
+
+Une publication ne touche pas aux snapshots de ses abonnés (nombre non
+borné) : elle horodate le créateur (mark_published), et une génération
+courante est ignorée à la lecture si l'un des créateurs qu'elle suit a
+publié depuis son calcul.
+"""
+import base64
+import binascii
+import time
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .metrics import FEED_SNAPSHOTS
+
+# --- Hyperparamètres ---
+SNAPSHOT_TTL_SECONDS = 10 * 60   # durée de vie d'une génération de feed
+SNAPSHOT_SIZE = 500              # nombre d'items calculés par génération
+
+
+def _current_key(user_id):
+    return f"feed:current:{user_id}"
+
+
+def _snapshot_key(user_id, token):
+    return f"feed:snapshot:{user_id}:{token}"
+
+
+def _published_key(creator_id):
+    return f"feed:published:{creator_id}"
+
+
+def store_snapshot(user_id, photo_ids, creator_ids=(), built_at=None):
+    """
+    Enregistre une nouvelle génération de feed et la désigne comme courante.
+    `creator_ids` : créateurs dont une publication postérieure à `built_at`
+    (début du calcul) périme cette génération. Retourne le token de génération.
+    """
+    token = uuid.uuid4().hex[:12]
+    built_at = time.time() if built_at is None else built_at
+    cache.set(_snapshot_key(user_id, token), list(photo_ids), SNAPSHOT_TTL_SECONDS)
+    cache.set(_current_key(user_id), (token, built_at, tuple(creator_ids)), SNAPSHOT_TTL_SECONDS)
+    return token
+
+
+def mark_published(creator_id):
+    """
+    Nouvelle publication de `creator_id` : les générations qui le suivent,
+    calculées avant, sont périmées. Une écriture quel que soit le nombre
+    d'abonnés ; refaite au COMMIT, comme cards.invalidate (un calcul fait
+    entre les deux ne voyait pas encore la publication).
+    """
+    def mark():
+        # une génération vit SNAPSHOT_TTL_SECONDS : l'horodatage ne sert pas plus longtemps
+        cache.set(_published_key(creator_id), time.time(), SNAPSHOT_TTL_SECONDS)
+
+    mark()
+    transaction.on_commit(mark)
+
+
+def _published_since(creator_ids, built_at):
+    stamps = cache.get_many([_published_key(c) for c in creator_ids])
+    return any(stamp >= built_at for stamp in stamps.values())
+
+
+def get_snapshot(user_id, token):
+    """Retourne la liste d'ids d'une génération, ou None si expirée."""
+    if not token:
+        return None
+    return cache.get(_snapshot_key(user_id, token))
+
+
+def get_or_build_snapshot(user_id, builder, creators=None):
+    """
+    Retourne (token, ids) de la génération courante de l'utilisateur.
+    `builder` est appelé (sans argument) pour calculer les ids si aucune
+    génération valide n'existe ; `creators` (sans argument, optionnel) donne
+    alors les créateurs suivis, dont les publications la périmeront.
+    """
+    current = cache.get(_current_key(user_id))
+    if current is not None:
+        token, built_at, creator_ids = current
+        ids = get_snapshot(user_id, token)
+        if ids is not None and not _published_since(creator_ids, built_at):
+            FEED_SNAPSHOTS.inc(result='hit')
+            return token, ids
+    FEED_SNAPSHOTS.inc(result='miss')
+    built_at = time.time()
+    creator_ids = list(creators()) if creators is not None else []
+    ids = list(builder())
+    return store_snapshot(user_id, ids, creator_ids, built_at), ids
+
+
+def invalidate_snapshots(user_ids):
+    """
+    Oublie la génération courante des utilisateurs donnés : le prochain
+    chargement du feed en recalculera une. Les curseurs déjà distribués
+    restent lisibles jusqu'à expiration (pas de saut/doublon en plein scroll).
+    """
+    keys = [_current_key(uid) for uid in user_ids if uid is not None]
+    if keys:
+        cache.delete_many(keys)
+
+
+def encode_cursor(token, position):
+    raw = f"{token}:{int(position)}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Retourne (token, position) ; (None, 0) si le curseur est invalide."""
+    if not cursor:
+        return None, 0
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        token, position = base64.urlsafe_b64decode(padded.encode()).decode().split(":", 1)
+        return token, max(0, int(position))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None, 0
@@ -0,0 +1,148 @@
+# blog/stats.py
+"""
+Statistiques d'uploader (UploaderStats) pour l'algorithme de feed.
+
+influence_score = 10 · likes / (photos + 1) + 20 · min(posts récents / 10, 1)
+is_creator      = au moins un billet publié
+
+Mises à jour :
+  - incrémentales : like/unlike, upload/suppression de photo, billet
+    (UPDATE ... SET x = x ± n, puis influence recalculée en SQL sur la ligne) ;
+  - complètes : recompute_uploader_stats() / `manage.py recompute_uploader_stats`,
+    qui fait aussi "vieillir" recent_posts_count (à lancer périodiquement).
+Lecture côté feed : influence_for(uploader_ids), une requête sur la clé
+primaire pour les uploaders absents du cache en mémoire du processus.
+"""
+import time
+from datetime import timedelta
+
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q, Sum, Value
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from .models import Blog, Photo, UploaderStats
+
+# --- Hyperparamètres ---
+INFLUENCE_RECENT_DAYS = 30
+INFLUENCE_CACHE_TTL_SECONDS = 60
+
+INFLUENCE_EXPRESSION = ExpressionWrapper(
+    F('likes_count') * 10.0 / (F('photos_count') + 1)
+    + Least(F('recent_posts_count') / 10.0, Value(1.0)) * 20.0,
+    output_field=FloatField(),
+)
+
+_DEFAULT = {'is_creator': False, 'influence_score': 0.0}
+_cache = {}
+_cache_expires = 0.0
+
+
+# ======================================================
+# Recalcul complet
+# ======================================================
+def recompute_uploader_stats(user_ids=None):
+    """
+    Recalcule les stats depuis Photo/Blog (tous les uploaders, ou `user_ids`).
+    Deux agrégats groupés (photos, billets), puis création/mise à jour en masse.
+    Retourne le nombre de lignes écrites.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(days=INFLUENCE_RECENT_DAYS)
+    photos = Photo.objects.all()
+    blogs = Blog.objects.all()
+    if user_ids is not None:
+        user_ids = [uid for uid in user_ids if uid is not None]
+        photos = photos.filter(uploader_id__in=user_ids)
+        blogs = blogs.filter(author_id__in=user_ids)
+
+    rows = {}
+
+    def row(uid):
+        return rows.setdefault(uid, {'likes_count': 0, 'photos_count': 0, 'blogs_count': 0, 'recent_posts_count': 0})
+
+    for it in (photos.values('uploader_id')
+               .annotate(likes=Sum('likes_count'), n=Count('id'), recent=Count('id', filter=Q(date_created__gte=cutoff)))):
+        r = row(it['uploader_id'])
+        r['likes_count'], r['photos_count'] = it['likes'] or 0, it['n']
+        r['recent_posts_count'] += it['recent']
+    for it in blogs.values('author_id').annotate(n=Count('id'), recent=Count('id', filter=Q(date_created__gte=cutoff))):
+        r = row(it['author_id'])
+        r['blogs_count'] = it['n']
+        r['recent_posts_count'] += it['recent']
+    if user_ids is None:
+        # uploaders n'ayant plus aucun contenu
+        UploaderStats.objects.exclude(user_id__in=rows).update(
+            likes_count=0, photos_count=0, blogs_count=0, recent_posts_count=0,
+            influence_score=0.0, date_refreshed=now,
+        )
+    else:
+        for uid in user_ids:
+            row(uid)  # uploader sans contenu : remise à zéro
+
+    existing = set(UploaderStats.objects.filter(user_id__in=rows).values_list('user_id', flat=True))
+    to_update, to_create = [], []
+    for uid, values in rows.items():
+        stats = UploaderStats(user_id=uid, date_refreshed=now, **values)
+        (to_update if uid in existing else to_create).append(stats)
+    fields = ['likes_count', 'photos_count', 'blogs_count', 'recent_posts_count', 'date_refreshed']
+    if to_update:
+        UploaderStats.objects.bulk_update(to_update, fields, batch_size=500)
+    if to_create:
+        UploaderStats.objects.bulk_create(to_create, batch_size=500)
+    UploaderStats.objects.filter(user_id__in=rows).update(influence_score=INFLUENCE_EXPRESSION)
+    return len(rows)
+
+
+# ======================================================
+# Mises à jour incrémentales
+# ======================================================
+def bump(user_id, **deltas):
+    """
+    Applique des deltas (likes_count=+1, photos_count=-1, ...) à un uploader,
+    sans jamais passer sous zéro, puis recalcule son influence.
+    Sans ligne existante, la ligne est construite par un recalcul complet.
+    """
+    if user_id is None:
+        return
+    changes = {field: Greatest(F(field) + delta, 0) for field, delta in deltas.items() if delta}
+    if not changes:
+        return
+    qs = UploaderStats.objects.filter(user_id=user_id)
+    if qs.update(**changes):
+        qs.update(influence_score=INFLUENCE_EXPRESSION)
+    else:
+        recompute_uploader_stats([user_id])
+
+
+def is_recent(date_created):
+    return date_created is not None and date_created >= timezone.now() - timedelta(days=INFLUENCE_RECENT_DAYS)
+
+
+# ======================================================
+# Lecture (feed)
+# ======================================================
+def influence_for(uploader_ids):
+    """
+    {uploader_id: {'is_creator', 'influence_score'}} pour les ids donnés.
+    Cache en mémoire du processus (INFLUENCE_CACHE_TTL_SECONDS) : les scores
+    évoluent lentement et sont identiques pour tous les lecteurs.
+    """
+    global _cache, _cache_expires
+    if time.monotonic() >= _cache_expires:
+        _cache = {}
+        _cache_expires = time.monotonic() + INFLUENCE_CACHE_TTL_SECONDS
+    missing = [uid for uid in uploader_ids if uid not in _cache]
+    if missing:
+        found = {
+            uid: {'is_creator': blogs > 0, 'influence_score': score}
+            for uid, blogs, score in UploaderStats.objects.filter(user_id__in=missing)
+            .values_list('user_id', 'blogs_count', 'influence_score')
+        }
+        for uid in missing:
+            _cache[uid] = found.get(uid, _DEFAULT)
+    return {uid: _cache[uid] for uid in uploader_ids}
+
+
+def clear_influence_cache():
+    global _cache_expires
+    _cache_expires = 0.0
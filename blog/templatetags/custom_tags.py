@@ -1,7 +1,33 @@
 from django import template
+from django.utils.html import format_html, format_html_join
+
+from blog.renditions import FALLBACK_FORMAT, FORMATS, image_sources
 
 register = template.Library()
 
 @register.filter
 def dict_get(d, key):
-    return d.get(key)
\ No newline at end of file
+    return d.get(key)
+
+
+@register.simple_tag
+def picture(obj, field_name, sizes="100vw", alt="", default="medium", loading="lazy"):
+    """
+    <picture> responsive pour un champ image ayant des renditions :
+    sources AVIF/WebP + <img> JPEG avec srcset, repli sur l'original.
+    Usage : {% picture photo "image" sizes="(max-width: 600px) 100vw, 600px" alt=photo.caption %}
+    """
+    sources = image_sources(obj, field_name, default)
+    if sources is None:
+        return ""
+    srcset = sources['srcset']
+    modern = format_html_join(
+        "", '<source type="{}" srcset="{}" sizes="{}">',
+        ((mime, srcset[key], sizes) for key, _fmt, mime in FORMATS if key != FALLBACK_FORMAT and key in srcset),
+    )
+    if FALLBACK_FORMAT in srcset:
+        img = format_html('<img src="{}" srcset="{}" sizes="{}" alt="{}" loading="{}">',
+                          sources['url'], srcset[FALLBACK_FORMAT], sizes, alt, loading)
+    else:
+        img = format_html('<img src="{}" alt="{}" loading="{}">', sources['url'], alt, loading)
+    return format_html("<picture>{}{}</picture>", modern, img)
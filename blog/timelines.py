@@ -0,0 +1,164 @@
+# blog/timelines.py
+"""
+Timelines par abonné pour le bucket 'followed' du feed.
+
+Fan-out à l'écriture : à l'upload d'une photo ou d'un billet, une
+TimelineEntry est insérée pour chaque abonné de l'auteur (un INSERT groupé).
+Le bucket 'followed' lit alors les TIMELINE_READ_SIZE entrées les plus
+récentes de l'utilisateur (index (user, -date_created, -id)), sans dépendre
+du pool global : un abonné de créateurs "de niche" n'est plus affamé.
+
+  - suivre   : backfill des BACKFILL_PER_CREATOR derniers contenus du créateur ;
+  - ne plus suivre : suppression des entrées de ce créateur ;
+  - longueur : rognée à TIMELINE_MAX_LENGTH (lors d'un fan-out sur
+    TIMELINE_TRIM_EVERY, au backfill, et par `manage.py trim_timelines`).
+
+Hybride : au-delà de FANOUT_MAX_FOLLOWERS abonnés, un créateur n'est plus
+recopié (l'amplification d'écriture resterait proportionnelle à son
+audience) ; ses contenus récents sont lus à la demande (fan-out à la
+lecture), sur l'index (uploader, -date_created, -id) de Photo.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import Blog, Photo, TimelineEntry
+
+User = get_user_model()
+
+# --- Hyperparamètres ---
+TIMELINE_MAX_LENGTH = 500      # entrées conservées par abonné
+TIMELINE_TRIM_EVERY = 10       # un fan-out sur N rogne les timelines touchées
+TIMELINE_READ_SIZE = 100       # entrées lues par calcul de feed
+BACKFILL_PER_CREATOR = 50      # contenus recopiés lors d'un nouveau follow
+FANOUT_MAX_FOLLOWERS = 5000    # au-delà : fan-out à la lecture
+BULK_BATCH_SIZE = 500
+
+_RECENT = (F('date_created').desc(), F('id').desc())
+
+
+def _entry(user_id, kind, object_id, author_id, date_created):
+    return TimelineEntry(user_id=user_id, author_id=author_id, date_created=date_created,
+                         **{'photo_id' if kind == 'photo' else 'blog_id': object_id})
+
+
+# ======================================================
+# Écriture
+# ======================================================
+def fan_out(kind, object_id, author_id, date_created):
+    """
+    Recopie un nouveau contenu dans la timeline des abonnés de l'auteur.
+    Retourne le nombre d'abonnés servis (0 pour un créateur au-delà de
+    FANOUT_MAX_FOLLOWERS, lu à la demande).
+    """
+    # au plus MAX + 1 ids : suffit à savoir si l'auteur relève du fan-out à la lecture
+    followers = list(User.objects.filter(follows=author_id).values_list('id', flat=True)[:FANOUT_MAX_FOLLOWERS + 1])
+    if not followers or len(followers) > FANOUT_MAX_FOLLOWERS:
+        return 0
+    with transaction.atomic():
+        TimelineEntry.objects.bulk_create(
+            [_entry(uid, kind, object_id, author_id, date_created) for uid in followers],
+            batch_size=BULK_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        if object_id % TIMELINE_TRIM_EVERY == 0:
+            trim_timelines(followers)
+    return len(followers)
+
+
+def backfill(follower_ids, creator_ids):
+    """
+    Recopie les BACKFILL_PER_CREATOR derniers contenus (photos et billets) de
+    chaque créateur dans la timeline des abonnés : une requête par type
+    (ROW_NUMBER par auteur), puis un INSERT groupé. Les créateurs au-delà de
+    FANOUT_MAX_FOLLOWERS sont ignorés (lus à la demande).
+    """
+    follower_ids = [uid for uid in follower_ids if uid is not None]
+    creator_ids = list(User.objects.filter(pk__in=creator_ids, followers_count__lte=FANOUT_MAX_FOLLOWERS)
+                       .values_list('id', flat=True))
+    if not follower_ids or not creator_ids:
+        return 0
+    recent = []
+    for kind, model, author_field in (('photo', Photo, 'uploader_id'), ('blog', Blog, 'author_id')):
+        recent += [
+            (kind, object_id, author_id, date_created)
+            for object_id, author_id, date_created in model.objects
+            .filter(**{f'{author_field}__in': creator_ids})
+            .annotate(rank=Window(RowNumber(), partition_by=F(author_field), order_by=_RECENT))
+            .filter(rank__lte=BACKFILL_PER_CREATOR)
+            .values_list('id', author_field, 'date_created')
+        ]
+    if not recent:
+        return 0
+    with transaction.atomic():
+        TimelineEntry.objects.bulk_create(
+            [_entry(uid, *item) for uid in follower_ids for item in recent],
+            batch_size=BULK_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        trim_timelines(follower_ids)
+    return len(recent) * len(follower_ids)
+
+
+def remove_author(follower_ids, author_ids):
+    """Ne plus suivre : retire les contenus de ces auteurs des timelines données."""
+    return TimelineEntry.objects.filter(user_id__in=follower_ids, author_id__in=author_ids).delete()[0]
+
+
+def trim_timelines(user_ids=None):
+    """Rogne les timelines (toutes, ou celles de `user_ids`) à TIMELINE_MAX_LENGTH entrées."""
+    entries = TimelineEntry.objects.all()
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=list(user_ids))
+    overflow = list(
+        entries.annotate(rank=Window(RowNumber(), partition_by=F('user_id'), order_by=_RECENT))
+        .filter(rank__gt=TIMELINE_MAX_LENGTH)
+        .values_list('id', flat=True)
+    )
+    deleted = 0
+    for start in range(0, len(overflow), BULK_BATCH_SIZE):
+        deleted += TimelineEntry.objects.filter(id__in=overflow[start:start + BULK_BATCH_SIZE]).delete()[0]
+    return deleted
+
+
+# ======================================================
+# Lecture (bucket 'followed')
+# ======================================================
+def followed_candidates(user_id, pull_creator_ids=(), size=TIMELINE_READ_SIZE, require_processed=False):
+    """
+    Candidats du bucket 'followed' (dicts au format du pool), du plus récent
+    au plus ancien, au plus `size` : la timeline de l'utilisateur, plus les
+    contenus récents des créateurs suivis servis à la lecture (`pull_creator_ids`).
+
+    Même règle que le pool global pour les photos : jamais en échec de
+    traitement ; seulement prêtes si `require_processed`. Les entrées
+    recopiées avant l'échec restent en base, filtrées à la lecture.
+    """
+    entries = TimelineEntry.objects.filter(user_id=user_id)
+    photos = Photo.objects.all()
+    if require_processed:
+        entries = entries.filter(Q(photo__isnull=True) | Q(photo__processing_state=Photo.PROCESSING_READY))
+        photos = photos.filter(processing_state=Photo.PROCESSING_READY)
+    else:
+        entries = entries.exclude(photo__processing_state=Photo.PROCESSING_FAILED)
+        photos = photos.exclude(processing_state=Photo.PROCESSING_FAILED)
+    rows = [
+        ('photo' if photo_id else 'blog', photo_id or blog_id, author_id, date_created, likes_count)
+        for photo_id, blog_id, author_id, date_created, likes_count in entries
+        .order_by(*_RECENT)
+        .values_list('photo_id', 'blog_id', 'author_id', 'date_created', 'photo__likes_count')[:size]
+    ]
+    if pull_creator_ids:
+        pull_creator_ids = list(pull_creator_ids)
+        rows += [('photo', *row) for row in photos.filter(uploader_id__in=pull_creator_ids)
+                 .order_by(*_RECENT).values_list('id', 'uploader_id', 'date_created', 'likes_count')[:size]]
+        rows += [('blog', *row, 0) for row in Blog.objects.filter(author_id__in=pull_creator_ids)
+                 .order_by(*_RECENT).values_list('id', 'author_id', 'date_created')[:size]]
+        # un créateur passé au-dessus du seuil peut avoir encore des entrées recopiées
+        rows = list({(kind, oid): (kind, oid, *rest) for kind, oid, *rest in rows}.values())
+        rows.sort(key=lambda r: r[3], reverse=True)
+    return [
+        {'kind': kind, 'id': oid, 'uploader_id': author_id, 'date_created': date_created, 'likes_count': likes or 0}
+        for kind, oid, author_id, date_created, likes in rows[:size]
+    ]
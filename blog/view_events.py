@@ -0,0 +1,273 @@
+# blog/view_events.py
+"""
+Ingestion des impressions (PhotoView / BlogView).
+
+Chaque card rendue produit un événement "user a vu X". Pour ne pas payer un
+INSERT par événement, les vues sont accumulées dans un buffer en mémoire
+(par processus, dédupliqué) puis écrites par lots :
+    bulk_create(ignore_conflicts=True)  -> la première vue est conservée.
+
+Déclenchement du flush :
+  - taille : dès FLUSH_SIZE événements en attente (dans la requête courante) ;
+  - temps  : à la fin d'une requête (signal request_finished, donc après
+             l'envoi de la réponse) si FLUSH_INTERVAL_SECONDS est écoulé ;
+  - arrêt  : atexit.
+Si l'écriture échoue (base verrouillée, indisponible...), le lot est ajouté à
+un fichier de spool (JSON lines, append-only) que `manage.py flush_views`
+réinjecte.
+
+Le même flush met à jour, dans la même transaction, le filtre de Bloom
+par utilisateur (ViewedFilter) que l'algorithme consulte pour écarter les
+contenus déjà vus.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .bloom import ScalableBloomFilter
+from .models import Blog, BlogView, Photo, PhotoView, ViewedFilter
+
+logger = logging.getLogger(__name__)
+
+# --- Hyperparamètres ---
+FLUSH_SIZE = 1000                 # événements en attente avant flush immédiat
+FLUSH_INTERVAL_SECONDS = 5.0      # âge max d'un événement en buffer (si du trafic arrive)
+BULK_BATCH_SIZE = 500             # lignes par INSERT
+SPOOL_DIR = Path(getattr(settings, 'VIEW_EVENTS_SPOOL_DIR', Path(settings.BASE_DIR) / 'var' / 'view_events'))
+
+# Filtre de vues par utilisateur : ~1,2 octet par vue à 1 % ; au-delà de
+# CAPACITY·(2^MAX_SLICES - 1) vues, les plus anciennes sont oubliées.
+VIEWED_FILTER_CAPACITY = 1000
+VIEWED_FILTER_ERROR_RATE = 0.01
+VIEWED_FILTER_MAX_SLICES = 6
+
+# kind -> (modèle de vue, modèle vu, champ FK)
+KINDS = {
+    'photo': (PhotoView, Photo, 'photo_id'),
+    'blog': (BlogView, Blog, 'blog_id'),
+}
+
+
+# ======================================================
+# Filtre de vues (Bloom) par utilisateur
+# ======================================================
+def viewed_key(kind, object_id):
+    return f"{kind}:{object_id}"
+
+
+def new_viewed_filter():
+    return ScalableBloomFilter(VIEWED_FILTER_CAPACITY, VIEWED_FILTER_ERROR_RATE, VIEWED_FILTER_MAX_SLICES)
+
+
+def _decode_filter(data):
+    try:
+        return ScalableBloomFilter.from_bytes(data, VIEWED_FILTER_MAX_SLICES)
+    except ValueError:
+        logger.warning("Filtre de vues illisible, réinitialisé")
+        return new_viewed_filter()
+
+
+def load_viewed_filter(user_id):
+    """Filtre des contenus vus par l'utilisateur (vide s'il n'a encore rien vu) : 1 requête."""
+    data = ViewedFilter.objects.filter(user_id=user_id).values_list('data', flat=True).first()
+    return _decode_filter(data) if data is not None else new_viewed_filter()
+
+
+def update_viewed_filters(keys_by_user):
+    """
+    Ajoute {user_id: [clé, ...]} aux filtres persistés : une lecture et une
+    écriture groupées. À appeler dans une transaction (lecture-modification-
+    écriture du blob ; select_for_update là où la base le supporte).
+    """
+    if not keys_by_user:
+        return
+    rows = {f.user_id: f for f in ViewedFilter.objects.select_for_update().filter(user_id__in=keys_by_user)}
+    to_update, to_create = [], []
+    for user_id, keys in keys_by_user.items():
+        row = rows.get(user_id)
+        bloom = _decode_filter(row.data) if row is not None else new_viewed_filter()
+        if not bloom.update(keys) and row is not None:
+            continue
+        if row is None:
+            to_create.append(ViewedFilter(user_id=user_id, data=bloom.to_bytes()))
+        else:
+            row.data = bloom.to_bytes()
+            row.date_updated = timezone.now()
+            to_update.append(row)
+    if to_update:
+        ViewedFilter.objects.bulk_update(to_update, ['data', 'date_updated'])
+    if to_create:
+        ViewedFilter.objects.bulk_create(to_create)
+
+
+# ======================================================
+# Écriture
+# ======================================================
+def write_events(events):
+    """
+    Écrit des événements [(kind, user_id, object_id, datetime), ...] en une
+    transaction : une lecture des objets encore existants puis des
+    INSERT OR IGNORE par lots, par type. Retourne le nombre d'événements traités.
+    """
+    by_kind = {}
+    for kind, user_id, object_id, when in events:
+        by_kind.setdefault(kind, []).append((user_id, object_id, when))
+
+    keys_by_user = {}
+    with transaction.atomic():
+        for kind, rows in by_kind.items():
+            view_model, target_model, fk = KINDS[kind]
+            # un contenu supprimé entre l'impression et le flush ferait échouer tout le lot (FK)
+            existing = set(target_model.objects.filter(id__in={oid for _, oid, _ in rows}).values_list('id', flat=True))
+            rows = [(uid, oid, when) for uid, oid, when in rows if oid in existing]
+            view_model.objects.bulk_create(
+                [view_model(user_id=uid, date_viewed=when, **{fk: oid}) for uid, oid, when in rows],
+                batch_size=BULK_BATCH_SIZE,
+                ignore_conflicts=True,
+            )
+            for uid, oid, _when in rows:
+                keys_by_user.setdefault(uid, []).append(viewed_key(kind, oid))
+        update_viewed_filters(keys_by_user)
+    return len(events)
+
+
+# ======================================================
+# Spool (repli sur disque)
+# ======================================================
+def spool_events(events):
+    """Ajoute les événements non écrits à un fichier de spool de ce processus."""
+    SPOOL_DIR.mkdir(parents=True, exist_ok=True)
+    path = SPOOL_DIR / f"views-{os.getpid()}.jsonl"
+    with open(path, 'a', encoding='utf-8') as fh:
+        for kind, user_id, object_id, when in events:
+            fh.write(json.dumps([kind, user_id, object_id, when.isoformat()]) + "\n")
+    return path
+
+
+def flush_spool():
+    """
+    Réinjecte les fichiers de spool en base. Chaque fichier est d'abord
+    renommé (réclamation atomique : deux flush_views concurrents ne le liront
+    pas deux fois) puis supprimé une fois écrit. Retourne le nombre d'événements.
+    """
+    if not SPOOL_DIR.exists():
+        return 0
+    total = 0
+    for path in sorted(SPOOL_DIR.glob('views-*.jsonl')):
+        claimed = path.with_name(f"{path.stem}.{uuid.uuid4().hex[:8]}.claimed")
+        try:
+            path.rename(claimed)
+        except OSError:
+            continue  # réclamé par un autre processus
+        events = []
+        with open(claimed, encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    kind, user_id, object_id, when = json.loads(line)
+                    events.append((kind, int(user_id), int(object_id), datetime.fromisoformat(when)))
+                except (ValueError, TypeError):
+                    logger.warning("Ligne de spool ignorée dans %s : %r", claimed.name, line)
+        try:
+            total += write_events([e for e in events if e[0] in KINDS])
+        except DatabaseError:
+            claimed.rename(path.with_name(f"views-retry-{uuid.uuid4().hex[:8]}.jsonl"))
+            raise
+        claimed.unlink()
+    return total
+
+
+# ======================================================
+# Buffer en mémoire
+# ======================================================
+class ViewEventBuffer:
+    """Buffer thread-safe d'impressions, dédupliqué sur (kind, user, objet)."""
+
+    def __init__(self, flush_size=FLUSH_SIZE, flush_interval=FLUSH_INTERVAL_SECONDS):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._events = {}
+        self._last_flush = time.monotonic()
+
+    def __len__(self):
+        return len(self._events)
+
+    def record(self, kind, user_id, object_ids, when=None):
+        when = when or timezone.now()
+        with self._lock:
+            for object_id in object_ids:
+                # première impression conservée (comme en base)
+                self._events.setdefault((kind, user_id, object_id), when)
+            full = len(self._events) >= self.flush_size
+        if full:
+            self.flush()
+
+    def due(self):
+        return bool(self._events) and time.monotonic() - self._last_flush >= self.flush_interval
+
+    def drain(self):
+        with self._lock:
+            events, self._events = self._events, {}
+            self._last_flush = time.monotonic()
+        return [(kind, uid, oid, when) for (kind, uid, oid), when in events.items()]
+
+    def flush(self):
+        """Écrit le contenu du buffer ; en cas d'échec, le lot part au spool."""
+        events = self.drain()
+        if not events:
+            return 0
+        try:
+            return write_events(events)
+        except DatabaseError:
+            path = spool_events(events)
+            logger.warning("Flush des vues impossible, %d événement(s) mis en spool dans %s", len(events), path)
+            return 0
+
+
+buffer = ViewEventBuffer()
+
+
+def record_photo_views(user, photo_ids):
+    if user is not None and user.is_authenticated and photo_ids:
+        buffer.record('photo', user.id, photo_ids)
+
+
+def record_blog_views(user, blog_ids):
+    if user is not None and user.is_authenticated and blog_ids:
+        buffer.record('blog', user.id, blog_ids)
+
+
+def record_card_views(user, photos):
+    """Impressions d'une page de cards (photos passées par attach_card_data)."""
+    record_photo_views(user, [p.id for p in photos])
+    record_blog_views(user, [p.related_blog.id for p in photos if getattr(p, 'related_blog', None)])
+
+
+def record_item_views(user, items):
+    """Impressions d'une page de cards sérialisées (dicts JSON de blog/serializers.py)."""
+    record_photo_views(user, [item['id'] for item in items])
+    record_blog_views(user, [item['related_blog']['id'] for item in items if item['related_blog']])
+
+
+def flush():
+    return buffer.flush()
+
+
+def _flush_if_due(**kwargs):
+    if buffer.due():
+        buffer.flush()
+
+
+request_finished.connect(_flush_if_due, dispatch_uid='blog.view_events.flush_if_due')
+atexit.register(flush)
@@ -3,7 +3,7 @@ import re
 from collections import Counter
 
 from django.shortcuts import render, redirect, get_object_or_404
-from django.urls import reverse_lazy, reverse, NoReverseMatch
+from django.urls import reverse_lazy
 from django.contrib.auth.mixins import LoginRequiredMixin, PermissionRequiredMixin
 from django.views.generic import CreateView, ListView, View, DetailView, FormView
 from django.http import JsonResponse, HttpResponseForbidden
@@ -11,12 +11,22 @@ from django.db import transaction
 from django.contrib import messages
 from django.forms import modelformset_factory
 from django.contrib.auth import get_user_model
-from django.db.models import Count
+from django.db.models import F
 
 from . import forms, models
 from .models import Photo, Blog, Like
 from .forms import BlogForm, PhotoForm, FollowUsersForm
 from .algorithme import compute_feed_for_user  
+from .anonymous_feed import get_anonymous_feed
+from . import cards, snapshots, stats
+from .metrics import LIKES_TOGGLED
+from .instrumentation import FeedTrace, profile_requested, profile_response, timings_visible
+from .prefetch import attach_card_data
+from .routers import ReplicaReadsMixin
+from .serializers import feed_payload, hydrate_photos, liked_photo_ids, serialize_photo_ids, serialize_photos
+from .view_events import record_blog_views, record_card_views, record_item_views, record_photo_views
+from .writes import run_write
+from .pagination import KEYSET_ORDERING, encode_keyset_cursor, keyset_page
 from blog.utils import publications_time 
 
 User = get_user_model()
@@ -50,16 +60,34 @@ def auto_extract_tags(text, max_tags=5):
 # Page d'accueil
 # ======================================================
 
-class HomeView(ListView):
+class SnapshotPhotos:
+    """
+    Ids d'un snapshot de feed vus comme une séquence de Photo : le Paginator
+    de ListView n'hydrate que la tranche de la page demandée.
+    """
+
+    def __init__(self, ids, hydrate):
+        self.ids = ids
+        self.hydrate = hydrate
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.hydrate(self.ids[index])
+        return self.hydrate([self.ids[index]])[0]
+
+
+class HomeView(ReplicaReadsMixin, ListView):
     template_name = "blog/home.html"
     context_object_name = "photos"
     paginate_by = 20
 
-    def _normalize_feed(self, feed):
+    def _feed_photo_ids(self, feed):
         """
-        Normalise le feed en LISTE d'instances Photo.
-        Accepté : QuerySet[Photo], list[Photo], list[int], list[dict {'id':...}], mixte.
-        Retourne : list[Photo] (ordre préservé quand possible).
+        Convertit le feed en LISTE ordonnée d'ids de photos (sans doublon).
+        Accepté : Photo, Blog (-> sa photo), int, dict {'id':...}, mixte.
         """
         if feed is None:
             return []
@@ -70,68 +98,58 @@ class HomeView(ListView):
             return []
 
         ids = []
-        instances = []
+        seen = set()
         for item in feed:
-            # instance Photo déjà fournie
+            pid = None
             if isinstance(item, Photo):
-                instances.append(item)
-                ids.append(item.id)
-                continue
-
-            # dict contenant un id
-            if isinstance(item, dict) and "id" in item:
+                pid = item.id
+            elif isinstance(item, Blog):
+                # un billet s'affiche via sa photo (card + lien "Lire")
+                pid = item.photo_id
+            elif isinstance(item, dict) and "id" in item:
                 try:
-                    ids.append(int(item.get("id")))
+                    pid = int(item.get("id"))
                 except Exception:
-                    pass
-                continue
-
-            # entier (id)
-            if isinstance(item, int):
-                ids.append(item)
-                continue
+                    pid = None
+            elif isinstance(item, int):
+                pid = item
+            else:
+                pid = getattr(item, "id", None)
 
-            # objet quelconque avec attribut id
-            pid = getattr(item, "id", None)
-            if isinstance(pid, int):
+            if isinstance(pid, int) and pid not in seen:
                 ids.append(pid)
-                continue
+                seen.add(pid)
+        return ids
 
-        # si on a seulement des instances Photo, on les retourne directement
-        if not ids and instances:
-            return instances
-        if not ids:
-            return []
+    def _hydrate(self, photo_ids):
+        """Charge les Photo d'une page en une requête, dans l'ordre des ids."""
+        return hydrate_photos(photo_ids)
 
-        # récupérer les instances en base (select_related uploader pour éviter N+1)
-        qs_photos = Photo.objects.filter(id__in=ids).select_related("uploader")
-        photos_map = {p.id: p for p in qs_photos}
-
-        normalized = []
-        seen = set()
-        for pid in ids:
-            obj = photos_map.get(pid)
-            if obj and obj.id not in seen:
-                normalized.append(obj)
-                seen.add(obj.id)
-
-        # ajouter les instances originales si présentes et non déjà ajoutées
-        for p in instances:
-            if p.id not in seen:
-                normalized.append(p)
-                seen.add(p.id)
-
-        return normalized
+    def _snapshot(self):
+        """
+        Retourne (token, ids) de la génération courante du snapshot de feed
+        de l'utilisateur connecté, calculée si absente.
+        """
+        user = self.request.user
+        return snapshots.get_or_build_snapshot(
+            user.id,
+            lambda: self._feed_photo_ids(
+                compute_feed_for_user(user, limit=snapshots.SNAPSHOT_SIZE, trace=self.feed_trace)
+            ),
+            # ses propres publications comptent aussi
+            creators=lambda: [user.id, *user.follows.values_list('id', flat=True)],
+        )
 
     def get_queryset(self):
         user = self.request.user
         if not user.is_authenticated:
-            # visiteurs -> photos récentes (QuerySet slice, avec annotation likes_count utile côté serveur)
-            return Photo.objects.annotate(likes_count=Count("likes")).order_by("-date_created")[:100]
+            # visiteurs -> photos récentes, génération partagée (blog/anonymous_feed.py)
+            self.anonymous_feed = get_anonymous_feed()
+            return self.anonymous_feed.photos
 
-        # utilisateur connecté -> feed personnalisé (normalize to Photo instances)
-        feed = compute_feed_for_user(user, limit=500)
-        return self._normalize_feed(feed)
+        # utilisateur connecté -> snapshot de feed, seule la page demandée (?page=N) est hydratée
+        self.snapshot_token, ids = self._snapshot()
+        return SnapshotPhotos(ids, self._hydrate)
 
     def _is_json_request(self):
         r = self.request
@@ -139,9 +157,44 @@ class HomeView(ListView):
             r.headers.get("x-requested-with") == "XMLHttpRequest"
             or "application/json" in r.headers.get("accept", "")
             or "offset" in r.GET
+            or "cursor" in r.GET
         )
 
+    def _json_page(self, offset, limit):
+        """
+        Retourne (ids, start, end, total, next_cursor, reset) pour la branche JSON.
+        Lecture O(limit) dans le snapshot via le curseur (utilisateur connecté).
+        Curseur d'une génération expirée : sa position ne vaut rien dans une
+        autre génération, lecture depuis le début de la courante et reset=True
+        (le client ne réaffiche pas les photos déjà présentes).
+        """
+        token, start = snapshots.decode_cursor(self.request.GET.get("cursor"))
+        ids = snapshots.get_snapshot(self.request.user.id, token)
+        reset = token is not None and ids is None
+        if token is None:
+            start = max(0, offset)
+        elif reset:
+            start = 0
+        if ids is None:
+            token, ids = self._snapshot()
+        total = len(ids)
+        end = min(total, start + limit)
+        next_cursor = snapshots.encode_cursor(token, end) if end < total else None
+        return ids[start:end], start, end, total, next_cursor, reset
+
     def get(self, request, *args, **kwargs):
+        # étapes du calcul de feed, s'il a lieu pendant cette requête (snapshot absent)
+        self.feed_trace = FeedTrace()
+        if profile_requested(request):
+            # staff : profil cProfile de la requête, feed recalculé pour être mesuré
+            snapshots.invalidate_snapshots([request.user.id])
+            return profile_response(lambda: self._render(request, *args, **kwargs))
+        response = self._render(request, *args, **kwargs)
+        if self.feed_trace.stages and timings_visible(request):
+            response["Server-Timing"] = self.feed_trace.server_timing()
+        return response
+
+    def _render(self, request, *args, **kwargs):
         # branche AJAX / JSON (infinite scroll)
         if self._is_json_request():
             try:
@@ -152,133 +205,23 @@ class HomeView(ListView):
                 limit = int(request.GET.get("limit", 20))
             except (TypeError, ValueError):
                 limit = 20
-
-            feed = self.get_queryset()
-            feed_list = list(feed) if hasattr(feed, "__iter__") else []
-            total = len(feed_list)
-
-            start = max(0, offset)
-            end = min(total, start + limit)
-            batch = feed_list[start:end]
-
-            # ids valides du batch
-            photo_ids = [getattr(p, "id", None) for p in batch if getattr(p, "id", None) is not None]
-
-            # likes de l'utilisateur pour ces photos
-            photo_likes = {}
-            user = request.user
-            if user.is_authenticated and photo_ids:
-                liked_qs = Like.objects.filter(user=user, photo_id__in=photo_ids).values_list("photo_id", flat=True)
-                photo_likes = {int(pid): True for pid in liked_qs}
-
-            # construire la réponse JSON (sécurisée / sérialisable)
-            items = []
-            for raw in batch:
-                # s'assurer d'avoir une instance Photo
-                photo = raw
-                if not isinstance(photo, Photo):
-                    # tenter de récupérer depuis la base si on a juste un id/dict
-                    pid = None
-                    if isinstance(raw, dict):
-                        pid = raw.get("id")
-                    else:
-                        pid = getattr(raw, "id", None)
-                    if pid:
-                        try:
-                            photo = Photo.objects.select_related("uploader").get(id=pid)
-                        except Photo.DoesNotExist:
-                            continue
-                    else:
-                        continue
-
-                uploader = getattr(photo, "uploader", None)
-
-                # profile_photo url (sécurisé) — évite ValueError si pas de fichier
-                profile_photo_url = None
-                if uploader:
-                    pp = getattr(uploader, "profile_photo", None)
-                    if pp and getattr(pp, "name", ""):
-                        try:
-                            profile_photo_url = pp.url
-                        except Exception:
-                            profile_photo_url = None
-
-                # -------- safe likes_count --------
-                likes_count = 0
-                try:
-                    lc = getattr(photo, "likes_count", None)
-                    if callable(lc):
-                        try:
-                            val = lc()
-                            likes_count = int(val) if val is not None else 0
-                        except Exception:
-                            likes_count = 0
-                    elif lc is not None:
-                        try:
-                            likes_count = int(lc)
-                        except Exception:
-                            likes_count = 0
-                    else:
-                        try:
-                            likes_count = int(photo.likes.count())
-                        except Exception:
-                            likes_count = 0
-                except Exception:
-                    likes_count = 0
-                # -----------------------------------
-
-                # date iso
-                date_created_iso = None
-                dc = getattr(photo, "date_created", None)
-                if dc:
-                    try:
-                        date_created_iso = dc.isoformat()
-                    except Exception:
-                        date_created_iso = str(dc)
-
-                liked_flag = bool(photo_likes.get(int(photo.id), False))
-
-                # uploader info (JSON-safe) + profile_url via reverse() avec fallback
-                uploader_info = {}
-                if uploader:
-                    username = getattr(uploader, "username", "") or ""
-                    try:
-                        profile_url = reverse("user-profile", kwargs={"username": username})
-                    except NoReverseMatch:
-                        profile_url = f"/profile/{username}/"
-                    uploader_info = {
-                        "id": int(getattr(uploader, "id")) if getattr(uploader, "id", None) is not None else None,
-                        "username": str(username),
-                        "profile_photo": profile_photo_url,
-                        "role": str(getattr(uploader, "role", "")) or "",
-                        "profile_url": profile_url,
-                    }
-
-                # date_facebook pré-calculée (sécurisé)
-                try:
-                    date_fb = publications_time(getattr(photo, "date_created", None))
-                except Exception:
-                    date_fb = ""
-
-                items.append({
-                    "id": int(photo.id),
-                    "url": str(getattr(getattr(photo, "image", None), "url", "")) or None,
-                    "caption": str(getattr(photo, "caption", "")) or "",
-                    "uploader": uploader_info,
-                    "likes_count": likes_count,
-                    "liked": bool(liked_flag),
-                    "date_created": date_created_iso,
-                    "date_facebook": date_fb,
-                })
-
-            return JsonResponse({
-                "photos": items,
-                "offset": start,
-                "limit": limit,
-                "returned": len(items),
-                "has_next": end < total,
-                "total": total,
-            })
+            limit = max(1, min(limit, 100))
+
+            if not request.user.is_authenticated:
+                # feed anonyme partagé : items déjà sérialisés, aucune requête hors reconstruction
+                feed = get_anonymous_feed()
+                start = max(0, offset)
+                end = min(len(feed.items), start + limit)
+                return JsonResponse(feed_payload(feed.page(start, end), start, limit, end < len(feed.items),
+                                                 len(feed.items)))
+
+            page_ids, start, end, total, next_cursor, reset = self._json_page(offset, limit)
+            items = serialize_photo_ids(page_ids, request.user)
+            record_item_views(request.user, items)
+            extra = {"next_cursor": next_cursor, "reset": reset}
+            if self.feed_trace.stages and timings_visible(request):
+                extra["feed_timings"] = self.feed_trace.as_dict()
+            return JsonResponse(feed_payload(items, start, limit, end < total, total, **extra))
 
         # rendu HTML normal (ListView)
         return super().get(request, *args, **kwargs)
@@ -286,7 +229,8 @@ class HomeView(ListView):
     def get_context_data(self, **kwargs):
         """
         Construit le contexte pour le rendu HTML initial (photos, photo_likes,
-        photo_dates_facebook, et ajout d'un profile_url sur chaque uploader).
+        photo_dates_facebook) ; les données de card sont attachées aux photos
+        par attach_card_data().
         """
         context = super().get_context_data(**kwargs)
         user = self.request.user
@@ -294,15 +238,19 @@ class HomeView(ListView):
         photos_seq = context.get("photos", [])
         photos_list = list(photos_seq) if hasattr(photos_seq, "__iter__") else []
 
-        # ids valides
-        photo_ids = [getattr(p, "id", None) for p in photos_list if getattr(p, "id", None) is not None]
-
-        # likes de l’utilisateur (pour les photos rendues côté serveur)
-        photo_likes = {}
-        if user.is_authenticated and photo_ids:
-            liked_qs = Like.objects.filter(user=user, photo_id__in=photo_ids).values_list("photo_id", flat=True)
-            photo_likes = {int(pid): True for pid in liked_qs}
-        context["photo_likes"] = photo_likes
+        if getattr(self, "anonymous_feed", None) is not None:
+            # feed anonyme partagé : données de card déjà attachées, rien de "liké", pas d'impression
+            context["photo_likes"] = {}
+        else:
+            # billet lié, tags, likes et profile_url préchargés pour toute la page
+            context["photo_likes"] = attach_card_data(photos_list, user)
+            record_card_views(user, photos_list)
+        context["photos"] = context["object_list"] = photos_list
+        # suite du scroll infini après la page rendue
+        page = context.get("page_obj")
+        token = getattr(self, "snapshot_token", None)
+        context["next_cursor"] = (snapshots.encode_cursor(token, page.end_index())
+                                  if token and page is not None and page.has_next() else None)
 
         # préparer date_facebook pour affichage côté template
         photo_dates_facebook = {}
@@ -313,19 +261,6 @@ class HomeView(ListView):
                 photo_dates_facebook[photo.id] = ""
         context["photo_dates_facebook"] = photo_dates_facebook
 
-        # ajouter profile_url sur uploader pour faciliter le template server-side
-        for photo in photos_list:
-            uploader = getattr(photo, "uploader", None)
-            if uploader:
-                try:
-                    username = getattr(uploader, "username", "") or ""
-                    try:
-                        uploader.profile_url = reverse("user-profile", kwargs={"username": username})
-                    except NoReverseMatch:
-                        uploader.profile_url = f"/profile/{username}/"
-                except Exception:
-                    uploader.profile_url = None
-
         return context
         
 # ======================================================
@@ -337,45 +272,40 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 
 from .models import Blog, Photo, Like
 
-class BlogDetailView(LoginRequiredMixin, DetailView):
+class BlogDetailView(LoginRequiredMixin, ReplicaReadsMixin, DetailView):
     model = Blog
     template_name = "blog/view_blog.html"
     context_object_name = "blog"
     pk_url_kwarg = "blog_id"
     login_url = "login"
 
+    def get_queryset(self):
+        # billet, photo et auteur en une requête ; tags lus dans les cards (blog/cards.py)
+        return super().get_queryset().select_related("photo", "author")
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         user = self.request.user
         blog = self.object
         photo = getattr(blog, "photo", None)
 
-        # Likes
-        if photo:
-            likes_count = photo.likes.count()
-            user_liked = photo.likes.filter(user=user).exists() if user.is_authenticated else False
-            context["photo_likes"] = {photo.id: user_liked}
-        else:
-            likes_count = 0
-            context["photo_likes"] = {}
-
-        context["likes_count"] = likes_count
-        context["user_liked"] = photo.likes.filter(user=user).exists() if photo and user.is_authenticated else False
+        # Likes (photo_likes : ids des photos likées, comme sur les cards du feed)
+        user_liked = bool(photo) and bool(liked_photo_ids([photo.id], user))
+        context["photo_likes"] = {photo.id: True} if user_liked else {}
+        context["likes_count"] = photo.likes_count if photo else 0
+        context["user_liked"] = user_liked
 
         # Exposer les tags de blog et photo
-        try:
-            context["blog_tags"] = list(blog.tags.all())
-        except Exception:
-            context["blog_tags"] = []
-
-        try:
-            context["photo_tags"] = list(photo.tags.all()) if photo else []
-        except Exception:
-            context["photo_tags"] = []
+        context["blog_tags"] = cards.blog_cards([blog.id], [blog])[blog.id]["tags"]
+        context["photo_tags"] = cards.photo_cards([photo.id], [photo])[photo.id]["tags"] if photo else []
 
         # Photo de profil de l'utilisateur courant
         context["profile_photo"] = getattr(user, "profile_photo", None)
 
+        record_blog_views(user, [blog.id])
+        if photo:
+            record_photo_views(user, [photo.id])
+
         return context
 # ======================================================
 # Upload de photo simple (avec tags + auto-extract)
@@ -483,7 +413,7 @@ class UpdateProfilePhotoView(LoginRequiredMixin, View):
         photo = request.FILES.get("profile_photo")
         if photo:
             request.user.profile_photo = photo
-            request.user.save()
+            request.user.save(update_fields=["profile_photo", "profile_renditions"])
             messages.success(request, "Photo de profil mise à jour.")
         return redirect("home")
 
@@ -584,15 +514,29 @@ class ToggleLikeView(LoginRequiredMixin, View):
         photo = get_object_or_404(Photo, id=photo_id)
         user = request.user
 
-        like_obj, created = Like.objects.get_or_create(photo=photo, user=user)
-        liked = created
-        if not created:
-            like_obj.delete()
-            liked = False
+        # like + compteur dénormalisé dans la même transaction (F() : pas de lecture/écriture concurrente),
+        # rejouée sur verrou, ou exécutée par l'écrivain unique (blog/writes.py)
+        def toggle():
+            like_obj, created = Like.objects.get_or_create(photo=photo, user=user)
+            if created:
+                Photo.objects.filter(pk=photo.pk).update(likes_count=F("likes_count") + 1)
+                User.objects.filter(pk=photo.uploader_id).update(likes_received_count=F("likes_received_count") + 1)
+                stats.bump(photo.uploader_id, likes_count=1)
+            else:
+                like_obj.delete()
+                Photo.objects.filter(pk=photo.pk, likes_count__gt=0).update(likes_count=F("likes_count") - 1)
+                User.objects.filter(pk=photo.uploader_id, likes_received_count__gt=0).update(
+                    likes_received_count=F("likes_received_count") - 1
+                )
+                stats.bump(photo.uploader_id, likes_count=-1)
+            return created, Photo.objects.values_list("likes_count", flat=True).get(pk=photo.pk)
+
+        liked, likes_count = run_write(toggle)
+        LIKES_TOGGLED.inc(action="like" if liked else "unlike")
 
         return JsonResponse({
             "liked": liked,
-            "likes_count": photo.likes.count(),
+            "likes_count": likes_count,
         })
 
 # ======================================================
@@ -669,12 +613,12 @@ class FollowUsersView(LoginRequiredMixin, FormView):
         return self.form_class(instance=self.request.user, **self.get_form_kwargs())
 
     def form_valid(self, form):
-        form.save()
+        # seuls les abonnements changent : pas de réécriture de la ligne User (compteurs)
+        form.instance.follows.set(form.cleaned_data['follows'])
         return super().form_valid(form)
 
 from django.shortcuts import get_object_or_404
 from django.views.generic import ListView
-from django.db.models import Count
 from django.http import JsonResponse
 
 from .models import Photo, Like
@@ -682,43 +626,39 @@ from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
-class UserProfileView(ListView):
+class UserProfileView(ReplicaReadsMixin, ListView):
     template_name = 'blog/user_profile.html'
     context_object_name = 'photos'
-    paginate_by = 20
+    paginate_by = None  # pagination par clé (date_created, id) : voir keyset_page()
+    page_size = 20
 
     def get_queryset(self):
         self.profile_user = get_object_or_404(User, username=self.kwargs['username'])
-        # Annotation pour likes_count pour éviter de compter à chaque photo
-        return Photo.objects.filter(uploader=self.profile_user).annotate(likes_count=Count('likes')).order_by('-date_created')
+        # likes_count est une colonne dénormalisée : pas de COUNT par photo
+        return Photo.objects.filter(uploader=self.profile_user).select_related('uploader')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        photos_qs = self.get_queryset()
+        # première page seulement : la suite est servie par le JSON via next_cursor
+        photos_list, next_cursor = keyset_page(self.object_list, None, self.page_size)
+        context['photos'] = context['object_list'] = photos_list
+        context['next_cursor'] = next_cursor
         context['profile_user'] = self.profile_user
-        context['photos_count'] = photos_qs.count()
-        try:
-            context['followers_count'] = self.profile_user.followers.count()
-        except Exception:
-            context['followers_count'] = 0
-        try:
-            context['likes_count'] = sum(photo.likes_count for photo in photos_qs)
-        except Exception:
-            context['likes_count'] = 0
+        # compteurs dénormalisés sur User (aucune requête d'agrégation)
+        context['photos_count'] = self.profile_user.photos_count
+        context['followers_count'] = self.profile_user.followers_count
+        context['likes_count'] = self.profile_user.likes_received_count
 
-        # Dictionnaire photo_id -> liked par l'utilisateur connecté
-        if self.request.user.is_authenticated:
-            user_likes = Like.objects.filter(user=self.request.user, photo__in=photos_qs)
-            context['photo_likes'] = {like.photo.id: True for like in user_likes}
-        else:
-            context['photo_likes'] = {}
+        # billet lié, tags, likes (photo_id -> liked) et profile_url de la page
+        context['photo_likes'] = attach_card_data(photos_list, self.request.user)
+        record_card_views(self.request.user, photos_list)
 
         # Préparer la date_facebook si besoin (comme dans home.js)
         try:
             from .utils import publications_time
-            context['photo_dates_facebook'] = {photo.id: publications_time(photo.date_created) for photo in photos_qs}
+            context['photo_dates_facebook'] = {photo.id: publications_time(photo.date_created) for photo in photos_list}
         except Exception:
-            context['photo_dates_facebook'] = {photo.id: str(photo.date_created) for photo in photos_qs}
+            context['photo_dates_facebook'] = {photo.id: str(photo.date_created) for photo in photos_list}
 
         return context
 
@@ -728,63 +668,53 @@ class UserProfileView(ListView):
             r.headers.get('x-requested-with') == 'XMLHttpRequest'
             or 'application/json' in (r.headers.get('accept') or '')
             or 'offset' in r.GET
+            or 'cursor' in r.GET
         )
 
     def get(self, request, *args, **kwargs):
         if self._is_json_request():
-            offset = int(request.GET.get('offset', 0) or 0)
-            limit = int(request.GET.get('limit', self.paginate_by) or self.paginate_by)
+            try:
+                offset = max(0, int(request.GET.get('offset', 0) or 0))
+                limit = int(request.GET.get('limit', self.page_size) or self.page_size)
+            except (TypeError, ValueError):
+                offset, limit = 0, self.page_size
+            limit = max(1, min(limit, 100))
             feed_qs = self.get_queryset()
-            feed_list = list(feed_qs)
-            total = len(feed_list)
-            batch = feed_list[offset:offset+limit]
-
-            # likes de l'utilisateur courant
-            photo_ids = [p.id for p in batch]
-            photo_likes = {}
-            if request.user.is_authenticated and photo_ids:
-                liked_ids = Like.objects.filter(user=request.user, photo_id__in=photo_ids).values_list('photo_id', flat=True)
-                photo_likes = {pid: True for pid in liked_ids}
-
-            items = []
-            for photo in batch:
-                uploader = getattr(photo, 'uploader', None)
-                profile_photo_url = getattr(getattr(uploader, 'profile_photo', None), 'url', '') if uploader else None
-                try:
-                    likes_count = int(getattr(photo, 'likes_count', photo.likes.count()))
-                except Exception:
-                    likes_count = 0
-                liked_flag = bool(photo_likes.get(photo.id, False))
-                # date_facebook si possible
-                try:
-                    from .utils import publications_time
-                    date_fb = publications_time(photo.date_created)
-                except Exception:
-                    date_fb = str(photo.date_created)
-                items.append({
-                    'id': photo.id,
-                    'url': getattr(getattr(photo, 'image', None), 'url', None),
-                    'caption': photo.caption or '',
-                    'uploader': {
-                        'id': uploader.id if uploader else None,
-                        'username': uploader.username if uploader else '',
-                        'profile_photo': profile_photo_url,
-                        'role': getattr(uploader, 'role', '') if uploader else '',
-                        'profile_url': f'/profile/{uploader.username}/' if uploader else ''
-                    },
-                    'likes_count': likes_count,
-                    'liked': liked_flag,
-                    'date_created': photo.date_created.isoformat() if photo.date_created else None,
-                    'date_facebook': date_fb
-                })
-
-            return JsonResponse({
-                'photos': items,
-                'offset': offset,
-                'limit': limit,
-                'returned': len(items),
-                'has_next': offset + limit < total,
-                'total': total
-            })
-
-        return super().get(request, *args, **kwargs)
\ No newline at end of file
+            cursor = request.GET.get('cursor')
+
+            if cursor or not offset:
+                # seek : LIMIT n+1 après la dernière card servie
+                photos, next_cursor = keyset_page(feed_qs, cursor, limit)
+                has_next = next_cursor is not None
+            else:
+                # anciens clients sans curseur : OFFSET SQL (sans matérialiser la liste)
+                photos = list(feed_qs.order_by(*KEYSET_ORDERING)[offset:offset + limit + 1])
+                has_next = len(photos) > limit
+                photos = photos[:limit]
+                next_cursor = encode_keyset_cursor(photos[-1].date_created, photos[-1].id) if has_next else None
+
+            items = serialize_photos(photos, request.user)
+            record_item_views(request.user, items)
+            return JsonResponse(feed_payload(items, offset, limit, has_next, self.profile_user.photos_count,
+                                             next_cursor=next_cursor))
+
+        return super().get(request, *args, **kwargs)
+
+# ======================================================
+# Métriques (format Prometheus, staff seulement)
+# ======================================================
+from django.contrib.auth.mixins import UserPassesTestMixin
+from django.http import HttpResponse
+
+from .metrics import registry
+
+
+class MetricsView(UserPassesTestMixin, View):
+    """Agrège les métriques de tous les processus (voir blog/metrics.py)."""
+    raise_exception = True
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(registry.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,176 @@
+# blog/writes.py
+"""
+Écritures sous contention. SQLite n'accepte qu'un écrivain à la fois :
+likes, uploads et inscriptions se disputent le même verrou.
+
+Côté connexion (DATABASES dans fotoblog/settings.py) : WAL (les lecteurs ne
+bloquent plus l'écrivain ni l'inverse), busy_timeout (attendre le verrou
+plutôt qu'échouer aussitôt), transactions IMMEDIATE (le verrou d'écriture
+est pris au BEGIN, donc pas d'échec à la promotion lecture -> écriture).
+
+Au-dessus :
+  - atomic_with_retry(fn) : transaction rejouée quand la base reste
+    verrouillée au-delà du busy_timeout, avec backoff exponentiel et
+    gigue complète (les écrivains en échec ne reviennent pas ensemble) ;
+  - WriteQueue : file optionnelle (réglage WRITE_QUEUE_ENABLED) vers un
+    thread écrivain unique, qui exécute les petites écritures (toggles de
+    like) par lots, un COMMIT par lot : tout ce qui s'est accumulé pendant
+    le lot précédent part dans le suivant (group commit).
+"""
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+logger = logging.getLogger(__name__)
+
+# --- Hyperparamètres ---
+WRITE_RETRY_ATTEMPTS = 5
+WRITE_RETRY_BASE_DELAY = 0.02      # s, doublé à chaque tentative
+WRITE_RETRY_MAX_DELAY = 0.5        # s
+WRITE_QUEUE_BATCH_SIZE = 100
+WRITE_QUEUE_TIMEOUT_SECONDS = 10.0
+
+
+# ======================================================
+# Rejeu sur verrou
+# ======================================================
+def is_lock_error(exc):
+    message = str(exc).lower()
+    return isinstance(exc, OperationalError) and ('locked' in message or 'busy' in message)
+
+
+def backoff_delay(attempt, base=WRITE_RETRY_BASE_DELAY, cap=WRITE_RETRY_MAX_DELAY):
+    """Gigue complète : uniforme sur [0, min(cap, base · 2^attempt)]."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def atomic_with_retry(fn, attempts=None, on_retry=None, using=None):
+    """
+    Exécute fn() dans transaction.atomic() et la rejoue (au plus `attempts`
+    fois) sur "database is locked" ; les autres erreurs remontent aussitôt.
+    Dans une transaction déjà ouverte, rien à rejouer : la transaction
+    englobante est perdue, fn() est exécutée une fois.
+    """
+    if transaction.get_connection(using).in_atomic_block:
+        return fn()
+    attempts = attempts or WRITE_RETRY_ATTEMPTS
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic(using=using):
+                return fn()
+        except OperationalError as exc:
+            if not is_lock_error(exc) or attempt == attempts - 1:
+                raise
+            if on_retry is not None:
+                on_retry()
+            time.sleep(backoff_delay(attempt))
+
+
+# ======================================================
+# Écrivain unique
+# ======================================================
+class WriteQueue:
+    """File d'opérations (callables) exécutées par lots, une transaction par lot, par un seul thread."""
+
+    def __init__(self, batch_size=WRITE_QUEUE_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.batches = 0
+        self.operations = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return getattr(settings, 'WRITE_QUEUE_ENABLED', False)
+
+    def submit(self, fn):
+        """Met fn() en file ; le Future reçoit son résultat une fois le lot validé."""
+        if self._thread is None:
+            self._start()
+        future = Future()
+        self._queue.put((fn, future))
+        return future
+
+    def run(self, fn, timeout=WRITE_QUEUE_TIMEOUT_SECONDS):
+        return self.submit(fn).result(timeout)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self._thread.start()
+
+    def close(self):
+        """Vide la file puis arrête le thread (et ferme sa connexion)."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = []
+            item = self._queue.get()
+            try:
+                while item is not None:
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+                else:
+                    stopping = True
+            except queue.Empty:
+                pass
+            if batch:
+                self._execute(batch)
+        connection.close()
+
+    def _execute(self, batch):
+        outcomes = []
+
+        def apply():
+            outcomes.clear()  # rejeu : on repart de zéro
+            for fn, future in batch:
+                try:
+                    # savepoint : une opération en échec n'annule pas le reste du lot
+                    with transaction.atomic():
+                        outcomes.append((future, fn(), None))
+                except Exception as exc:
+                    if is_lock_error(exc):
+                        raise
+                    outcomes.append((future, None, exc))
+
+        try:
+            atomic_with_retry(apply)
+        except Exception as exc:
+            logger.exception("Lot d'écritures en échec (%d opérations)", len(batch))
+            connection.close()
+            for _, future in batch:
+                future.set_exception(exc)
+            return
+        self.batches += 1
+        self.operations += len(batch)
+        for future, result, exc in outcomes:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+
+
+write_queue = WriteQueue()
+
+
+def run_write(fn, on_retry=None):
+    """Écriture courte : par la file si WRITE_QUEUE_ENABLED, sinon transaction rejouée sur verrou."""
+    if write_queue.enabled:
+        return write_queue.run(fn)
+    return atomic_with_retry(fn, on_retry=on_retry)
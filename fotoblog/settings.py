@@ -46,17 +46,27 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    # en premier : mesure toute la chaîne (voir blog/middleware.py)
+    'blog.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'blog.middleware.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'fotoblog.urls'
 
+# Journal JSONL des requêtes (blog/request_log.py) et budgets de requêtes SQL
+# par route (blog/middleware.py) : dépassement journalisé, ou exception si
+# REQUEST_QUERY_BUDGET_RAISE (tests).
+REQUEST_LOG_ENABLED = True
+REQUEST_LOG_DIR = BASE_DIR / 'var' / 'request_log'
+REQUEST_QUERY_BUDGET_RAISE = False
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -82,13 +92,79 @@ WSGI_APPLICATION = 'fotoblog.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# SQLite sous écritures concurrentes (likes, uploads, inscriptions) :
+#   - WAL : les lecteurs ne bloquent pas l'écrivain (et inversement) ;
+#   - synchronous=NORMAL : fsync au checkpoint seulement (sûr en WAL) ;
+#   - busy_timeout / timeout : attendre le verrou au lieu d'échouer ;
+#   - transactions IMMEDIATE : verrou d'écriture pris au BEGIN, pas
+#     d'échec à la promotion lecture -> écriture ;
+#   - mmap et cache de pages pour les lectures.
+# Rejeu et écrivain unique par-dessus : voir blog/writes.py.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,           # ms
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -32000,           # Kio (négatif) : ~32 Mo par connexion
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 5,
+        },
+        # base de test créée depuis les modèles : les migrations de données des
+        # permissions (authentification 0002, blog 0004) supposent des
+        # permissions déjà présentes ; elles le sont après post_migrate
+        'TEST': {'MIGRATE': False},
+    },
+    # Réplique en lecture seule : en local, copie de db.sqlite3 par l'API de
+    # backup (`manage.py refresh_replica [--interval N]`). Routage : blog/routers.py.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'var' / 'replica.sqlite3',
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}'
+                                     for name, value in {**SQLITE_PRAGMAS, 'query_only': 'ON'}.items()),
+            'timeout': 5,
+        },
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+DATABASE_ROUTERS = ['blog.routers.ReplicaRouter']
+# Lectures des pages et du feed sur la réplique ; à activer une fois la réplique créée
+REPLICA_READS_ENABLED = False
+# Lire ses écritures : durée (s) pendant laquelle un utilisateur qui vient d'écrire lit sur le primaire
+REPLICA_STICKY_SECONDS = 10
+
+# Caches : 'default' (snapshots de feed, pool, marqueurs de réplique...) et
+# 'cards' (données de card par objet, blog/cards.py). Mémoire locale par
+# défaut, donc propre à chaque processus ; avec plusieurs workers, un cache
+# fichier partagé :
+#   'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+#   'LOCATION': BASE_DIR / 'var' / 'cache' / 'cards',
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fotoblog-default',
+    },
+    'cards': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'fotoblog-cards',
+        'TIMEOUT': 600,
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
 }
 
+# Écritures courtes (likes) par un thread écrivain unique, en lots (blog/writes.py)
+WRITE_QUEUE_ENABLED = False
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
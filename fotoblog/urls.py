@@ -19,6 +19,7 @@ from blog.views import (
     CreateMultiplePhotosView,
     FollowUsersView,
     UserProfileView,
+    MetricsView,
 )
 
 
@@ -55,6 +56,9 @@ urlpatterns = [
    
     path('profile/<str:username>/', UserProfileView.as_view(), name='user-profile'),
 
+    # Métriques (staff)
+    path('metrics/', MetricsView.as_view(), name='metrics'),
+
 ]
 
 
@@ -36,6 +36,18 @@
       .replace(/>/g, "&gt;");
   }
 
+  // <picture> responsive : sources AVIF/WebP + <img> JPEG (srcset fourni par le serveur)
+  const FEED_IMAGE_SIZES = "(max-width: 600px) 100vw, 600px";
+  function pictureHtml(url, srcset, alt) {
+    const sets = srcset || {};
+    const sources = [["avif", "image/avif"], ["webp", "image/webp"]]
+      .filter(([key]) => sets[key])
+      .map(([key, mime]) => `<source type="${mime}" srcset="${escapeHtml(sets[key])}" sizes="${FEED_IMAGE_SIZES}">`)
+      .join("");
+    const jpeg = sets.jpeg ? ` srcset="${escapeHtml(sets.jpeg)}" sizes="${FEED_IMAGE_SIZES}"` : "";
+    return `<picture>${sources}<img src="${escapeHtml(url || '')}"${jpeg} alt="${alt}" loading="lazy"></picture>`;
+  }
+
   // ---------- SVG helpers (identiques au template) ----------
   function heartFilledSvg() {
     return `<svg class="heart-svg filled" xmlns="http://www.w3.org/2000/svg" fill="red" viewBox="0 0 24 24">
@@ -105,7 +117,7 @@
     const html = `
       <div class="photo-card">
         <div class="photo-image-container">
-          <img src="${escapeHtml(photo.url || '')}" alt="${caption}" loading="lazy">
+          ${pictureHtml(photo.url, photo.srcset, caption)}
           <div class="user-info-overlay">
             <div class="profile-photo small">
               <a href="${escapeHtml(uploaderProfileUrl)}">
@@ -223,6 +235,8 @@
   let offset = 0;
   const initialOffsetAttr = feed && feed.dataset ? parseInt(feed.dataset.initialOffset || "0", 10) : 0;
   offset = Number.isNaN(initialOffsetAttr) ? 0 : initialOffsetAttr;
+  // curseur opaque du snapshot de feed (utilisateur connecté), prioritaire sur offset
+  let cursor = feed && feed.dataset ? (feed.dataset.nextCursor || null) : null;
   const limit = 20;
 
   async function loadNextBatch() {
@@ -231,7 +245,9 @@
     if (loader) loader.style.display = "flex";
 
     try {
-      const url = `${feedUrl}?offset=${offset}&limit=${limit}`;
+      const url = cursor
+        ? `${feedUrl}?cursor=${encodeURIComponent(cursor)}&limit=${limit}`
+        : `${feedUrl}?offset=${offset}&limit=${limit}`;
       const res = await fetch(url, { headers: { "Accept": "application/json" } });
       if (!res.ok) {
         console.warn("Fetch batch failed", res.status);
@@ -241,10 +257,17 @@
       const data = await res.json();
       const photos = Array.isArray(data.photos) ? data.photos : Array.isArray(data.items) ? data.items : [];
 
+      // curseur expiré : relecture depuis le début d'un nouveau snapshot, sans répéter les cards affichées
+      const shown = data.reset
+        ? new Set(Array.from(feed.querySelectorAll(".photo-card-wrapper[data-photo-id]"),
+                             (el) => el.getAttribute("data-photo-id")))
+        : null;
       for (const p of photos) {
+        if (shown && shown.has(String(p.id))) continue;
         const card = createPhotoCardFromData({
           id: p.id,
           url: p.url,
+          srcset: p.srcset,
           caption: p.caption,
           uploader: p.uploader,
           likes_count: p.likes_count,
@@ -259,8 +282,9 @@
       // bind like buttons for new cards
       initLikeButtons(feed);
 
-      // advance offset
+      // advance offset / cursor
       offset += photos.length;
+      cursor = data.next_cursor || null;
 
       if (typeof data.has_next !== "undefined") {
         hasNext = !!data.has_next;